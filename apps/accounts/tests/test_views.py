@@ -418,8 +418,9 @@ class QuestionnaireSearchViewTest(TestCase):
         self.view.get_paginate_by(None)
         self.request.is_ajax.assert_called_once()
 
+    @patch('accounts.views.prefetch_list_metadata', side_effect=list)
     @patch.object(QuestionnaireSearchView, 'get_queryset')
-    def test_get_json_data(self, mock_get_queryset):
+    def test_get_json_data(self, mock_get_queryset, mock_prefetch):
         mock_get_queryset.return_value = [MagicMock()]
         json = list(self.view.get_json_data())
         self.assertListEqual(
@@ -23,7 +23,8 @@ from braces.views import LoginRequiredMixin
 from configuration.configuration import QuestionnaireConfiguration
 from django.views.generic import ListView
 from questionnaire.models import Questionnaire, STATUSES
-from questionnaire.utils import query_questionnaires, get_list_values
+from questionnaire.utils import query_questionnaires, get_list_values, \
+    prefetch_list_metadata
 from questionnaire.view_utils import get_paginator, get_pagination_parameters
 from .client import remote_user_client
 from .conf import settings
@@ -325,7 +326,8 @@ class QuestionnaireSearchView(LoginRequiredMixin, ListView):
         """
         Structure as required for frontend.
         """
-        questionnaires = self.get_queryset()[:self.get_paginate_by(None)]
+        questionnaires = prefetch_list_metadata(
+            self.get_queryset()[:self.get_paginate_by(None)])
         for questionnaire in questionnaires:
             yield {
                 'name': questionnaire.get_name(),
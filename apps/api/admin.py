@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import RequestLog, NoteToken
+from .models import RequestLog, RequestUsage, NoteToken
 
 
 @admin.register(RequestLog)
@@ -10,6 +10,13 @@ class RequestLogAdmin(admin.ModelAdmin):
     list_display = ['__str__', 'access']
 
 
+@admin.register(RequestUsage)
+class RequestUsageAdmin(admin.ModelAdmin):
+    list_filter = ('user', 'date', )
+    date_hierarchy = 'date'
+    list_display = ['user', 'date', 'count']
+
+
 @admin.register(NoteToken)
 class NoteTokenAdmin(admin.ModelAdmin):
     fields = ('user', 'notes', )
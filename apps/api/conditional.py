@@ -0,0 +1,81 @@
+"""
+Conditional GET and caching of the responses of the API.
+
+Partners mostly poll documents which did not change since their last request.
+Views using :class:`ConditionalResponseMixin` therefore send an ``ETag``
+header, which is built from a few cheap values (e.g. the version of a
+questionnaire and the generation of its configuration). If the client already
+has the current version (``If-None-Match``), a ``304 Not Modified`` is
+returned without building the data of the response.
+
+There is no ``Last-Modified`` header (and ``If-Modified-Since`` is ignored):
+not all values of the ETag have a modification time (e.g. a linked
+questionnaire which was unpublished), so a modification date could claim an
+outdated response to be current.
+
+Otherwise, the data of the response is taken from the default cache if
+available. The cache key is derived from the ETag, which includes the API
+version and the language, so changed resources never return outdated data.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from django.utils.translation import get_language
+from rest_framework.response import Response
+
+
+def get_etag(*parts) -> str:
+    """
+    Returns: the (quoted) ETag of the given values.
+    """
+    value = '|'.join(str(part) for part in parts)
+    return quote_etag(hashlib.sha1(value.encode('utf-8')).hexdigest())
+
+
+class ConditionalResponseMixin:
+    """
+    Return 304 responses to conditional requests of unchanged resources and
+    cache the data of the responses.
+
+    Views must implement ``get_validators`` and ``get_response_data`` and
+    return ``self.get_conditional_response(request)`` in their ``get``.
+    """
+
+    def get_validators(self) -> list:
+        """
+        Returns: a list with all values the response depends on (used for the
+        ETag).
+        """
+        raise NotImplementedError
+
+    def get_response_data(self):
+        """
+        Returns: the data of the response, this is only called if the data is
+        not in the cache.
+        """
+        raise NotImplementedError
+
+    def get_conditional_response(self, request):
+        etag = get_etag(
+            self.__class__.__name__, request.version, get_language(),
+            *self.get_validators()
+        )
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response(self.get_cached_response_data(etag))
+
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+        return response
+
+    def get_cached_response_data(self, etag: str):
+        cache_key = 'api_response_{}'.format(etag.strip('"'))
+        data = cache.get(cache_key)
+        if data is None:
+            data = self.get_response_data()
+            cache.set(cache_key, data, settings.API_RESPONSE_CACHE_TIMEOUT)
+        return data
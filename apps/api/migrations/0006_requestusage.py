@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.26 on 2026-10-17 15:20
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def fill_request_usage(apps, schema_editor):
+    RequestLog = apps.get_model('api', 'RequestLog')
+    RequestUsage = apps.get_model('api', 'RequestUsage')
+    usage = RequestLog.objects.annotate(
+        date=TruncDate('access')
+    ).values('user_id', 'date').annotate(count=Count('id')).order_by()
+    RequestUsage.objects.bulk_create(
+        RequestUsage(user_id=row['user_id'], date=row['date'], count=row['count'])
+        for row in usage.iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0005_editrequestlog'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='requestlog',
+            name='access',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.CreateModel(
+            name='RequestUsage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='requestusage',
+            unique_together=set([('user', 'date')]),
+        ),
+        migrations.RunPython(fill_request_usage, migrations.RunPython.noop),
+    ]
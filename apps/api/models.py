@@ -6,6 +6,8 @@ import random
 import requests
 from django.conf import settings
 from django.db import models
+from django.db.models import Sum
+from django.utils import timezone
 
 from requests.exceptions import RequestException
 from rest_framework.authtoken.models import Token
@@ -16,10 +18,12 @@ logger = logging.getLogger(__name__)
 
 class RequestLog(models.Model):
     """
-    Simple model to log requests to the API.
+    Simple model to log requests to the API. The entries are written in
+    batches, see :mod:`api.request_log`.
     """
     user = models.ForeignKey(settings.AUTH_USER_MODEL)
-    access = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add, as the time of the request is kept in the buffer.
+    access = models.DateTimeField(default=timezone.now)
     resource = models.CharField(max_length=100)
 
     class Meta:
@@ -57,6 +61,24 @@ class RequestLog(models.Model):
         #                 '(status: {r.status_code})'.format(r=response))
 
 
+class RequestUsage(models.Model):
+    """
+    Number of requests to the API per user and day, updated with each batch
+    of RequestLogs. Used for the statistics, so the (large) table of the
+    RequestLogs does not need to be counted.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL)
+    date = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['date']
+        unique_together = ('user', 'date')
+
+    def __str__(self):
+        return u"{}: {} ({})".format(self.user, self.count, self.date)
+
+
 class NoteToken(Token):
     """
     Provide info about usage of a token. This is required for statistics of the
@@ -66,7 +88,8 @@ class NoteToken(Token):
 
     @property
     def requests_from_user(self):
-        return self.user.requestlog_set.count()
+        return self.user.requestusage_set.aggregate(
+            total=Sum('count'))['total'] or 0
 
 
 class AppToken(Token):
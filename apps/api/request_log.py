@@ -0,0 +1,185 @@
+"""
+Buffer for the logs of requests to the API (:class:`api.models.RequestLog`).
+
+Partners often query the API in bursts, and writing one row per request
+noticeably added to the write load of the database. The entries are therefore
+collected in the memory of the process and written at once (``bulk_create``)
+when ``API_REQUEST_LOG_BUFFER_SIZE`` entries are collected, when the oldest
+entry is older than ``API_REQUEST_LOG_FLUSH_INTERVAL`` seconds (checked by a
+background thread of each process, also if no further requests arrive), or
+when the process exits. The daily usage per user
+(:class:`api.models.RequestUsage`) is updated with the same write.
+
+Entries which cannot be written (e.g. if the database is not available) are
+kept in the buffer and written with the next flush. If a process is killed
+(e.g. by the harakiri of uwsgi), at most the entries of the last flush
+interval are lost. Note that uwsgi only runs the background thread with
+``enable-threads``.
+"""
+import atexit
+import collections
+import datetime
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import RequestLog, RequestUsage
+
+logger = logging.getLogger(__name__)
+
+
+class RequestLogBuffer:
+    """
+    The (thread safe) buffer of RequestLogs of a process.
+    """
+    # Entries which cannot be written are kept up to this number of buffer
+    # sizes, the oldest entries are dropped first.
+    max_buffer_sizes = 10
+
+    def __init__(self):
+        self.entries = []
+        self.first_added = None
+        self.lock = threading.Lock()
+        self.timer_pid = None
+
+    def add(self, entry: RequestLog):
+        with self.lock:
+            if not self.entries:
+                self.first_added = time.monotonic()
+            self.entries.append(entry)
+            is_due = (
+                len(self.entries) >= settings.API_REQUEST_LOG_BUFFER_SIZE or
+                self.is_interval_over())
+        if is_due:
+            self.flush()
+
+    def is_interval_over(self) -> bool:
+        return self.first_added is not None and (
+            time.monotonic() - self.first_added >=
+            settings.API_REQUEST_LOG_FLUSH_INTERVAL)
+
+    def flush(self) -> int:
+        """
+        Write all buffered entries. If they cannot be written, they are put
+        back to the buffer.
+
+        Returns:
+            ``int``. The number of written entries.
+        """
+        with self.lock:
+            entries, self.entries = self.entries, []
+            self.first_added = None
+        if not entries:
+            return 0
+        try:
+            write_request_logs(entries)
+        except Exception:
+            logger.exception(
+                f'Cannot write {len(entries)} API request logs, they are '
+                f'kept for the next flush.')
+            self.requeue(entries)
+            return 0
+        return len(entries)
+
+    def requeue(self, entries: list):
+        """
+        Put entries which could not be written back to the buffer. They are
+        written after the next flush interval at the earliest.
+        """
+        for entry in entries:
+            # The pk may be set by bulk_create before the transaction was
+            # rolled back.
+            entry.pk = None
+        max_size = settings.API_REQUEST_LOG_BUFFER_SIZE * self.max_buffer_sizes
+        with self.lock:
+            self.entries = (entries + self.entries)[-max_size:]
+            self.first_added = time.monotonic()
+
+    def start_timer(self):
+        """
+        Start the background thread flushing the due entries of this process,
+        if it is not running yet. Threads are not copied when a process is
+        forked (e.g. the workers of uwsgi), so the thread is started per
+        process.
+        """
+        with self.lock:
+            if self.timer_pid == os.getpid():
+                return
+            self.timer_pid = os.getpid()
+        threading.Thread(
+            target=self.run_timer, name='request-log-flush', daemon=True
+        ).start()
+
+    def run_timer(self):
+        while True:
+            time.sleep(settings.API_REQUEST_LOG_FLUSH_INTERVAL)
+            with self.lock:
+                is_due = self.is_interval_over()
+            if is_due:
+                self.flush()
+                # Do not keep a database connection open for this thread.
+                connections.close_all()
+
+
+request_log_buffer = RequestLogBuffer()
+
+
+def log_request(user, resource: str):
+    """
+    Log a request of an (authenticated) user to the API.
+    """
+    request_log_buffer.start_timer()
+    request_log_buffer.add(RequestLog(
+        user=user,
+        resource=resource[:RequestLog._meta.get_field('resource').max_length],
+        access=timezone.now()
+    ))
+
+
+def write_request_logs(entries: list):
+    """
+    Write RequestLogs and add them to the daily usage of their users.
+    """
+    usage = collections.Counter(
+        (entry.user_id, get_local_date(entry.access)) for entry in entries)
+    with transaction.atomic():
+        RequestLog.objects.bulk_create(entries)
+        for (user_id, date), count in usage.items():
+            add_request_usage(user_id, date, count)
+
+
+def get_local_date(value: datetime.datetime) -> datetime.date:
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return value.date()
+
+
+def add_request_usage(user_id: int, date: datetime.date, count: int):
+    """
+    Add requests to the usage of a user on a given day.
+    """
+    usage = RequestUsage.objects.filter(user_id=user_id, date=date)
+    if usage.update(count=F('count') + count):
+        return
+    try:
+        with transaction.atomic():
+            RequestUsage.objects.create(user_id=user_id, date=date, count=count)
+    except IntegrityError:
+        # Created by another process in the meantime.
+        usage.update(count=F('count') + count)
+
+
+def flush_at_exit():
+    try:
+        request_log_buffer.flush()
+    except Exception as e:
+        logger.error(e)
+
+
+atexit.register(flush_at_exit)
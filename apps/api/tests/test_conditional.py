@@ -0,0 +1,82 @@
+import datetime
+from unittest.mock import patch, MagicMock
+
+from django.test import RequestFactory
+from django.utils.http import http_date
+
+from api.conditional import ConditionalResponseMixin, get_etag
+from qcat.tests import TestCase
+
+
+class ItemView(ConditionalResponseMixin):
+
+    def __init__(self, parts):
+        self.parts = parts
+        self.get_response_data = MagicMock(return_value={'foo': 'bar'})
+
+    def get_validators(self):
+        return self.parts
+
+
+@patch('api.conditional.cache')
+class ConditionalResponseMixinTest(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.view = ItemView(parts=[1, 'foo'])
+
+    def get_response(self, view=None, **headers):
+        request = self.factory.get('/en/api/v2/foo/', **headers)
+        request.version = 'v2'
+        return (view or self.view).get_conditional_response(request)
+
+    def test_get_etag(self, mock_cache):
+        self.assertEqual(get_etag(1, 'foo'), get_etag(1, 'foo'))
+        self.assertNotEqual(get_etag(1, 'foo'), get_etag(2, 'foo'))
+        self.assertTrue(get_etag(1).startswith('"'))
+
+    def test_response_headers(self, mock_cache):
+        mock_cache.get.return_value = None
+        response = self.get_response()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'foo': 'bar'})
+        self.assertIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+
+    def test_if_none_match(self, mock_cache):
+        mock_cache.get.return_value = None
+        etag = self.get_response()['ETag']
+        self.view.get_response_data.reset_mock()
+        response = self.get_response(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.view.get_response_data.assert_not_called()
+
+    def test_if_none_match_changed(self, mock_cache):
+        mock_cache.get.return_value = None
+        etag = self.get_response()['ETag']
+        response = self.get_response(
+            view=ItemView(parts=[2, 'foo']), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_if_modified_since_is_ignored(self, mock_cache):
+        mock_cache.get.return_value = None
+        response = self.get_response(HTTP_IF_MODIFIED_SINCE=http_date(
+            datetime.datetime(2030, 1, 1).timestamp()))
+        self.assertEqual(response.status_code, 200)
+        self.view.get_response_data.assert_called_once_with()
+
+    def test_cached_data(self, mock_cache):
+        mock_cache.get.return_value = {'cached': True}
+        response = self.get_response()
+        self.assertEqual(response.data, {'cached': True})
+        self.view.get_response_data.assert_not_called()
+
+    def test_data_is_cached(self, mock_cache):
+        mock_cache.get.return_value = None
+        self.get_response()
+        cache_key = mock_cache.set.call_args[0][0]
+        self.assertEqual(mock_cache.set.call_args[0][1], {'foo': 'bar'})
+        self.get_response(view=ItemView(parts=[2, 'foo']))
+        self.assertNotEqual(mock_cache.set.call_args[0][0], cache_key)
@@ -0,0 +1,120 @@
+from unittest.mock import patch
+
+from django.test.utils import override_settings
+
+from accounts.tests.test_models import create_new_user
+from api.models import NoteToken, RequestLog, RequestUsage
+from api.request_log import RequestLogBuffer, add_request_usage
+from qcat.tests import TestCase
+
+
+class StopTimer(Exception):
+    pass
+
+
+@override_settings(
+    API_REQUEST_LOG_BUFFER_SIZE=3, API_REQUEST_LOG_FLUSH_INTERVAL=60)
+class RequestLogBufferTest(TestCase):
+
+    def setUp(self):
+        self.user = create_new_user()
+        self.buffer = RequestLogBuffer()
+
+    def add(self, resource='foo'):
+        self.buffer.add(RequestLog(user=self.user, resource=resource))
+
+    def test_entries_are_buffered(self):
+        self.add()
+        self.add()
+        self.assertEqual(RequestLog.objects.count(), 0)
+
+    def test_flush_on_size(self):
+        for __ in range(3):
+            self.add()
+        self.assertEqual(RequestLog.objects.count(), 3)
+        self.assertEqual(self.buffer.entries, [])
+
+    @patch('api.request_log.time.monotonic')
+    def test_flush_on_interval(self, mock_monotonic):
+        mock_monotonic.return_value = 100
+        self.add()
+        mock_monotonic.return_value = 161
+        self.add()
+        self.assertEqual(RequestLog.objects.count(), 2)
+
+    def test_flush_updates_usage(self):
+        self.add()
+        self.add()
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(RequestUsage.objects.get(user=self.user).count, 2)
+        self.add()
+        self.buffer.flush()
+        self.assertEqual(RequestUsage.objects.get(user=self.user).count, 3)
+
+    def test_flush_empty(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.buffer.flush(), 0)
+
+    @patch('api.request_log.write_request_logs')
+    def test_failed_flush_keeps_entries(self, mock_write_request_logs):
+        mock_write_request_logs.side_effect = Exception('foo')
+        self.add()
+        self.add()
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(len(self.buffer.entries), 2)
+        mock_write_request_logs.side_effect = None
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(self.buffer.entries, [])
+
+    @patch('api.request_log.write_request_logs')
+    def test_failed_flush_keeps_limited_entries(self, mock_write_request_logs):
+        mock_write_request_logs.side_effect = Exception('foo')
+        self.buffer.max_buffer_sizes = 1
+        for resource in ['foo', 'bar', 'baz', 'qux']:
+            self.add(resource)
+        self.assertEqual(
+            [entry.resource for entry in self.buffer.entries],
+            ['bar', 'baz', 'qux'])
+
+    @patch('api.request_log.connections')
+    @patch('api.request_log.time.monotonic')
+    @patch('api.request_log.time.sleep')
+    def test_timer_flushes_due_entries(
+            self, mock_sleep, mock_monotonic, mock_connections):
+        mock_sleep.side_effect = [None, None, StopTimer()]
+        mock_monotonic.return_value = 100
+        self.add()
+        # The first check is within the interval.
+        mock_monotonic.side_effect = [120, 161]
+        with self.assertRaises(StopTimer):
+            self.buffer.run_timer()
+        self.assertEqual(RequestLog.objects.count(), 1)
+        self.assertEqual(self.buffer.entries, [])
+
+    @patch('api.request_log.threading.Thread')
+    def test_timer_is_started_once(self, mock_thread):
+        self.buffer.start_timer()
+        self.buffer.start_timer()
+        self.assertEqual(mock_thread.return_value.start.call_count, 1)
+
+
+class RequestUsageTest(TestCase):
+
+    def setUp(self):
+        self.user = create_new_user()
+
+    def test_add_request_usage_per_day(self):
+        add_request_usage(self.user.id, '2020-01-01', 2)
+        add_request_usage(self.user.id, '2020-01-01', 3)
+        add_request_usage(self.user.id, '2020-01-02', 1)
+        self.assertEqual(
+            list(RequestUsage.objects.values_list('date', 'count')),
+            [(RequestUsage._meta.get_field('date').to_python('2020-01-01'), 5),
+             (RequestUsage._meta.get_field('date').to_python('2020-01-02'), 1)])
+
+    def test_note_token_requests_from_user(self):
+        token = NoteToken.objects.create(user=self.user, notes='foo')
+        self.assertEqual(token.requests_from_user, 0)
+        add_request_usage(self.user.id, '2020-01-01', 2)
+        add_request_usage(self.user.id, '2020-01-02', 3)
+        self.assertEqual(token.requests_from_user, 5)
@@ -17,6 +17,11 @@ urlpatterns = {
         name='questionnaires-api-detail',
         ),
 
+    url(r'^export/(?P<configuration>[^/]+)/(?P<edition>[^/]+)/$',
+        questionnaire_views.QuestionnaireExportView.as_view(),
+        name='questionnaires-api-export',
+        ),
+
     url(r'^auth/login/$',
         api_views.ObtainAuthToken.as_view(),
         name="api-token-auth"),
@@ -20,7 +20,7 @@ from api.serializers import AppTokenSerializer
 from questionnaire.models import Questionnaire
 from configuration.models import Configuration
 from .models import EditRequestLog
-from .models import RequestLog
+from .request_log import log_request
 
 from datetime import timedelta
 from datetime import datetime
@@ -171,7 +171,8 @@ class SwaggerSchemaView(APIView):
 class LogUserMixin:
     """
     Log requests that access the API to the database, so usage statistics can
-    be created.
+    be created. The logs are buffered and written in batches (see
+    api.request_log).
 
     """
 
@@ -180,10 +181,11 @@ class LogUserMixin:
 
     def finalize_response(self, request, response, *args, **kwargs):
         try:
-            RequestLog(
-                user=request.user,
-                resource=request.build_absolute_uri()
-            ).save()
+            if request.user.is_authenticated:
+                log_request(
+                    user=request.user,
+                    resource=request.build_absolute_uri()
+                )
         # Catch any exception. Logging errors must not result in application
         # errors.
         except Exception as e:
@@ -1,6 +1,39 @@
 from django.contrib import admin
+from django.utils.translation import ugettext_lazy as _
 
-from configuration.models import Project
+from configuration.cache import delete_configuration_cache
+from configuration.models import Configuration, Project
+
+
+@admin.register(Configuration)
+class ConfigurationAdmin(admin.ModelAdmin):
+    """
+    The (read only) representation of
+    :class:`configuration.models.Configuration` in the administration
+    interface. Editions are imported through migrations, the only available
+    action is to invalidate the cached configurations.
+    """
+    list_display = ('code', 'edition', 'created',)
+    list_filter = ('code',)
+    readonly_fields = ('code', 'edition', 'created', 'data',)
+    actions = ['invalidate_cache']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def invalidate_cache(self, request, queryset):
+        for configuration in queryset:
+            delete_configuration_cache(configuration)
+        self.message_user(request, _('Cached configurations invalidated.'))
+    invalidate_cache.short_description = _('Invalidate cached configurations')
 
 
 @admin.register(Project)
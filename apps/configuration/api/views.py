@@ -3,12 +3,16 @@ from django.http import Http404
 from rest_framework.generics import GenericAPIView
 from rest_framework.response import Response
 
+from api.conditional import ConditionalResponseMixin
 from api.views import PermissionMixin, LogUserMixin
+from configuration.cache import get_configuration_generation
 from configuration.structure import ConfigurationStructure
 from configuration.models import Configuration
 
 
-class ConfigurationStructureView(PermissionMixin, LogUserMixin, GenericAPIView):
+class ConfigurationStructureView(
+        ConditionalResponseMixin, PermissionMixin, LogUserMixin,
+        GenericAPIView):
     """
     Get the structure of the configuration of a questionnaire.
 
@@ -22,22 +26,43 @@ class ConfigurationStructureView(PermissionMixin, LogUserMixin, GenericAPIView):
     Optional request params:
 
     ``flat``: If present, the structure will be a flat list of questions.
+
+    Responses contain an ``ETag`` header, use ``If-None-Match`` to only fetch
+    changed structures.
     """
 
-    def get(self, request, *args, **kwargs) -> Response:
-        flat = request.GET.get('flat', False)
+    def get_validators(self) -> list:
+        return [
+            self.configuration.code, self.configuration.edition,
+            self.configuration.created, bool(self.flat),
+            get_configuration_generation(
+                self.configuration.code, self.configuration.edition),
+        ]
 
+    def get_response_data(self) -> list:
         structure_obj = ConfigurationStructure(
-            code=kwargs['code'],
-            edition=kwargs['edition'],
-            flat=flat,
+            code=self.configuration.code,
+            edition=self.configuration.edition,
+            flat=self.flat,
         )
 
         if structure_obj.error:
             # No configuration was found for this code and edition.
             raise Http404()
 
-        return Response(structure_obj.structure)
+        return structure_obj.structure
+
+    def get(self, request, *args, **kwargs) -> Response:
+        self.flat = request.GET.get('flat', False)
+        self.configuration = Configuration.objects.filter(
+            code=kwargs['code'], edition=kwargs['edition']
+        ).first()
+
+        if self.configuration is None:
+            # No configuration was found for this code and edition.
+            raise Http404()
+
+        return self.get_conditional_response(request)
 
 
 class ConfigurationView(PermissionMixin, LogUserMixin, GenericAPIView):
@@ -1,12 +1,40 @@
+import time
+
+from configuration.compiled import (
+    build_configuration,
+    compile_configuration,
+    dump_compiled_configuration,
+    load_compiled_configuration,
+)
+from configuration.conf import settings
 from configuration.models import Configuration
+from configuration.shared_cache import (
+    delete_shared_configuration,
+    get_shared_configuration_stamp,
+    is_shared_cache_active,
+    read_shared_configuration,
+    write_shared_configuration,
+)
 from functools import lru_cache
 
-from django.conf import settings
 from django.core.cache import cache
 from django.utils.translation import get_language
 
 from qcat.decorators import log_memory_usage
 
+# Stamps of the shared cache files the configurations in the lru_cache of this
+# process were built from, by (code, edition).
+shared_cache_stamps = {}
+
+# The last known generation of each configuration and when it was read from
+# the cache, by (code, edition).
+local_generations = {}
+
+# Number of built configurations kept per process if the shared cache is
+# active. The built configurations make up most of the memory of a process,
+# so this (and not the shared blobs) is what reduces the memory usage.
+SHARED_CACHE_LRU_SIZE = 8
+
 
 def get_configuration(code: str, edition: str):
     """
@@ -24,7 +52,13 @@ def get_configuration(code: str, edition: str):
     """
 
     if settings.USE_CACHING:
-        cache_key = get_cache_key(code, edition)
+        generation = get_configuration_generation(code, edition)
+        if is_shared_cache_active():
+            check_shared_cache_stamp(code, edition, generation)
+        cache_key = get_cache_key(code, edition, generation)
+        if is_shared_cache_active():
+            return get_shared_cached_configuration(
+                cache_key=cache_key, code=code, edition=edition)
         configuration = get_cached_configuration(
             cache_key=cache_key, code=code, edition=edition)
         return configuration
@@ -36,21 +70,130 @@ def get_configuration(code: str, edition: str):
 @log_memory_usage
 def get_cached_configuration(cache_key: str, code: str, edition: str):
     """
-    Simple retrieval. If object is not in the lru_cache, use the default cache
-    from django as fallback.
+    Simple retrieval. If object is not in the lru_cache, it is built from the
+    compiled configuration in the current language.
+
+    Only the compiled (language independent) configuration is stored in the
+    default cache from django, the built configuration objects with forms and
+    translations are kept in the lru_cache of the process only.
+    """
+    return build_configuration(get_compiled_configuration(code, edition))
+
+
+@lru_cache(maxsize=SHARED_CACHE_LRU_SIZE)
+@log_memory_usage
+def get_shared_cached_configuration(cache_key: str, code: str, edition: str):
+    """
+    Same as get_cached_configuration, used if the shared cache is active. A
+    miss only decompresses the memory-mapped compiled configuration (no
+    network or database access), so fewer built configurations are kept per
+    process.
+    """
+    return build_configuration(get_compiled_configuration(code, edition))
 
-    @todo: refactor configurations. this is a workaround due to bad performance
-    which caches the configs in two places (memcached and python-threads -->
-    twice the memory usage!). configurations should probably be cached by
-    section or such.
+
+def clear_cached_configurations():
+    """
+    Clear the built configurations (lru_cache) of this process.
+    """
+    get_cached_configuration.cache_clear()
+    get_shared_cached_configuration.cache_clear()
+
+
+def get_compiled_configuration(code: str, edition: str) -> dict:
+    """
+    Return the compiled configuration from the default cache from django (or
+    the shared cache file if ``CONFIGURATION_SHARED_CACHE_PATH`` is set). If
+    it is not found (or was compiled with an older version), it is compiled
+    and added to the cache.
     """
-    configuration = cache.get(cache_key)
+    use_shared_cache = is_shared_cache_active()
+    generation = get_configuration_generation(code, edition)
+    cache_key = get_compiled_cache_key(code, edition, generation)
+    if use_shared_cache:
+        blob = read_shared_configuration(code, edition, generation)
+    else:
+        blob = cache.get(cache_key)
+    compiled = load_compiled_configuration(blob)
 
-    if not configuration:
-        configuration = get_configuration_by_code_edition(code, edition)
-        cache.set(key=cache_key, value=configuration)
+    if compiled is None:
+        configuration_object = Configuration.objects.get(
+            code=code, edition=edition)
+        compiled = compile_configuration(configuration_object)
+        blob = dump_compiled_configuration(compiled)
+        if use_shared_cache:
+            write_shared_configuration(code, edition, generation, blob)
+        else:
+            cache.set(key=cache_key, value=blob)
 
-    return configuration
+    if use_shared_cache:
+        shared_cache_stamps[(code, edition)] = get_shared_configuration_stamp(
+            code, edition, generation)
+
+    return compiled
+
+
+def check_shared_cache_stamp(code: str, edition: str, generation: int):
+    """
+    Clear the lru_cache if the shared cache file of a configuration changed
+    (or was deleted) since the configurations of this process were built.
+    This is a single ``stat`` call per configuration lookup.
+    """
+    key = (code, edition)
+    if key not in shared_cache_stamps:
+        return
+    if shared_cache_stamps[key] != get_shared_configuration_stamp(
+            code, edition, generation):
+        shared_cache_stamps.clear()
+        clear_cached_configurations()
+
+
+def get_configuration_generation(code: str, edition: str) -> int:
+    """
+    Return the generation of a configuration. The generation is stored in the
+    shared cache and is part of all cache keys of the configuration, so
+    increasing it invalidates the configuration for all processes on all
+    hosts.
+
+    To keep this cheap, each process only reads the generation from the cache
+    if it was not checked during the last
+    ``CONFIGURATION_GENERATION_CHECK_INTERVAL`` seconds.
+    """
+    key = (code, edition)
+    now = time.monotonic()
+    local_generation = local_generations.get(key)
+    if local_generation is not None and (
+            now - local_generation[1] <
+            settings.CONFIGURATION_GENERATION_CHECK_INTERVAL):
+        return local_generation[0]
+
+    cache_key = get_generation_cache_key(code, edition)
+    generation = cache.get(cache_key)
+    if generation is None:
+        # Start with the current timestamp, so a counter which was evicted
+        # from the cache never falls back to a generation used before.
+        cache.add(cache_key, int(time.time()), timeout=None)
+        generation = cache.get(cache_key, 0)
+
+    local_generations[key] = (generation, now)
+    return generation
+
+
+def bump_configuration_generation(code: str, edition: str) -> int:
+    """
+    Increase the generation of a configuration, which invalidates all its
+    cached versions in all processes.
+
+    Returns:
+        ``int``. The new generation.
+    """
+    cache_key = get_generation_cache_key(code, edition)
+    # Increase atomically, so concurrent bumps never result in the same
+    # generation.
+    cache.add(cache_key, int(time.time()), timeout=None)
+    generation = cache.incr(cache_key)
+    local_generations.pop((code, edition), None)
+    return generation
 
 
 def get_configuration_by_code_edition(code: str, edition: str):
@@ -65,8 +208,10 @@ def get_configuration_by_code_edition(code: str, edition: str):
 
 def delete_configuration_cache(configuration_object):
     """
-    Delete a configuration object from the cache (incl. lru_cache) if it exists. Also remove all
-    QuestionnaireSections from the cache.
+    Delete a configuration object from the cache (incl. lru_cache) if it
+    exists. The generation of the configuration is increased, which
+    invalidates the configuration in all languages and in all other processes
+    as well.
     cache.clear() is not used, as the cache is shared on some hosts.
 
     Args:
@@ -74,17 +219,24 @@ def delete_configuration_cache(configuration_object):
         configuration object whose configuration is to be deleted.
     """
     if settings.USE_CACHING:
-        cache_key = get_cache_key(
-            configuration_object.code, configuration_object.edition)
-        cache.delete(cache_key)
-        get_cached_configuration.cache_clear()
+        code = configuration_object.code
+        edition = configuration_object.edition
+        generation = get_configuration_generation(code, edition)
+        cache.delete(get_compiled_cache_key(code, edition, generation))
+        bump_configuration_generation(code, edition)
+        if is_shared_cache_active():
+            delete_shared_configuration(code, edition)
+            shared_cache_stamps.clear()
+        clear_cached_configurations()
 
 
-def get_cache_key(configuration_code: str, edition: str) -> str:
+def get_cache_key(
+        configuration_code: str, edition: str, generation: int) -> str:
     """
     Return the key under which a given configuration is stored in the
     cache. Currently, the key is composed as:
-    ``[configuration_code]_[locale]``, for example ``technologies_en``.
+    ``[configuration_code]_[edition]_[generation]_[locale]``, for example
+    ``technologies_2018_1_en``.
 
     Args:
         ``configuration_code`` (str): The code of the configuration
@@ -92,4 +244,24 @@ def get_cache_key(configuration_code: str, edition: str) -> str:
     Returns:
         ``str``. The key for the cache.
     """
-    return '{}_{}_{}'.format(configuration_code, edition, get_language())
+    return '{}_{}_{}_{}'.format(
+        configuration_code, edition, generation, get_language())
+
+
+def get_compiled_cache_key(
+        configuration_code: str, edition: str, generation: int) -> str:
+    """
+    Return the key under which the compiled configuration is stored in the
+    cache. As compiled configurations are language independent, the key is
+    composed as: ``compiled_[configuration_code]_[edition]_[generation]``,
+    for example ``compiled_technologies_2018_1``.
+    """
+    return 'compiled_{}_{}_{}'.format(configuration_code, edition, generation)
+
+
+def get_generation_cache_key(configuration_code: str, edition: str) -> str:
+    """
+    Return the key under which the generation of a configuration is stored
+    in the cache.
+    """
+    return 'generation_{}_{}'.format(configuration_code, edition)
@@ -0,0 +1,206 @@
+"""
+A compiled configuration is a plain-data (JSON serializable) representation of
+all the database rows needed to build a ``QuestionnaireConfiguration``: the
+data of the ``Configuration`` itself and the ``Category``, ``Questiongroup``,
+``Key``, ``Value`` and ``Translation`` rows it references.
+
+It does not contain any translated labels, only the original (English) msgids
+stored in the ``Translation`` rows. It is therefore valid for all languages and
+can be cached once per code and edition. The actual configuration is built
+from it in the currently active language without querying the database. The
+labels are looked up in the translation tables (see
+``Translation.fill_translation_tables``), which are filled once per language.
+"""
+import json
+import zlib
+
+from django.utils.dateparse import parse_datetime
+
+from configuration.loader import ConfigurationLookup
+from configuration.models import (
+    Category,
+    Configuration,
+    Key,
+    Questiongroup,
+    Translation,
+    Value,
+)
+
+# Increase this number whenever the format of the compiled configuration
+# changes. Blobs with a different version are discarded and compiled again.
+COMPILED_CONFIGURATION_VERSION = 1
+
+
+def compile_configuration(configuration_object: Configuration) -> dict:
+    """
+    Compile a configuration to plain data.
+
+    Args:
+        configuration_object: The database configuration object.
+
+    Returns:
+        dict. The compiled configuration.
+    """
+    lookup = ConfigurationLookup(configuration_object.data)
+    categories = lookup.objects.get(Category, {}).values()
+    questiongroups = lookup.objects.get(Questiongroup, {}).values()
+    keys = lookup.objects.get(Key, {}).values()
+
+    translations = {}
+    values = {}
+
+    def add_translation(translation):
+        if translation is not None:
+            translations[translation.id] = {
+                'id': translation.id,
+                'translation_type': translation.translation_type,
+                'data': translation.data,
+            }
+            return translation.id
+        return None
+
+    compiled_keys = []
+    for key in keys:
+        value_ids = []
+        for value in key.values.all():
+            values[value.id] = {
+                'id': value.id,
+                'keyword': value.keyword,
+                'order_value': value.order_value,
+                'configuration': value.configuration,
+                'translation': add_translation(value.translation),
+            }
+            value_ids.append(value.id)
+        compiled_keys.append({
+            'id': key.id,
+            'keyword': key.keyword,
+            'configuration': key.configuration,
+            'translation': add_translation(key.translation),
+            'values': value_ids,
+        })
+
+    return {
+        'version': COMPILED_CONFIGURATION_VERSION,
+        'configuration': {
+            'id': configuration_object.id,
+            'code': configuration_object.code,
+            'edition': configuration_object.edition,
+            'created': configuration_object.created.isoformat(),
+            'data': configuration_object.data,
+        },
+        'categories': [{
+            'id': category.id,
+            'keyword': category.keyword,
+            'translation': add_translation(category.translation),
+        } for category in categories],
+        'questiongroups': [{
+            'id': questiongroup.id,
+            'keyword': questiongroup.keyword,
+            'configuration': questiongroup.configuration,
+            'translation': add_translation(questiongroup.translation),
+        } for questiongroup in questiongroups],
+        'keys': compiled_keys,
+        'values': list(values.values()),
+        'translations': list(translations.values()),
+    }
+
+
+def dump_compiled_configuration(compiled: dict) -> bytes:
+    """
+    Return the compiled configuration as compressed blob.
+    """
+    return zlib.compress(
+        json.dumps(compiled, separators=(',', ':')).encode('utf-8'))
+
+
+def load_compiled_configuration(blob) -> dict:
+    """
+    Return the compiled configuration of a blob, or None if the blob is not
+    valid or was compiled with a different version.
+    """
+    try:
+        compiled = json.loads(zlib.decompress(blob).decode('utf-8'))
+    except (TypeError, ValueError, zlib.error):
+        return None
+    if not isinstance(compiled, dict) or compiled.get(
+            'version') != COMPILED_CONFIGURATION_VERSION:
+        return None
+    return compiled
+
+
+def get_lookup(compiled: dict) -> ConfigurationLookup:
+    """
+    Return a ConfigurationLookup populated with (unsaved) model instances
+    created from the compiled configuration.
+    """
+    translations = {
+        t['id']: Translation(**t) for t in compiled['translations']}
+
+    values = {}
+    for v in compiled['values']:
+        values[v['id']] = Value(
+            id=v['id'], keyword=v['keyword'], order_value=v['order_value'],
+            configuration=v['configuration'],
+            translation=translations[v['translation']])
+
+    keys = {}
+    for k in compiled['keys']:
+        key = Key(
+            id=k['id'], keyword=k['keyword'], configuration=k['configuration'],
+            translation=translations[k['translation']])
+        # Mimic the result of prefetch_related, so key.values.all() does not
+        # hit the database.
+        key_values = Value.objects.all()
+        key_values._result_cache = [values[i] for i in k['values']]
+        key_values._prefetch_done = True
+        key._prefetched_objects_cache = {'values': key_values}
+        keys[key.keyword] = key
+
+    lookup = ConfigurationLookup()
+    lookup.objects = {
+        Category: {
+            c['keyword']: Category(
+                id=c['id'], keyword=c['keyword'],
+                translation=translations[c['translation']])
+            for c in compiled['categories']
+        },
+        Questiongroup: {
+            q['keyword']: Questiongroup(
+                id=q['id'], keyword=q['keyword'],
+                configuration=q['configuration'],
+                translation=translations.get(q['translation']))
+            for q in compiled['questiongroups']
+        },
+        Key: keys,
+    }
+    return lookup
+
+
+def get_configuration_object(compiled: dict) -> Configuration:
+    """
+    Return an (unsaved) Configuration instance of the compiled configuration.
+    """
+    configuration = dict(compiled['configuration'])
+    configuration['created'] = parse_datetime(configuration['created'])
+    return Configuration(**configuration)
+
+
+def build_configuration(compiled: dict):
+    """
+    Build the QuestionnaireConfiguration of a compiled configuration in the
+    currently active language.
+
+    Returns:
+        ``QuestionnaireConfiguration``
+    """
+    from configuration.configuration import QuestionnaireConfiguration
+    # Look up the translations of all labels at once, the configuration then
+    # only reads them from the translation table.
+    Translation.fill_translation_tables(
+        [Translation(**t) for t in compiled['translations']],
+        configuration=compiled['configuration']['code'],
+        edition=compiled['configuration']['edition'])
+    return QuestionnaireConfiguration(
+        compiled['configuration']['code'],
+        configuration_object=get_configuration_object(compiled),
+        lookup=get_lookup(compiled))
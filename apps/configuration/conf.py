@@ -260,3 +260,7 @@ class ConfigurationConf(AppConf):
     }
 
     CACHE_KEY_INSTITUTION_SELECT = 'institutions_select'
+
+    # Seconds during which a process uses its last known generation of a
+    # configuration before checking the shared cache again.
+    GENERATION_CHECK_INTERVAL = 10
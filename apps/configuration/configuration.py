@@ -15,6 +15,7 @@ from configuration.models import (
     Configuration,
     Key,
     Questiongroup)
+from configuration.loader import ConfigurationLookup
 from configuration.utils import get_choices_from_model, get_choices_from_questiongroups
 from qcat.errors import (
     ConfigurationError,
@@ -32,6 +33,13 @@ from .fields import XMLCompatCharField
 
 User = get_user_model()
 
+# Note that path and label need to appear first so they can be used as select
+# options.
+FilterKey = collections.namedtuple(
+    'FilterKey',
+    ['path', 'label', 'order', 'key', 'questiongroup', 'filter_type',
+     'section_label'])
+
 
 class BaseConfigurationObject(object):
     """
@@ -71,27 +79,23 @@ class BaseConfigurationObject(object):
                 'keyword', 'str', self.name_current)
         self.keyword = keyword
 
+        # The lookup is shared by all objects of a configuration. Objects
+        # created on their own (without a QuestionnaireConfiguration as root)
+        # use an empty lookup, which queries the database directly.
+        lookup = getattr(parent_object, 'lookup', None)
+        if not isinstance(lookup, ConfigurationLookup):
+            lookup = ConfigurationLookup()
+        self.lookup = lookup
+
         if isinstance(self, (
                 QuestionnaireSection, QuestionnaireCategory,
                 QuestionnaireSubcategory)):
-            try:
-                self.configuration_object = Category.objects.get(
-                    keyword=self.keyword)
-            except Category.DoesNotExist:
-                raise ConfigurationErrorNotInDatabase(Category, self.keyword)
+            self.configuration_object = lookup.get(Category, self.keyword)
         elif isinstance(self, QuestionnaireQuestiongroup):
-            try:
-                self.configuration_object = Questiongroup.objects.get(
-                    keyword=self.keyword)
-            except Questiongroup.DoesNotExist:
-                raise ConfigurationErrorNotInDatabase(
-                    Questiongroup, self.keyword)
+            self.configuration_object = lookup.get(
+                Questiongroup, self.keyword)
         elif isinstance(self, QuestionnaireQuestion):
-            try:
-                self.configuration_object = Key.objects.get(
-                    keyword=self.keyword)
-            except Key.DoesNotExist:
-                raise ConfigurationErrorNotInDatabase(Key, self.keyword)
+            self.configuration_object = lookup.get(Key, self.keyword)
         else:
             raise Exception('Unknown instance')
 
@@ -1120,6 +1124,11 @@ class QuestionnaireQuestiongroup(BaseConfigurationObject):
         super(QuestionnaireQuestiongroup, self).__init__(
             parent_object, configuration)
         self.questions = self.children
+        # Index of the questions by their keyword. If a keyword appears more
+        # than once, the first question is used.
+        self.questions_by_keyword = {}
+        for question in self.questions:
+            self.questions_by_keyword.setdefault(question.keyword, question)
 
         self.configuration = self.configuration_object.configuration
 
@@ -1342,10 +1351,7 @@ class QuestionnaireQuestiongroup(BaseConfigurationObject):
             view_template, template_values)
 
     def get_question_by_key_keyword(self, key_keyword):
-        for question in self.questions:
-            if question.keyword == key_keyword:
-                return question
-        return None
+        return self.questions_by_keyword.get(key_keyword)
 
     def get_top_subcategory(self):
         """
@@ -2208,13 +2214,25 @@ class QuestionnaireConfiguration(BaseConfigurationObject):
     name_children = 'sections'
     Child = QuestionnaireSection
 
-    def __init__(self, keyword, configuration_object=None):
+    def __init__(self, keyword, configuration_object=None, lookup=None):
         self.keyword = keyword
         self.configuration_keyword = keyword
         self.sections = []
         self.modules = []
         self.inherited_data = {}
+        self.questiongroup_list = []
+        self.questiongroups_by_keyword = {}
+        self.questions_by_keyword = {}
+        self.list_configuration = []
+        self.name_keywords = (None, None)
+        self.geometry_keywords = (None, None)
+        self.filter_keys = []
+        self.user_fields = []
         self.configuration_object = configuration_object
+        # An optional, already populated ConfigurationLookup (e.g. of a
+        # compiled configuration). If not set, it is created when reading the
+        # configuration.
+        self.lookup = lookup
         if self.configuration_object is None:
             # read_configuration will handle errors if it does not exist
             with contextlib.suppress(Configuration.DoesNotExist):
@@ -2270,31 +2288,13 @@ class QuestionnaireConfiguration(BaseConfigurationObject):
         return None
 
     def get_questiongroups(self):
-        def unnest_questiongroups(nested):
-            ret = []
-            try:
-                for child in nested.children:
-                    if not isinstance(child, QuestionnaireQuestiongroup):
-                        ret.extend(unnest_questiongroups(child))
-                    else:
-                        ret.append(child)
-            except AttributeError:
-                pass
-            return ret
-        return unnest_questiongroups(self)
+        return list(self.questiongroup_list)
 
     def get_questiongroup_by_keyword(self, keyword):
-        for questiongroup in self.get_questiongroups():
-            if questiongroup.keyword == keyword:
-                return questiongroup
-        return None
+        return self.questiongroups_by_keyword.get(keyword)
 
     def get_question_by_keyword(self, questiongroup_keyword, keyword):
-        questiongroup = self.get_questiongroup_by_keyword(
-            questiongroup_keyword)
-        if questiongroup is not None:
-            return questiongroup.get_question_by_key_keyword(keyword)
-        return None
+        return self.questions_by_keyword.get((questiongroup_keyword, keyword))
 
     def get_completeness(self, data):
         """
@@ -2387,13 +2387,17 @@ class QuestionnaireConfiguration(BaseConfigurationObject):
                     image_questiongroups.extend(
                         data.get(questiongroup.keyword))
 
+        # Query the data of all images at once.
+        files_data = File.get_data_by_uids(
+            image.get('image') for image in image_questiongroups)
+
         images = []
         for image in image_questiongroups:
             # Maybe it is not a real image (e.g. maps can also be uploaded as
             # images)
             if image.get('image') is None:
                 continue
-            image_data = File.get_data(uid=image.get('image'))
+            image_data = files_data.get(str(image.get('image')), {})
             images.append({
                 'image': image_data.get('url'),
                 'interchange': image_data.get('interchange'),
@@ -2419,28 +2423,32 @@ class QuestionnaireConfiguration(BaseConfigurationObject):
         Returns:
             List of FilterKey named tuples.
         """
-        # Note that path and label need to appear first so they can be used as
-        # select options.
-        FilterKey = collections.namedtuple(
-            'FilterKey',
-            ['path', 'label', 'order', 'key', 'questiongroup', 'filter_type',
-             'section_label'])
-        filter_keys = []
-        for questiongroup in self.get_questiongroups():
-            for question in questiongroup.questions:
-                if question.filter_options and question.filter_options.get('order') is not None:
-                    section = questiongroup.get_top_subcategory().parent_object
-                    filter_keys.append(FilterKey(
-                        path=f'{questiongroup.keyword}__{question.keyword}',
-                        label=question.label_filter,
-                        order=question.filter_options.get('order'),
-                        key=question.keyword,
-                        questiongroup=questiongroup.keyword,
-                        filter_type=question.field_type,
-                        section_label=section.label))
-        return sorted(filter_keys, key=lambda k: k.order)
+        return list(self.filter_keys)
+
+    def get_list_image_uids(self, questionnaire_data_list):
+        """
+        Return the UIDs of all images which may appear in the list
+        representation of the given questionnaires.
 
-    def get_list_data(self, questionnaire_data_list):
+        Args:
+            ``questionnaire_data_list`` (list): A list of Questionnaire
+            data dicts.
+
+        Returns:
+            ``set``. The UIDs of the images.
+        """
+        uids = set()
+        for questionnaire_data in questionnaire_data_list:
+            for list_entry in self.list_configuration:
+                if list_entry[2] != 'image':
+                    continue
+                for question_data in questionnaire_data.get(list_entry[0], []):
+                    value = question_data.get(list_entry[1])
+                    if value:
+                        uids.add(str(value))
+        return uids
+
+    def get_list_data(self, questionnaire_data_list, files_data=None):
         """
         Get the data for the list representation of questionnaires.
         Which questions are shown depends largely on the option
@@ -2450,24 +2458,25 @@ class QuestionnaireConfiguration(BaseConfigurationObject):
             ``questionnaire_data_list`` (list): A list of Questionnaire
             data dicts.
 
+        Kwargs:
+            ``files_data`` (dict): The data of the images by UID, as
+            returned by :func:`questionnaire.models.File.get_data_by_uids`.
+            If not provided, the images of all questionnaires are queried
+            at once.
+
         Returns:
             ``list``. A list of dicts. A dict containing the keys and
             values to be appearing in the list. The values are not
             translated.
         """
-        # Collect which keys are to be shown in the list.
-        list_configuration = []
-        for questiongroup in self.get_questiongroups():
-            for question in questiongroup.questions:
-                if question.in_list is True:
-                    list_configuration.append((
-                        questiongroup.keyword, question.keyword,
-                        question.field_type))
+        if files_data is None:
+            files_data = File.get_data_by_uids(
+                self.get_list_image_uids(questionnaire_data_list))
 
         questionnaire_value_list = []
         for questionnaire_data in questionnaire_data_list:
             questionnaire_value = {}
-            for list_entry in list_configuration:
+            for list_entry in self.list_configuration:
                 for question_data in questionnaire_data.get(list_entry[0], []):
                     key = list_entry[1]
                     value = question_data.get(list_entry[1])
@@ -2476,7 +2485,7 @@ class QuestionnaireConfiguration(BaseConfigurationObject):
                         if questionnaire_value.get(key):
                             # If there is already an image, do not add it again
                             continue
-                        image_data = File.get_data(uid=value)
+                        image_data = files_data.get(str(value), {})
                         interchange_list = image_data.get('interchange_list')
                         if interchange_list:
                             value = interchange_list[0][0]
@@ -2486,10 +2495,8 @@ class QuestionnaireConfiguration(BaseConfigurationObject):
                         # Look up the labels for the predefined values
                         if not isinstance(value, list):
                             value = [value]
-                        qg = self.get_questiongroup_by_keyword(list_entry[0])
-                        if qg is None:
-                            break
-                        k = qg.get_question_by_key_keyword(list_entry[1])
+                        k = self.get_question_by_keyword(
+                            list_entry[0], list_entry[1])
                         if k is None:
                             break
                         values = k.lookup_choices_labels_by_keywords(value)
@@ -2534,14 +2541,7 @@ class QuestionnaireConfiguration(BaseConfigurationObject):
         contain the name of the questionnaire as defined in the
         configuration by the ``is_name`` parameter.
         """
-        question_keyword = None
-        questiongroup_keyword = None
-        for questiongroup in self.get_questiongroups():
-            for question in questiongroup.questions:
-                if question.is_name is True:
-                    question_keyword = question.keyword
-                    questiongroup_keyword = questiongroup.keyword
-        return question_keyword, questiongroup_keyword
+        return self.name_keywords
 
     def get_geometry_keywords(self):
         """
@@ -2549,14 +2549,7 @@ class QuestionnaireConfiguration(BaseConfigurationObject):
         contain the name of the questionnaire as defined in the
         configuration by the ``is_geometry`` parameter.
         """
-        question_keyword = None
-        questiongroup_keyword = None
-        for questiongroup in self.get_questiongroups():
-            for question in questiongroup.questions:
-                if question.is_geometry is True:
-                    question_keyword = question.keyword
-                    questiongroup_keyword = questiongroup.keyword
-        return question_keyword, questiongroup_keyword
+        return self.geometry_keywords
 
     def get_description_keywords(self, keys):
         """
@@ -2634,18 +2627,78 @@ class QuestionnaireConfiguration(BaseConfigurationObject):
         [2]: key keyword (displayname)
         [3]: user role
         """
+        return list(self.user_fields)
+
+    def build_indexes(self):
+        """
+        Walk the configuration once and build the indexes used by the
+        accessors (e.g. ``get_questiongroup_by_keyword``,
+        ``get_filter_keys``). If a keyword appears more than once, the first
+        questiongroup is used (``is_name`` and ``is_geometry``: the last
+        question).
+        """
+        def unnest_questiongroups(nested):
+            ret = []
+            try:
+                for child in nested.children:
+                    if not isinstance(child, QuestionnaireQuestiongroup):
+                        ret.extend(unnest_questiongroups(child))
+                    else:
+                        ret.append(child)
+            except AttributeError:
+                pass
+            return ret
+        self.questiongroup_list = unnest_questiongroups(self)
+
+        questiongroups_by_keyword = {}
+        questions_by_keyword = {}
+        list_configuration = []
+        filter_keys = []
         user_fields = []
-        for questiongroup in self.get_questiongroups():
+        name_keywords = (None, None)
+        geometry_keywords = (None, None)
+        for questiongroup in self.questiongroup_list:
+            questiongroups_by_keyword.setdefault(
+                questiongroup.keyword, questiongroup)
             user_role = questiongroup.form_options.get('user_role')
-            if user_role is None:
-                continue
             for question in questiongroup.questions:
-                if question.field_type != 'user_id':
-                    continue
-                user_fields.append(
-                    (questiongroup.keyword, question.keyword,
+                questions_by_keyword.setdefault(
+                    (questiongroup.keyword, question.keyword),
+                    questiongroups_by_keyword[
+                        questiongroup.keyword].get_question_by_key_keyword(
+                        question.keyword))
+                if question.in_list is True:
+                    list_configuration.append((
+                        questiongroup.keyword, question.keyword,
+                        question.field_type))
+                if question.is_name is True:
+                    name_keywords = (question.keyword, questiongroup.keyword)
+                if question.is_geometry is True:
+                    geometry_keywords = (
+                        question.keyword, questiongroup.keyword)
+                if question.filter_options and question.filter_options.get(
+                        'order') is not None:
+                    section = questiongroup.get_top_subcategory().parent_object
+                    filter_keys.append(FilterKey(
+                        path=f'{questiongroup.keyword}__{question.keyword}',
+                        label=question.label_filter,
+                        order=question.filter_options.get('order'),
+                        key=question.keyword,
+                        questiongroup=questiongroup.keyword,
+                        filter_type=question.field_type,
+                        section_label=section.label))
+                if user_role is not None and question.field_type == 'user_id':
+                    user_fields.append((
+                        questiongroup.keyword, question.keyword,
                         question.form_options.get('display_field'), user_role))
-        return user_fields
+
+        self.questiongroups_by_keyword = questiongroups_by_keyword
+        self.questions_by_keyword = questions_by_keyword
+        self.list_configuration = list_configuration
+        self.filter_keys = sorted(filter_keys, key=lambda k: k.order)
+        self.user_fields = user_fields
+        self.name_keywords = name_keywords
+        self.geometry_keywords = geometry_keywords
 
     def read_configuration(self):
         """
@@ -2679,9 +2732,17 @@ class QuestionnaireConfiguration(BaseConfigurationObject):
         validate_type(
             conf_sections, list, 'sections', 'list of dicts', '-')
 
-        for conf_section in conf_sections:
-            self.sections.append(QuestionnaireSection(self, conf_section))
+        # Fetch all database objects of the configuration at once, they are
+        # handed to the configuration objects through the lookup.
+        if self.lookup is None or not self.lookup.objects:
+            self.lookup = ConfigurationLookup(self.configuration)
+        try:
+            for conf_section in conf_sections:
+                self.sections.append(QuestionnaireSection(self, conf_section))
+        finally:
+            self.lookup.clear()
         self.children = self.sections
+        self.build_indexes()
 
         self.modules = self.configuration.get('modules', [])
 
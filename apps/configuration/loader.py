@@ -0,0 +1,111 @@
+import copy
+
+from django.db.models import Prefetch
+
+from configuration.models import Category, Key, Questiongroup, Value
+from qcat.errors import ConfigurationErrorNotInDatabase
+
+
+class ConfigurationLookup:
+    """
+    Lookup context for building a ``QuestionnaireConfiguration``.
+
+    All ``Category``, ``Questiongroup`` and ``Key`` rows (including their
+    ``Translation`` and ``Value`` objects) referenced in the data of a
+    configuration are fetched with a few bulk queries. The configuration
+    objects then retrieve their database object from this lookup instead of
+    querying the database for each node.
+
+    Keywords which are not part of the prefetched rows (e.g. when building
+    single configuration objects) are still queried individually.
+    """
+
+    # Map the name of the nested lists in the configuration JSON to the model
+    # representing its elements.
+    models_by_level = {
+        'sections': Category,
+        'categories': Category,
+        'subcategories': Category,
+        'questiongroups': Questiongroup,
+        'questions': Key,
+    }
+
+    def __init__(self, data: dict = None):
+        self.objects = {}
+        if data:
+            self.load(data)
+
+    def load(self, data: dict):
+        """
+        Collect all keywords of the configuration data and fetch the
+        corresponding rows from the database.
+
+        Args:
+            data: The data (JSON) of a ``configuration.models.Configuration``.
+        """
+        keywords = {model: set() for model in self.models_by_level.values()}
+        self.collect_keywords(data, keywords)
+
+        querysets = {
+            Category: Category.objects.select_related('translation'),
+            Questiongroup: Questiongroup.objects.select_related('translation'),
+            Key: Key.objects.select_related('translation').prefetch_related(
+                Prefetch(
+                    'values',
+                    queryset=Value.objects.select_related('translation'))),
+        }
+        for model, model_keywords in keywords.items():
+            if not model_keywords:
+                continue
+            self.objects[model] = {
+                obj.keyword: obj for obj in
+                querysets[model].filter(keyword__in=model_keywords)
+            }
+
+    def collect_keywords(self, configuration: dict, keywords: dict):
+        """
+        Recursively walk the nested configuration and add the keywords of all
+        elements to the set of their model.
+        """
+        if not isinstance(configuration, dict):
+            return
+        for level, model in self.models_by_level.items():
+            children = configuration.get(level)
+            if not isinstance(children, list):
+                continue
+            for child in children:
+                if not isinstance(child, dict):
+                    continue
+                keyword = child.get('keyword')
+                if isinstance(keyword, str):
+                    keywords[model].add(keyword)
+                self.collect_keywords(child, keywords)
+
+    def get(self, model, keyword: str):
+        """
+        Return the database object of a model by its keyword.
+
+        The configuration objects update the ``configuration`` JSON of their
+        database objects in place. As the same keyword can appear several
+        times in a configuration, a copy of the prefetched object is returned.
+
+        Raises:
+            ``ConfigurationErrorNotInDatabase``
+        """
+        obj = self.objects.get(model, {}).get(keyword)
+        if obj is None:
+            try:
+                return model.objects.get(keyword=keyword)
+            except model.DoesNotExist:
+                raise ConfigurationErrorNotInDatabase(model, keyword)
+
+        obj = copy.copy(obj)
+        if hasattr(obj, 'configuration'):
+            obj.configuration = copy.deepcopy(obj.configuration)
+        return obj
+
+    def clear(self):
+        """
+        Release the prefetched objects once the configuration is built.
+        """
+        self.objects = {}
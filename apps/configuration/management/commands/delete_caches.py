@@ -6,9 +6,33 @@ from configuration.models import Configuration
 
 class Command(BaseCommand):
     """
-    This command deletes all configuration caches.
+    This command deletes all configuration caches. The cache generation of
+    the configurations is increased, which invalidates their cached versions
+    in all processes on all hosts.
     """
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--code',
+            default=None,
+            dest='code',
+            help='Only delete the caches of configurations with this code '
+                 '(e.g. technologies).'
+        )
+        parser.add_argument(
+            '--edition',
+            default=None,
+            dest='edition',
+            help='Only delete the caches of configurations with this edition '
+                 '(e.g. 2018).'
+        )
+
     def handle(self, **options):
         active_configurations = Configuration.objects.all()
+        if options['code']:
+            active_configurations = active_configurations.filter(
+                code=options['code'])
+        if options['edition']:
+            active_configurations = active_configurations.filter(
+                edition=options['edition'])
         for configuration in active_configurations:
             delete_configuration_cache(configuration)
@@ -9,11 +9,22 @@ from django.core.exceptions import ValidationError
 from django.contrib.postgres.fields import JSONField
 from django.db.models import Q
 from django.utils.functional import cached_property
-from django.utils.translation import pgettext_lazy, get_language, activate, \
+from django.utils.translation import pgettext, get_language, activate, \
     ugettext as _
 
 from .conf import settings
 
+# Translated texts by (configuration, edition, language), each a dict of the
+# translations by (keyword, text). The gettext catalogs do not change while
+# the process is running and the original text is part of the key, so the
+# entries never need to be invalidated.
+translation_tables = {}
+
+
+def get_translation_table(
+        configuration: str, edition: str, language: str) -> dict:
+    return translation_tables.setdefault((configuration, edition, language), {})
+
 
 VALUEUSER_RELATIONS = (
     (settings.CONFIGURATION_VALUEUSER_UNCCD, _('UNCCD Focal Point')),
@@ -148,6 +159,32 @@ class Translation(models.Model):
                 'Translation.translation_type needs to be one of: {}'.format(
                     ', '.join(valid_types)))
 
+    def get_text(self, keyword, configuration='wocat', edition=''):
+        """
+        Return the original (English) text of a keyword, which is the msgid
+        of its translations. The texts are searched in the edition of the
+        configuration, the configuration and the wocat configuration.
+        """
+        return self.data.get(
+            f'{configuration}_{edition}',
+            self.data.get(configuration, self.data.get('wocat', {}))
+        ).get(
+            keyword, {}
+        ).get('en')
+
+    def get_texts(self, configuration='wocat', edition='') -> dict:
+        """
+        Return the original texts of all keywords (see :func:`get_text`).
+        """
+        texts = self.data.get(
+            f'{configuration}_{edition}',
+            self.data.get(configuration, self.data.get('wocat', {})))
+        if not isinstance(texts, dict):
+            return {}
+        return {
+            keyword: entry.get('en') for keyword, entry in texts.items()
+            if isinstance(entry, dict) and entry.get('en')}
+
     def get_translation(self, keyword, configuration='wocat', locale=None, edition=''):
         """
         Return the translation of the instance by looking it up in the
@@ -163,6 +200,15 @@ class Translation(models.Model):
             * wocat > locale
             * wocat > default_locale
 
+        Translations are looked up only once per process and kept in the
+        translation table of the configuration, edition and locale (see
+        :func:`fill_translation_tables` to fill them at once).
+
+        The currently active locale is treated like any other locale: the
+        edition and wocat contexts are used as fallback, '%' signs are
+        escaped for the lookup and the translation is returned as string (not
+        lazily).
+
         Args:
             ``keyword`` (str): The keyword of the translation.
 
@@ -176,49 +222,97 @@ class Translation(models.Model):
             ``str`` or ``None``. The translation or ``None`` if no entry
             for the given locale was not found.
         """
-        text = self.data.get(
-            f'{configuration}_{edition}',
-            self.data.get(configuration, self.data.get('wocat', {}))
-        ).get(
-            keyword, {}
-        ).get('en')
-
+        text = self.get_text(keyword, configuration, edition)
         if not text:
             return None
 
+        current_language = get_language()
+        locale = locale or current_language
+        table = get_translation_table(configuration, edition, locale)
+        translated = table.get((keyword, text))
+        if translated is None:
+            if locale != current_language:
+                # Get translation in requested language and restore current
+                # lang.
+                activate(locale)
+                try:
+                    translated = self.translate_text(
+                        text, keyword, configuration, edition)
+                finally:
+                    activate(current_language)
+            else:
+                translated = self.translate_text(
+                    text, keyword, configuration, edition)
+            table[(keyword, text)] = translated
+        return translated
+
+    @staticmethod
+    def translate_text(text, keyword, configuration='wocat', edition=''):
+        """
+        Translate a text to the currently active language.
+        """
         # When creating the values, the configuration and keyword was used as
         # context. Recreate this.
-        context = f'{configuration} {keyword}'
-        fallback_context = 'wocat {}'.format(keyword)
+        # '%' signs are escaped in gettext using double '%%', in order for
+        # the translation to be found, it is necessary to do this as well
+        # (and reverse it again).
+        msgid = text.replace('%', '%%')
+        translated = pgettext(f'{configuration} {keyword}', msgid)
+
+        # It is possible that the translation was not found because in newer
+        # editions, the context also contains the edition,
+        # e.g. "technologies_2018 label"
+        if translated == msgid and configuration != 'wocat':
+            translated = pgettext(f'{configuration}_{edition} {keyword}', msgid)
+
+        if translated == msgid and configuration != 'wocat':
+            # TODO: Find a better way to handle "wocat" translations
+            # For "global" keys and values (eg. countries), the translation
+            # is stored in context "wocat". Therefore, if no translation is
+            # found for the current context, try to find a translation in
+            # the "wocat" context.
+            translated = pgettext(f'wocat {keyword}', msgid)
+        return translated.replace('%%', '%')
 
+    @staticmethod
+    def fill_translation_tables(
+            translations, configuration='wocat', edition='', locale=None):
+        """
+        Look up all texts of the given translations at once and store them in
+        the translation table of the configuration, edition and locale. This
+        switches the language (if necessary) only once.
+
+        Args:
+            ``translations`` (iterable): Translation instances.
+
+        Kwargs:
+            ``configuration`` (str): The keyword of the configuration.
+
+            ``edition`` (str): The edition of the configuration.
+
+            ``locale`` (str): The locale, defaults to the active one.
+        """
         current_language = get_language()
+        locale = locale or current_language
+        table = get_translation_table(configuration, edition, locale)
+        missing = set()
+        for translation in translations:
+            missing.update(
+                (keyword, text) for keyword, text in translation.get_texts(
+                    configuration, edition).items()
+                if (keyword, text) not in table)
+        if not missing:
+            return
+
         if locale != current_language:
-            # Get translation in requested language and restore current lang.
-            # '%' signs are escaped in gettext using double '%%', in order for
-            # the translation to be found, it is necessary to do this as well
-            # (and reverse it again).
             activate(locale)
-            translated = pgettext_lazy(context, text.replace('%', '%%'))
-
-            # It is possible that the translation was not found because in newer
-            # editions, the context also contains the edition,
-            # e.g. "technologies_2018 label"
-            if translated == text and configuration != 'wocat':
-                context = f'{configuration}_{edition} {keyword}'
-                translated = pgettext_lazy(context, text.replace('%', '%%'))
-
-            if translated == text and configuration != 'wocat':
-                # TODO: Find a better way to handle "wocat" translations
-                # For "global" keys and values (eg. countries), the translation
-                # is stored in context "wocat". Therefore, if no translation is
-                # found for the current context, try to find a translation in
-                # the "wocat" context.
-                translated = pgettext_lazy(
-                    fallback_context, text.replace('%', '%%'))
-            activate(current_language)
-            return translated.replace('%%', '%')
-
-        return pgettext_lazy(context, text)
+        try:
+            for keyword, text in missing:
+                table[(keyword, text)] = Translation.translate_text(
+                    text, keyword, configuration, edition)
+        finally:
+            if locale != current_language:
+                activate(current_language)
 
     def __str__(self):
         return self.data.get(settings.LANGUAGES[0][0], '-')
@@ -469,7 +563,7 @@ class Country(object):
             List of country values (configuration.models.Value)
         """
         key = Key.objects.get(keyword=cls.key_keyword)
-        return key.values.all()
+        return key.values.select_related('translation')
 
     @classmethod
     def get(cls, iso_code):
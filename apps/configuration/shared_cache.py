@@ -0,0 +1,124 @@
+"""
+Host-wide cache for compiled configurations.
+
+Each compiled configuration blob (per code, edition and generation) is
+written once to a file in the directory set by
+``CONFIGURATION_SHARED_CACHE_PATH`` and kept mapped through ``mmap``. All
+worker processes of a host therefore share the same (page cached) pages
+instead of fetching and holding their own copy. The inode and modification
+time of a file are used as its stamp: if it changes (or the file is deleted),
+the processes drop their built configurations.
+
+Note that only the (small) compressed blobs are shared. The built
+configurations are still created by each process, the memory is saved by
+keeping fewer of them (see ``configuration.cache.SHARED_CACHE_LRU_SIZE``).
+"""
+import contextlib
+import glob
+import mmap
+import os
+import tempfile
+
+from django.conf import settings
+
+# The open memory maps of this process and their generation, by
+# (code, edition).
+shared_maps = {}
+
+
+def is_shared_cache_active() -> bool:
+    return bool(settings.CONFIGURATION_SHARED_CACHE_PATH)
+
+
+def get_shared_cache_path(code: str, edition: str, generation='*') -> str:
+    return os.path.join(
+        settings.CONFIGURATION_SHARED_CACHE_PATH,
+        f'{code}_{edition}_{generation}.bin')
+
+
+def read_shared_configuration(code: str, edition: str, generation: int):
+    """
+    Return the memory map of a compiled configuration blob, or None if not
+    available. The map is kept open (one per configuration and process) and
+    the blob is never copied into the process: it is only decompressed from
+    the shared pages when a configuration is built.
+    """
+    key = (code, edition)
+    shared_map = shared_maps.get(key)
+    if shared_map is not None:
+        if shared_map[0] == generation:
+            return shared_map[1]
+        close_shared_map(code, edition)
+    try:
+        with open(get_shared_cache_path(code, edition, generation), 'rb') as f:
+            m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        # ValueError: Empty files cannot be mapped.
+        return None
+    shared_maps[key] = (generation, m)
+    return m
+
+
+def close_shared_map(code: str, edition: str):
+    shared_map = shared_maps.pop((code, edition), None)
+    if shared_map is not None:
+        shared_map[1].close()
+
+
+def write_shared_configuration(
+        code: str, edition: str, generation: int, blob: bytes):
+    """
+    Write the blob of a compiled configuration, unless the file of this
+    generation already exists (e.g. written by another process which missed
+    at the same time). The file is written to a temporary file first and then
+    linked, so other processes never read a partially written file and an
+    existing file is never replaced (which would change its stamp). Files of
+    older generations are removed (a process with an outdated generation must
+    not remove the file of the current one).
+    """
+    path = get_shared_cache_path(code, edition, generation)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(blob)
+            with contextlib.suppress(FileExistsError):
+                os.link(tmp_path, path)
+        finally:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
+    delete_shared_configuration(code, edition, below_generation=generation)
+
+
+def delete_shared_configuration(
+        code: str, edition: str, below_generation: int=None):
+    """
+    Delete the files of a compiled configuration: all generations, or only the
+    ones lower than ``below_generation``.
+    """
+    if below_generation is None:
+        close_shared_map(code, edition)
+    prefix = get_shared_cache_path(code, edition, '')[:-len('.bin')]
+    for path in glob.glob(get_shared_cache_path(code, edition)):
+        if below_generation is not None:
+            try:
+                generation = int(path[len(prefix):-len('.bin')])
+            except ValueError:
+                continue
+            if generation >= below_generation:
+                continue
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(path)
+
+
+def get_shared_configuration_stamp(code: str, edition: str, generation: int):
+    """
+    Return the stamp (inode and modification time) of a compiled
+    configuration file, or None if it does not exist.
+    """
+    try:
+        stat = os.stat(get_shared_cache_path(code, edition, generation))
+        return stat.st_ino, stat.st_mtime_ns
+    except OSError:
+        return None
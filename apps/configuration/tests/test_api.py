@@ -3,7 +3,10 @@ import logging
 from django.test import RequestFactory
 
 from qcat.tests import TestCase
-from configuration.api.views import ConfigurationView, ConfigurationEditionView
+from django.http import Http404
+
+from configuration.api.views import ConfigurationView, \
+    ConfigurationEditionView, ConfigurationStructureView
 
 
 class ConfigurationViewTest(TestCase):
@@ -56,3 +59,38 @@ class ConfigurationEditionViewTest(TestCase):
         response = self.view.get(self.request, code=self.code)
         self.assertEqual(response.status_code, 200)
 
+
+class ConfigurationStructureViewTest(TestCase):
+
+    fixtures = [
+        'global_key_values',
+        'sample',
+    ]
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.factory = RequestFactory()
+        self.url = '/en/api/v2/configuration/sample/2015/'
+
+    def get_response(self, code='sample', **headers):
+        request = self.factory.get(self.url, **headers)
+        request.version = 'v2'
+        view = self.setup_view(
+            ConfigurationStructureView(), request, code=code, edition='2015'
+        )
+        return view.get(request, code=code, edition='2015')
+
+    def test_get_object(self):
+        response = self.get_response()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+
+    def test_not_modified(self):
+        etag = self.get_response()['ETag']
+        response = self.get_response(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_unknown_configuration(self):
+        with self.assertRaises(Http404):
+            self.get_response(code='foo')
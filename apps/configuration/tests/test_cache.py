@@ -1,21 +1,102 @@
 from django.test.utils import override_settings
 from unittest.mock import patch
 
-from configuration.cache import get_configuration
+from configuration.cache import (
+    bump_configuration_generation,
+    get_cache_key,
+    get_cached_configuration,
+    get_compiled_configuration,
+    get_configuration,
+    get_configuration_generation,
+    local_generations,
+)
+from configuration.compiled import dump_compiled_configuration, \
+    COMPILED_CONFIGURATION_VERSION
 from qcat.tests import TestCase
 
 
+@patch('configuration.cache.get_configuration_generation', return_value=1)
 @patch('configuration.cache.cache')
 class GetConfigurationQueryFilterTest(TestCase):
 
+    def setUp(self):
+        get_cached_configuration.cache_clear()
+
     @override_settings(USE_CACHING=True)
-    def test_returns_cache_if_found(self, mock_cache):
-        mock_cache.get.return_value = 'bar'
+    @patch('configuration.cache.build_configuration')
+    def test_builds_from_compiled_cache_if_found(
+            self, mock_build, mock_cache, mock_generation):
+        compiled = {'version': COMPILED_CONFIGURATION_VERSION}
+        mock_cache.get.return_value = dump_compiled_configuration(compiled)
+        mock_build.return_value = 'bar'
         ret = get_configuration('foo', 'edition_2015')
         self.assertEqual(ret, 'bar')
+        mock_build.assert_called_once_with(compiled)
 
     @override_settings(USE_CACHING=True)
-    def test_does_not_set_cache_if_found(self, mock_cache):
-        mock_cache.get.return_value = 'bar'
+    @patch('configuration.cache.build_configuration')
+    def test_does_not_set_cache_if_found(
+            self, mock_build, mock_cache, mock_generation):
+        mock_cache.get.return_value = dump_compiled_configuration(
+            {'version': COMPILED_CONFIGURATION_VERSION})
         get_configuration('foo', 'edition_2015')
         self.assertEqual(mock_cache.set.call_count, 0)
+
+    @patch('configuration.cache.compile_configuration')
+    @patch('configuration.cache.Configuration')
+    def test_compiles_if_cached_version_outdated(
+            self, mock_configuration, mock_compile, mock_cache,
+            mock_generation):
+        mock_cache.get.return_value = dump_compiled_configuration(
+            {'version': COMPILED_CONFIGURATION_VERSION - 1})
+        mock_compile.return_value = {'version': COMPILED_CONFIGURATION_VERSION}
+        get_compiled_configuration('foo', 'edition_2015')
+        self.assertEqual(mock_compile.call_count, 1)
+        self.assertEqual(mock_cache.set.call_count, 1)
+
+    def test_cache_key_contains_generation(self, mock_cache, mock_generation):
+        self.assertNotEqual(
+            get_cache_key('foo', '2015', 1), get_cache_key('foo', '2015', 2))
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ConfigurationGenerationTest(TestCase):
+
+    def setUp(self):
+        local_generations.clear()
+
+    def test_bump_increases_generation(self):
+        generation = get_configuration_generation('foo', '2015')
+        new_generation = bump_configuration_generation('foo', '2015')
+        self.assertGreater(new_generation, generation)
+        self.assertEqual(
+            get_configuration_generation('foo', '2015'), new_generation)
+
+    @patch('configuration.cache.cache')
+    def test_bump_is_atomic(self, mock_cache):
+        mock_cache.incr.return_value = 6
+        self.assertEqual(bump_configuration_generation('foo', '2015'), 6)
+        mock_cache.incr.assert_called_once_with('generation_foo_2015')
+        mock_cache.set.assert_not_called()
+
+    def test_generation_per_configuration(self):
+        generation = get_configuration_generation('bar', '2015')
+        bump_configuration_generation('foo', '2015')
+        self.assertEqual(
+            get_configuration_generation('bar', '2015'), generation)
+
+    @patch('configuration.cache.cache')
+    def test_generation_is_checked_once_per_interval(self, mock_cache):
+        mock_cache.get.return_value = 5
+        get_configuration_generation('foo', '2015')
+        get_configuration_generation('foo', '2015')
+        self.assertEqual(mock_cache.get.call_count, 1)
+
+    @override_settings(CONFIGURATION_GENERATION_CHECK_INTERVAL=0)
+    @patch('configuration.cache.cache')
+    def test_generation_is_checked_after_interval(self, mock_cache):
+        mock_cache.get.return_value = 5
+        get_configuration_generation('foo', '2015')
+        get_configuration_generation('foo', '2015')
+        self.assertEqual(mock_cache.get.call_count, 2)
@@ -0,0 +1,58 @@
+from configuration.compiled import (
+    build_configuration,
+    compile_configuration,
+    dump_compiled_configuration,
+    load_compiled_configuration,
+    COMPILED_CONFIGURATION_VERSION,
+)
+from configuration.configuration import QuestionnaireConfiguration
+from configuration.models import Configuration
+from qcat.tests import TestCase
+
+
+class CompiledConfigurationTest(TestCase):
+
+    fixtures = [
+        'global_key_values',
+        'sample',
+    ]
+
+    def setUp(self):
+        self.configuration_object = Configuration.objects.get(code='sample')
+        self.compiled = compile_configuration(self.configuration_object)
+
+    def test_compiled_is_versioned(self):
+        self.assertEqual(
+            self.compiled['version'], COMPILED_CONFIGURATION_VERSION)
+
+    def test_dump_and_load(self):
+        blob = dump_compiled_configuration(self.compiled)
+        self.assertIsInstance(blob, bytes)
+        self.assertEqual(load_compiled_configuration(blob), self.compiled)
+
+    def test_load_invalid_blob(self):
+        self.assertIsNone(load_compiled_configuration(None))
+        self.assertIsNone(load_compiled_configuration(b'foo'))
+
+    def test_load_other_version(self):
+        self.compiled['version'] = COMPILED_CONFIGURATION_VERSION + 1
+        blob = dump_compiled_configuration(self.compiled)
+        self.assertIsNone(load_compiled_configuration(blob))
+
+    def test_build_does_not_query_database(self):
+        with self.assertNumQueries(0):
+            configuration = build_configuration(self.compiled)
+        self.assertIsNone(configuration.configuration_error)
+
+    def test_build_equals_configuration_from_database(self):
+        built = build_configuration(self.compiled)
+        configuration = QuestionnaireConfiguration(
+            'sample', configuration_object=self.configuration_object)
+        self.assertEqual(built.edition, configuration.edition)
+        self.assertEqual(
+            [qg.keyword for qg in built.get_questiongroups()],
+            [qg.keyword for qg in configuration.get_questiongroups()])
+        self.assertEqual(
+            built.get_filter_keys(), configuration.get_filter_keys())
+        self.assertEqual(
+            built.get_translation_ids(), configuration.get_translation_ids())
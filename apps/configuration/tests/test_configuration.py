@@ -55,6 +55,37 @@ class QuestionnaireConfigurationGetListDataTest(TestCase):
             self.assertIn('definition', d)
             self.assertIn('country', d)
 
+    def test_get_list_image_uids(self):
+        conf = QuestionnaireConfiguration('sample')
+        uids = conf.get_list_image_uids([
+            {'qg_14': [{'key_19': 'uid_1'}, {'key_19': 'uid_2'}]},
+            {'qg_14': [{'key_19': 'uid_3'}], 'qg_1': [{'key_1': 'foo'}]},
+            {},
+        ])
+        self.assertEqual(uids, {'uid_1', 'uid_2', 'uid_3'})
+
+    @patch('configuration.configuration.File.get_data_by_uids')
+    def test_queries_images_at_once(self, mock_get_data_by_uids):
+        mock_get_data_by_uids.return_value = {
+            'uid_1': {'interchange_list': [('url_1', 'default')]}}
+        conf = QuestionnaireConfiguration('sample')
+        list_data = conf.get_list_data([
+            {'qg_14': [{'key_19': 'uid_1'}]},
+            {'qg_14': [{'key_19': 'uid_2'}]},
+        ])
+        mock_get_data_by_uids.assert_called_once_with({'uid_1', 'uid_2'})
+        self.assertEqual(list_data[0]['image'], 'url_1')
+        self.assertEqual(list_data[1]['image'], 'uid_2')
+
+    @patch('configuration.configuration.File.get_data_by_uids')
+    def test_uses_provided_files_data(self, mock_get_data_by_uids):
+        conf = QuestionnaireConfiguration('sample')
+        list_data = conf.get_list_data(
+            [{'qg_14': [{'key_19': 'uid_1'}]}],
+            files_data={'uid_1': {'interchange_list': [('url_1', 'default')]}})
+        mock_get_data_by_uids.assert_not_called()
+        self.assertEqual(list_data[0]['image'], 'url_1')
+
 
 class QuestionnaireConfigurationGeometryTest(TestCase):
 
@@ -70,6 +101,42 @@ class QuestionnaireConfigurationGeometryTest(TestCase):
         self.assertEqual(geometry, data['qg_39'][0]['key_56'])
 
 
+class QuestionnaireConfigurationIndexesTest(TestCase):
+
+    fixtures = [
+        'global_key_values',
+        'sample',
+    ]
+
+    def setUp(self):
+        self.conf = QuestionnaireConfiguration('sample')
+
+    def test_get_questiongroup_by_keyword(self):
+        questiongroup = self.conf.get_questiongroup_by_keyword('qg_1')
+        self.assertEqual(questiongroup.keyword, 'qg_1')
+        self.assertIsNone(self.conf.get_questiongroup_by_keyword('foo'))
+
+    def test_get_question_by_keyword(self):
+        question = self.conf.get_question_by_keyword('qg_1', 'key_1')
+        self.assertEqual(question.keyword, 'key_1')
+        self.assertEqual(question.questiongroup.keyword, 'qg_1')
+        self.assertIsNone(self.conf.get_question_by_keyword('qg_1', 'foo'))
+
+    def test_indexes_match_questiongroups(self):
+        questiongroups = self.conf.get_questiongroups()
+        self.assertEqual(
+            set(self.conf.questiongroups_by_keyword),
+            {qg.keyword for qg in questiongroups})
+
+    def test_get_questiongroups_returns_copy(self):
+        self.conf.get_questiongroups().clear()
+        self.assertNotEqual(self.conf.get_questiongroups(), [])
+
+    def test_get_filter_keys_sorted_by_order(self):
+        orders = [k.order for k in self.conf.get_filter_keys()]
+        self.assertEqual(orders, sorted(orders))
+
+
 class QuestionnaireConfigurationReadConfigurationTest(TestCase):
 
     def test_raises_error_if_no_configuration_object(self):
@@ -0,0 +1,68 @@
+from configuration.configuration import QuestionnaireConfiguration
+from configuration.loader import ConfigurationLookup
+from configuration.models import Category, Key, Questiongroup
+from qcat.errors import ConfigurationErrorNotInDatabase
+from qcat.tests import TestCase
+
+
+def get_configuration_data():
+    return {
+        'sections': [{
+            'keyword': 'section_1',
+            'categories': [{
+                'keyword': 'cat_1',
+                'subcategories': [{
+                    'keyword': 'subcat_1_1',
+                    'questiongroups': [{
+                        'keyword': 'qg_1',
+                        'questions': [
+                            {'keyword': 'key_1'}, {'keyword': 'key_3'}]
+                    }]
+                }]
+            }]
+        }]
+    }
+
+
+class ConfigurationLookupTest(TestCase):
+
+    fixtures = [
+        'sample_global_key_values',
+        'sample',
+    ]
+
+    def test_collects_keywords_by_model(self):
+        keywords = {Category: set(), Questiongroup: set(), Key: set()}
+        ConfigurationLookup().collect_keywords(
+            get_configuration_data(), keywords)
+        self.assertEqual(
+            keywords[Category], {'section_1', 'cat_1', 'subcat_1_1'})
+        self.assertEqual(keywords[Questiongroup], {'qg_1'})
+        self.assertEqual(keywords[Key], {'key_1', 'key_3'})
+
+    def test_get_does_not_query_prefetched_objects(self):
+        lookup = ConfigurationLookup(get_configuration_data())
+        with self.assertNumQueries(0):
+            key = lookup.get(Key, 'key_1')
+            key.translation.data
+        self.assertEqual(key.keyword, 'key_1')
+
+    def test_get_returns_copy_of_configuration(self):
+        lookup = ConfigurationLookup(get_configuration_data())
+        key = lookup.get(Key, 'key_1')
+        key.configuration['foo'] = 'bar'
+        self.assertNotIn('foo', lookup.get(Key, 'key_1').configuration)
+
+    def test_get_queries_unknown_keyword(self):
+        lookup = ConfigurationLookup()
+        self.assertEqual(lookup.get(Key, 'key_1').keyword, 'key_1')
+
+    def test_get_raises_error_if_not_in_db(self):
+        lookup = ConfigurationLookup()
+        with self.assertRaises(ConfigurationErrorNotInDatabase):
+            lookup.get(Key, 'foo')
+
+    def test_configuration_is_built_with_lookup(self):
+        configuration = QuestionnaireConfiguration('sample')
+        self.assertIsNone(configuration.configuration_error)
+        self.assertEqual(configuration.lookup.objects, {})
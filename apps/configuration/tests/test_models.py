@@ -14,7 +14,7 @@ from configuration.models import (
     Questiongroup,
     Translation,
     Value,
-    TranslationContent, Country)
+    TranslationContent, Country, translation_tables)
 from qcat.tests import TestCase
 
 
@@ -262,6 +262,7 @@ class TranslationModelTest(TestCase):
 
     def setUp(self):
         self.translation = get_valid_translation_model()
+        translation_tables.clear()
 
     def test_get_valid_translation_model_is_valid(self):
         self.translation.full_clean()  # Should not raise
@@ -307,17 +308,80 @@ class TranslationModelTest(TestCase):
         mock_activate.assert_any_call('es')
         mock_activate.assert_any_call(get_language())
 
-    @patch('configuration.models.pgettext_lazy')
+    @patch('configuration.models.pgettext')
     @patch.object(Translation, 'translationcontent_set')
     def test_get_translation_calls_pgettext(self, mocktranslationcontent_set,
                                             mock_pgettext):
         mocktranslationcontent_set.exists.return_value = True
         mocktranslationcontent_set.return_value = {'wocat': 'foo'}
+        mock_pgettext.return_value = 'bar'
         self.translation.get_translation(
             'keyword', configuration='configuration', locale='es'
         )
         mock_pgettext.assert_called_once_with('configuration keyword', 'foo')
 
+    @patch('configuration.models.pgettext')
+    def test_get_translation_uses_translation_table(self, mock_pgettext):
+        mock_pgettext.return_value = 'bar'
+        for __ in range(2):
+            self.assertEqual(self.translation.get_translation(
+                'keyword', configuration='configuration', locale='es'), 'bar')
+        mock_pgettext.assert_called_once_with('configuration keyword', 'foo')
+        self.assertEqual(
+            translation_tables[('configuration', '', 'es')],
+            {('keyword', 'foo'): 'bar'})
+
+    @patch('configuration.models.pgettext')
+    def test_get_translation_table_per_locale(self, mock_pgettext):
+        mock_pgettext.side_effect = lambda context, text: get_language()
+        self.assertEqual(self.translation.get_translation(
+            'keyword', configuration='configuration', locale='es'), 'es')
+        self.assertEqual(self.translation.get_translation(
+            'keyword', configuration='configuration', locale='fr'), 'fr')
+        self.assertEqual(self.translation.get_translation(
+            'keyword', configuration='configuration'), get_language())
+
+    @patch('configuration.models.activate')
+    def test_fill_translation_tables_activates_locale_once(
+            self, mock_activate):
+        translation = Translation(data={
+            'configuration': {
+                'keyword': {'en': 'foo'}, 'other': {'en': 'bar'}}})
+        Translation.fill_translation_tables(
+            [self.translation, translation], configuration='configuration',
+            locale='es')
+        self.assertEqual(mock_activate.call_count, 2)
+        self.assertEqual(
+            set(translation_tables[('configuration', '', 'es')].keys()),
+            {('keyword', 'foo'), ('other', 'bar')})
+        with patch('configuration.models.pgettext') as mock_pgettext:
+            translation.get_translation(
+                'other', configuration='configuration', locale='es')
+            mock_pgettext.assert_not_called()
+
+    @patch('configuration.models.pgettext')
+    def test_get_translation_current_locale_uses_fallback_contexts(
+            self, mock_pgettext):
+        translations = {
+            ('configuration_edition keyword', 'foo'): 'edition',
+            ('wocat other', 'foo'): 'wocat',
+        }
+        mock_pgettext.side_effect = lambda context, text: translations.get(
+            (context, text), text)
+        translation = Translation(data={
+            'configuration': {
+                'keyword': {'en': 'foo'}, 'other': {'en': 'foo'}}})
+        self.assertEqual(translation.get_translation(
+            'keyword', configuration='configuration', edition='edition'),
+            'edition')
+        self.assertEqual(translation.get_translation(
+            'other', configuration='configuration'), 'wocat')
+
+    def test_translate_text_escapes_percent(self):
+        self.assertEqual(
+            Translation.translate_text('100 %', 'keyword', 'configuration'),
+            '100 %')
+
     def test_get_translation_returns_empty_if_configuration_not_found(self):
         self.assertIsNone(self.translation.get_translation(
             'keyword', configuration='foo'), None)
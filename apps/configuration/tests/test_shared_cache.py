@@ -0,0 +1,110 @@
+import tempfile
+from unittest.mock import patch
+
+from django.test.utils import override_settings
+
+from configuration.cache import (
+    check_shared_cache_stamp,
+    get_cached_configuration,
+    get_compiled_configuration,
+    get_shared_cached_configuration,
+    shared_cache_stamps,
+)
+from configuration.compiled import COMPILED_CONFIGURATION_VERSION, \
+    dump_compiled_configuration
+from configuration.shared_cache import (
+    close_shared_map,
+    delete_shared_configuration,
+    get_shared_configuration_stamp,
+    read_shared_configuration,
+    shared_maps,
+    write_shared_configuration,
+)
+from qcat.tests import TestCase
+
+
+class SharedCacheTest(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.override = override_settings(
+            CONFIGURATION_SHARED_CACHE_PATH=self.tmp_dir.name)
+        self.override.enable()
+        self.blob = dump_compiled_configuration(
+            {'version': COMPILED_CONFIGURATION_VERSION})
+        shared_cache_stamps.clear()
+
+    def tearDown(self):
+        close_shared_map('foo', '2015')
+        self.override.disable()
+        self.tmp_dir.cleanup()
+        shared_cache_stamps.clear()
+
+    def test_read_missing_returns_none(self):
+        self.assertIsNone(read_shared_configuration('foo', '2015', 1))
+        self.assertIsNone(get_shared_configuration_stamp('foo', '2015', 1))
+
+    def test_write_and_read(self):
+        write_shared_configuration('foo', '2015', 1, self.blob)
+        self.assertEqual(
+            read_shared_configuration('foo', '2015', 1)[:], self.blob)
+
+    def test_map_is_kept_open(self):
+        write_shared_configuration('foo', '2015', 1, self.blob)
+        shared_map = read_shared_configuration('foo', '2015', 1)
+        self.assertIs(read_shared_configuration('foo', '2015', 1), shared_map)
+        write_shared_configuration('foo', '2015', 2, self.blob)
+        self.assertIsNot(
+            read_shared_configuration('foo', '2015', 2), shared_map)
+        self.assertTrue(shared_map.closed)
+        self.assertEqual(shared_maps[('foo', '2015')][0], 2)
+
+    def test_delete(self):
+        write_shared_configuration('foo', '2015', 1, self.blob)
+        delete_shared_configuration('foo', '2015')
+        self.assertIsNone(read_shared_configuration('foo', '2015', 1))
+
+    def test_write_keeps_current_file(self):
+        write_shared_configuration('foo', '2015', 1, self.blob)
+        stamp = get_shared_configuration_stamp('foo', '2015', 1)
+        write_shared_configuration('foo', '2015', 1, b'other')
+        self.assertEqual(
+            stamp, get_shared_configuration_stamp('foo', '2015', 1))
+        self.assertEqual(
+            read_shared_configuration('foo', '2015', 1)[:], self.blob)
+
+    def test_write_removes_other_generations(self):
+        write_shared_configuration('foo', '2015', 1, self.blob)
+        write_shared_configuration('foo', '2015', 2, self.blob)
+        self.assertIsNone(read_shared_configuration('foo', '2015', 1))
+        self.assertEqual(
+            read_shared_configuration('foo', '2015', 2)[:], self.blob)
+
+    def test_write_keeps_newer_generations(self):
+        write_shared_configuration('foo', '2015', 2, self.blob)
+        write_shared_configuration('foo', '2015', 1, self.blob)
+        self.assertEqual(
+            read_shared_configuration('foo', '2015', 2)[:], self.blob)
+
+    @patch('configuration.cache.get_configuration_generation', return_value=1)
+    @patch('configuration.cache.cache')
+    def test_compiled_is_read_from_file(self, mock_cache, mock_generation):
+        write_shared_configuration('foo', '2015', 1, self.blob)
+        compiled = get_compiled_configuration('foo', '2015')
+        self.assertEqual(compiled['version'], COMPILED_CONFIGURATION_VERSION)
+        self.assertEqual(mock_cache.get.call_count, 0)
+        self.assertIn(('foo', '2015'), shared_cache_stamps)
+
+    @patch('configuration.cache.get_configuration_generation', return_value=1)
+    @patch.object(get_shared_cached_configuration, 'cache_clear')
+    @patch.object(get_cached_configuration, 'cache_clear')
+    def test_changed_stamp_clears_lru_cache(
+            self, mock_cache_clear, mock_shared_cache_clear, mock_generation):
+        write_shared_configuration('foo', '2015', 1, self.blob)
+        get_compiled_configuration('foo', '2015')
+        check_shared_cache_stamp('foo', '2015', 1)
+        self.assertEqual(mock_cache_clear.call_count, 0)
+        delete_shared_configuration('foo', '2015')
+        check_shared_cache_stamp('foo', '2015', 1)
+        mock_cache_clear.assert_called_once_with()
+        mock_shared_cache_clear.assert_called_once_with()
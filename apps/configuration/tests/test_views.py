@@ -4,11 +4,11 @@ from unittest.mock import MagicMock, patch
 from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.test import RequestFactory, override_settings
-from django.utils.translation import get_language
 
 from qcat.tests import TestCase
 from configuration.models import Configuration
-from configuration.cache import get_configuration, get_cached_configuration
+from configuration.cache import get_configuration, get_cached_configuration, \
+    get_compiled_cache_key, get_configuration_generation, local_generations
 from configuration.views import BuildAllCachesView, delete_caches, EditionNotesView
 
 
@@ -25,6 +25,7 @@ class CacheTest(TestCase):
         self.factory = RequestFactory()
         # Initially clear cache
         get_cached_configuration.cache_clear()
+        local_generations.clear()
 
     def setup_view(self, view, request, *args, **kwargs):
         """
@@ -46,14 +47,17 @@ class CacheTest(TestCase):
         request._messages = MagicMock()
         view = self.setup_view(BuildAllCachesView(), request)
         view.get(request)
-        self.assertIsNotNone(cache.get('sample_2015_{}'.format(get_language())))
+        generation = get_configuration_generation('sample', '2015')
+        self.assertIsNotNone(
+            cache.get(get_compiled_cache_key('sample', '2015', generation)))
 
     @override_settings(CACHES=locmem, USE_CACHING=True)
     def test_clear_cache(self):
         config = Configuration.objects.all().first()
         get_configuration(code=config.code, edition=config.edition)
-        cache_key = '{}_{}_{}'.format(
-            config.code, config.edition, get_language())
+        cache_key = get_compiled_cache_key(
+            config.code, config.edition,
+            get_configuration_generation(config.code, config.edition))
         self.assertIsNotNone(cache.get(cache_key))
         request = MagicMock()
         request.user.is_superuser = True
@@ -91,6 +91,10 @@ class NotificationsConf(AppConf):
         (ALL_MAILS, _('All emails')),
     )
 
+    # Number of seconds the unread and pending counts of an inbox are cached.
+    # The counts are deleted whenever the inbox changes.
+    INBOX_COUNTS_TIMEOUT = 60 * 60
+
     TEASER_PAGINATE_BY = 5
     LIST_PAGINATE_BY = 10
     SALT = settings.BASE_DIR
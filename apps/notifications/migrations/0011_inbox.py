@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.26 on 2026-10-17 16:40
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notifications', '0010_auto_20200514_1659'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Inbox',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_outdated', models.BooleanField(default=False)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='InboxEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_read', models.BooleanField(default=False)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('is_pending', models.BooleanField(default=False)),
+                ('log', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='notifications.Log')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='inboxentry',
+            unique_together=set([('user', 'log')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='inboxentry',
+            index_together=set([('user', 'is_deleted', 'is_read')]),
+        ),
+    ]
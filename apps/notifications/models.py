@@ -1,13 +1,15 @@
+import collections
 import functools
 import itertools
 import logging
 import operator
 
 from django.core import signing
+from django.core.cache import cache
 from django.core.mail import EmailMultiAlternatives
 from django.core.urlresolvers import reverse, reverse_lazy
 from django.db import models, transaction
-from django.db.models import F, Q
+from django.db.models import Case, Count, F, Q, When
 from django.template.loader import render_to_string
 from django.utils.translation import ugettext_lazy as _, get_language, activate
 from django.utils.functional import cached_property
@@ -26,9 +28,13 @@ class ActionContextQuerySet(models.QuerySet):
     Filters actions according to context. E.g. get actions for my profile
     notifications, get actions for emails.
     """
-    def get_questionnaires_for_permissions(self, user) -> list:
+    def get_questionnaires_for_permissions(
+            self, user, questionnaire_id: int = None) -> list:
         """
         Create filters for questionnaire statuses according to permissions.
+        The questionnaire memberships are combined by role (as subquery), so
+        the number of filters does not grow with the number of memberships.
+        If a questionnaire_id is given, only its memberships are considered.
         """
         filters = []
         user_permissions = user.get_all_permissions()
@@ -40,16 +46,27 @@ class ActionContextQuerySet(models.QuerySet):
         questionnaire_memberships = QuestionnaireMembership.objects.filter(
             user=user
         )
-        for membership in questionnaire_memberships:
-            permissions = settings.NOTIFICATIONS_QUESTIONNAIRE_MEMBERSHIP_PERMISSIONS.get(membership.role)
+        if questionnaire_id is not None:
+            questionnaire_memberships = questionnaire_memberships.filter(
+                questionnaire_id=questionnaire_id
+            )
+        roles = questionnaire_memberships.order_by().values_list(
+            'role', flat=True
+        ).distinct()
+        membership_permissions = \
+            settings.NOTIFICATIONS_QUESTIONNAIRE_MEMBERSHIP_PERMISSIONS
+        for role in roles:
+            permissions = membership_permissions.get(role)
             if permissions:
                 filters.append(
                     Q(statusupdate__status__in=permissions,
-                      questionnaire=membership.questionnaire)
+                      questionnaire_id__in=questionnaire_memberships.filter(
+                          role=role
+                      ).values('questionnaire_id'))
                 )
         return filters
 
-    def user_log_list(self, user: User):
+    def user_log_list(self, user: User, questionnaire_id: int = None):
         """
         Fetch all logs where given user is
         - either catalyst or subscriber of the log (set the moment the log was
@@ -59,17 +76,34 @@ class ActionContextQuerySet(models.QuerySet):
         - the action is either a defined 'list' action, or the current user
           is compiler / editor in which case content edits are listed also
         - notifications that are sent to the current user
+
+        This query is expensive for users with many memberships, use the
+        materialized Inbox of the user wherever possible.
+        """
+        return self.not_deleted_logs(
+            user=user
+        ).visible_logs(
+            user=user, questionnaire_id=questionnaire_id
+        )
+
+    def visible_logs(self, user: User, questionnaire_id: int = None):
+        """
+        All logs the user is allowed to see (see user_log_list), including the
+        ones the user deleted.
         """
         # construct filters depending on the users permissions.
-        status_filters = self.get_questionnaires_for_permissions(user)
+        status_filters = self.get_questionnaires_for_permissions(
+            user, questionnaire_id=questionnaire_id)
         # extend basic filters according to catalyst / subscriber
         status_filters.extend(
             [Q(subscribers=user), Q(catalyst=user)]
         )
 
-        return self.not_deleted_logs(
-            user=user
-        ).filter(
+        logs = self
+        if questionnaire_id is not None:
+            logs = logs.filter(questionnaire_id=questionnaire_id)
+
+        return logs.filter(
             Q(action__in=settings.NOTIFICATIONS_USER_PROFILE_ACTIONS) |
             Q(action=settings.NOTIFICATIONS_EDIT_CONTENT,
               questionnaire__questionnairemembership__user=user,
@@ -83,7 +117,7 @@ class ActionContextQuerySet(models.QuerySet):
             functools.reduce(operator.or_, status_filters)
         ).distinct()
 
-    def user_pending_list(self, user: User):
+    def user_pending_list(self, user: User, questionnaire_id: int = None):
         """
         Get logs that the user has to work on. Defined by:
         - the questionnaire still has the same status as when the log was
@@ -99,11 +133,16 @@ class ActionContextQuerySet(models.QuerySet):
         nice with order_by.
 
         """
-        status_filters = self.get_questionnaires_for_permissions(user)
+        status_filters = self.get_questionnaires_for_permissions(
+            user, questionnaire_id=questionnaire_id)
         if not status_filters:
             return self.none()
 
-        logs = self.not_deleted_logs(
+        logs = self
+        if questionnaire_id is not None:
+            logs = logs.filter(questionnaire_id=questionnaire_id)
+
+        logs = logs.not_deleted_logs(
             user=user
         ).filter(
             action=settings.NOTIFICATIONS_CHANGE_STATUS,
@@ -114,7 +153,10 @@ class ActionContextQuerySet(models.QuerySet):
             'id', 'questionnaire_id'
         )
 
-        read_logs = self.read_logs(user=user, log__statusupdate__isnull=False)
+        read_filters = {'log__statusupdate__isnull': False}
+        if questionnaire_id is not None:
+            read_filters['log__questionnaire_id'] = questionnaire_id
+        read_logs = self.read_logs(user=user, **read_filters)
         if read_logs.exists():
             # If a log is marked as read, exclude all previous logs for the
             # same questionnaire and the same status from the 'pending'
@@ -235,10 +277,14 @@ class ActionContextQuerySet(models.QuerySet):
         previously existing logs, all logs are removed before the bulk insert.
         """
         self.delete_all_read_logs(user=user)
-        log_ids = self.user_log_list(user=user).values_list('id', flat=True)
+        inbox = Inbox.for_user(user)
+        log_ids = inbox.entries.values_list('log_id', flat=True)
         ReadLog.objects.bulk_create(
             [ReadLog(user=user, log_id=log, is_read=True) for log in log_ids]
         )
+        # Read logs are never pending.
+        inbox.entries.update(is_read=True, is_pending=False)
+        inbox.delete_counts()
 
     @staticmethod
     def delete_all_read_logs(user: User):
@@ -687,6 +733,226 @@ class ReadLog(models.Model):
         unique_together = ['log', 'user']
 
 
+class Inbox(models.Model):
+    """
+    The notifications of a user, materialized as InboxEntries. Querying the
+    logs of a user directly (ActionContextQuerySet.user_log_list) results in
+    very large queries for users with many memberships or permissions.
+
+    The inbox is built when it is first used and kept up to date per
+    questionnaire: when logs are created (see notifications.utils), when
+    memberships change (see notifications.receivers) and when logs are
+    marked as read or deleted. If the permissions of a user change, the inbox
+    is marked as outdated and built again when it is used the next time.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    is_outdated = models.BooleanField(default=False)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return str(self.user)
+
+    @classmethod
+    def for_user(cls, user: User) -> 'Inbox':
+        """
+        Return the (up to date) inbox of a user.
+        """
+        inbox, created = cls.objects.get_or_create(user=user)
+        if created or inbox.is_outdated:
+            inbox.sync()
+        return inbox
+
+    @property
+    def entries(self):
+        return InboxEntry.objects.filter(user_id=self.user_id, is_deleted=False)
+
+    def get_logs(self, is_pending=False, is_unread=False):
+        """
+        Return the (not deleted) logs of the inbox.
+        """
+        filters = {
+            'inboxentry__user_id': self.user_id,
+            'inboxentry__is_deleted': False,
+        }
+        if is_pending:
+            filters['inboxentry__is_pending'] = True
+        if is_unread:
+            filters['inboxentry__is_read'] = False
+        return Log.objects.filter(**filters)
+
+    def sync(self, questionnaire_id: int = None):
+        """
+        Update the entries of the inbox (only the ones of the given
+        questionnaire, if available) from the logs visible to the user.
+        """
+        with transaction.atomic():
+            # Serialize concurrent updates of the same inbox.
+            list(Inbox.objects.select_for_update().filter(
+                id=self.id).values_list('id', flat=True))
+
+            visible_ids = set(Log.actions.visible_logs(
+                user=self.user, questionnaire_id=questionnaire_id
+            ).values_list('id', flat=True))
+            pending_ids = set(Log.actions.user_pending_list(
+                user=self.user, questionnaire_id=questionnaire_id
+            ).values_list('id', flat=True))
+            read_logs = ReadLog.objects.filter(user_id=self.user_id)
+            entries = InboxEntry.objects.filter(user_id=self.user_id)
+            if questionnaire_id is not None:
+                read_logs = read_logs.filter(
+                    log__questionnaire_id=questionnaire_id)
+                entries = entries.filter(
+                    log__questionnaire_id=questionnaire_id)
+            read_states = {
+                log_id: (is_read, is_deleted) for log_id, is_read, is_deleted
+                in read_logs.values_list('log_id', 'is_read', 'is_deleted')
+            }
+
+            wanted = {}
+            for log_id in visible_ids:
+                is_read, is_deleted = read_states.get(log_id, (False, False))
+                wanted[log_id] = (is_read, is_deleted, log_id in pending_ids)
+
+            existing = {
+                log_id: (entry_id, (is_read, is_deleted, is_pending))
+                for entry_id, log_id, is_read, is_deleted, is_pending
+                in entries.values_list(
+                    'id', 'log_id', 'is_read', 'is_deleted', 'is_pending')
+            }
+
+            removed = [
+                entry_id for log_id, (entry_id, __) in existing.items()
+                if log_id not in wanted
+            ]
+            if removed:
+                InboxEntry.objects.filter(id__in=removed).delete()
+
+            changed = collections.defaultdict(list)
+            for log_id, (entry_id, flags) in existing.items():
+                if log_id in wanted and wanted[log_id] != flags:
+                    changed[wanted[log_id]].append(entry_id)
+            for (is_read, is_deleted, is_pending), entry_ids in changed.items():
+                InboxEntry.objects.filter(id__in=entry_ids).update(
+                    is_read=is_read, is_deleted=is_deleted,
+                    is_pending=is_pending)
+
+            InboxEntry.objects.bulk_create([
+                InboxEntry(
+                    user_id=self.user_id, log_id=log_id, is_read=is_read,
+                    is_deleted=is_deleted, is_pending=is_pending)
+                for log_id, (is_read, is_deleted, is_pending) in wanted.items()
+                if log_id not in existing
+            ])
+
+            if questionnaire_id is None:
+                self.is_outdated = False
+                self.save()
+
+        self.delete_counts()
+
+    def get_counts(self) -> dict:
+        """
+        Return the number of unread and pending notifications. The numbers
+        are cached until the inbox changes.
+        """
+        counts = cache.get(self.counts_cache_key)
+        if counts is None:
+            counts = self.entries.aggregate(
+                unread=Count(Case(When(is_read=False, then=1))),
+                pending=Count(Case(When(is_pending=True, then=1))),
+            )
+            cache.set(
+                self.counts_cache_key, counts,
+                settings.NOTIFICATIONS_INBOX_COUNTS_TIMEOUT)
+        return counts
+
+    def delete_counts(self):
+        cache.delete(self.counts_cache_key)
+
+    @property
+    def counts_cache_key(self) -> str:
+        return f'notifications_inbox_counts_{self.user_id}'
+
+    @classmethod
+    def sync_questionnaire(cls, user_ids, questionnaire_id: int):
+        """
+        Update the entries of a questionnaire in the (already built) inboxes
+        of the given users.
+        """
+        inboxes = cls.objects.filter(
+            user_id__in=set(user_ids), is_outdated=False
+        ).select_related('user')
+        for inbox in inboxes:
+            inbox.sync(questionnaire_id=questionnaire_id)
+
+    @classmethod
+    def add_log(cls, log: Log):
+        """
+        Add a new log to the inboxes of all users who may see it. If the log
+        changed the status of the questionnaire, its other logs are updated
+        as well, as they may not be pending anymore.
+        """
+        user_ids = set(log.subscribers.values_list('id', flat=True))
+        user_ids.add(log.catalyst_id)
+        user_ids.update(QuestionnaireMembership.objects.filter(
+            questionnaire_id=log.questionnaire_id
+        ).values_list('user_id', flat=True))
+
+        if hasattr(log, 'statusupdate'):
+            user_ids.update(InboxEntry.objects.filter(
+                log__questionnaire_id=log.questionnaire_id
+            ).values_list('user_id', flat=True).distinct())
+            if log.action == settings.NOTIFICATIONS_CHANGE_STATUS:
+                user_ids.update(
+                    cls.get_user_ids_with_status_permission(
+                        log.statusupdate.status))
+
+        cls.sync_questionnaire(user_ids, log.questionnaire_id)
+
+    @staticmethod
+    def get_user_ids_with_status_permission(status: int) -> set:
+        """
+        Return the users who may see all logs of a given status (see
+        NOTIFICATIONS_QUESTIONNAIRE_STATUS_PERMISSIONS).
+        """
+        user_ids = set()
+        status_permissions = \
+            settings.NOTIFICATIONS_QUESTIONNAIRE_STATUS_PERMISSIONS
+        for permission, permission_status in status_permissions.items():
+            if permission_status != status:
+                continue
+            app_label, codename = permission.split('.')
+            user_ids.update(User.objects.filter(
+                Q(is_superuser=True) |
+                Q(user_permissions__codename=codename,
+                  user_permissions__content_type__app_label=app_label) |
+                Q(groups__permissions__codename=codename,
+                  groups__permissions__content_type__app_label=app_label),
+                is_active=True
+            ).values_list('id', flat=True).distinct())
+        return user_ids
+
+    @classmethod
+    def mark_outdated(cls, user_ids):
+        cls.objects.filter(user_id__in=set(user_ids)).update(is_outdated=True)
+
+
+class InboxEntry(models.Model):
+    """
+    A log in the inbox of a user, with the state of the log for the user.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    log = models.ForeignKey(Log, on_delete=models.CASCADE)
+    is_read = models.BooleanField(default=False)
+    is_deleted = models.BooleanField(default=False)
+    is_pending = models.BooleanField(default=False)
+
+    class Meta:
+        unique_together = ['user', 'log']
+        index_together = ['user', 'is_deleted', 'is_read']
+
+
 class MailPreferences(models.Model):
     """
     User preferences for receiving email notifications.
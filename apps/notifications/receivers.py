@@ -1,14 +1,15 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth import user_logged_in
-from django.db.models.signals import post_save
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.utils.translation import ugettext_lazy as _
 from django.dispatch import receiver
 
 from accounts.models import User
-from questionnaire.models import Questionnaire
+from questionnaire.models import Questionnaire, QuestionnaireMembership
 from questionnaire import signals
 
-from .models import MailPreferences
+from .models import Inbox, MailPreferences
 from .utils import ContentLog, MemberLog, StatusLog
 
 
@@ -72,3 +73,41 @@ def update_language(sender, request, user, **kwargs):
     if not user.mailpreferences.has_changed_language and hasattr(request, 'LANGUAGE_CODE'):
         user.mailpreferences.language = request.LANGUAGE_CODE
         user.mailpreferences.save()
+
+
+@receiver(signal=post_save, sender=QuestionnaireMembership)
+@receiver(signal=post_delete, sender=QuestionnaireMembership)
+def update_inbox_membership(sender, instance, **kwargs):
+    # The membership defines which logs of the questionnaire the user sees.
+    Inbox.sync_questionnaire([instance.user_id], instance.questionnaire_id)
+
+
+@receiver(signal=m2m_changed, sender=get_user_model().groups.through)
+@receiver(signal=m2m_changed, sender=get_user_model().user_permissions.through)
+def outdate_inbox_user_permissions(
+        sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ['post_add', 'post_remove', 'pre_clear']:
+        return
+    if not reverse:
+        Inbox.mark_outdated([instance.id])
+    elif action == 'pre_clear':
+        Inbox.mark_outdated(
+            instance.user_set.values_list('id', flat=True))
+    else:
+        Inbox.mark_outdated(pk_set)
+
+
+@receiver(signal=m2m_changed, sender=Group.permissions.through)
+def outdate_inbox_group_permissions(
+        sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ['post_add', 'post_remove', 'pre_clear']:
+        return
+    if not reverse:
+        groups = [instance.id]
+    elif action == 'pre_clear':
+        groups = instance.group_set.values_list('id', flat=True)
+    else:
+        groups = pk_set
+    Inbox.mark_outdated(get_user_model().objects.filter(
+        groups__in=list(groups)
+    ).values_list('id', flat=True))
@@ -1,14 +1,16 @@
 from unittest.mock import patch, MagicMock
 
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
 from django.db.models import Q
 from django.conf import settings
 from django.test import override_settings
 from model_mommy import mommy
 from qcat.tests import TestCase
 
-from notifications.models import ActionContextQuerySet, Log, StatusUpdate, \
-    ReadLog, ContentUpdate, MemberUpdate, InformationUpdate
+from notifications.models import ActionContextQuerySet, Inbox, InboxEntry, \
+    Log, StatusUpdate, ReadLog, ContentUpdate, MemberUpdate, InformationUpdate
+from notifications.utils import StatusLog
 from questionnaire.models import Questionnaire, QuestionnaireMembership
 
 
@@ -646,3 +648,94 @@ class MailPreferencesTest(TestCase):
     def test_is_todo_log_other_prefs(self):
         self.obj.subscription = settings.NOTIFICATIONS_ALL_MAILS
         self.assertTrue(self.obj.is_todo_log(MagicMock()))
+
+
+class InboxTest(TestCase):
+
+    def setUp(self):
+        self.catalyst = mommy.make(_model=get_user_model())
+        self.reviewer = mommy.make(_model=get_user_model())
+        self.questionnaire = mommy.make(
+            _model=Questionnaire,
+            status=settings.QUESTIONNAIRE_SUBMITTED
+        )
+        self.membership = mommy.make(
+            _model=QuestionnaireMembership,
+            questionnaire=self.questionnaire,
+            user=self.reviewer,
+            role=settings.QUESTIONNAIRE_REVIEWER
+        )
+        self.log = mommy.make(
+            _model=Log,
+            action=settings.NOTIFICATIONS_CHANGE_STATUS,
+            catalyst=self.catalyst,
+            questionnaire=self.questionnaire
+        )
+        mommy.make(
+            _model=StatusUpdate,
+            log=self.log,
+            status=settings.QUESTIONNAIRE_SUBMITTED
+        )
+
+    def get_entry(self, user):
+        return InboxEntry.objects.get(user=user, log=self.log)
+
+    def test_for_user_builds_inbox(self):
+        inbox = Inbox.for_user(self.catalyst)
+        self.assertEqual(
+            list(inbox.get_logs().values_list('id', flat=True)), [self.log.id]
+        )
+        self.assertFalse(self.get_entry(self.catalyst).is_pending)
+
+    def test_membership_permissions_pending(self):
+        inbox = Inbox.for_user(self.reviewer)
+        self.assertTrue(self.get_entry(self.reviewer).is_pending)
+        self.assertEqual(inbox.get_counts(), {'unread': 1, 'pending': 1})
+
+    def test_read_log(self):
+        inbox = Inbox.for_user(self.reviewer)
+        ReadLog.objects.create(user=self.reviewer, log=self.log, is_read=True)
+        Inbox.sync_questionnaire([self.reviewer.id], self.questionnaire.id)
+        entry = self.get_entry(self.reviewer)
+        self.assertTrue(entry.is_read)
+        self.assertFalse(entry.is_pending)
+        self.assertEqual(inbox.get_counts(), {'unread': 0, 'pending': 0})
+
+    def test_removed_membership(self):
+        Inbox.for_user(self.reviewer)
+        self.membership.delete()
+        self.assertFalse(
+            InboxEntry.objects.filter(user=self.reviewer).exists()
+        )
+
+    def test_new_log_is_added(self):
+        Inbox.for_user(self.reviewer)
+        self.questionnaire.status = settings.QUESTIONNAIRE_REVIEWED
+        self.questionnaire.save()
+        log = StatusLog(
+            action=settings.NOTIFICATIONS_CHANGE_STATUS,
+            sender=self.catalyst,
+            questionnaire=self.questionnaire
+        )
+        log.create(is_rejected=False, message='', previous_status=None)
+        # The reviewer is a subscriber of the new log, the previous log is
+        # not pending anymore.
+        self.assertTrue(
+            InboxEntry.objects.filter(user=self.reviewer, log=log.log).exists()
+        )
+        self.assertFalse(self.get_entry(self.reviewer).is_pending)
+
+    def test_mark_all_read(self):
+        inbox = Inbox.for_user(self.catalyst)
+        Log.actions.mark_all_read(user=self.catalyst)
+        self.assertTrue(self.get_entry(self.catalyst).is_read)
+        self.assertEqual(inbox.get_counts()['unread'], 0)
+
+    def test_group_change_outdates_inbox(self):
+        inbox = Inbox.for_user(self.catalyst)
+        self.catalyst.groups.add(mommy.make(_model=Group))
+        inbox.refresh_from_db()
+        self.assertTrue(inbox.is_outdated)
+        Inbox.for_user(self.catalyst)
+        inbox.refresh_from_db()
+        self.assertFalse(inbox.is_outdated)
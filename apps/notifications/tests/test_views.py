@@ -12,8 +12,8 @@ from django.test import RequestFactory
 from braces.views import LoginRequiredMixin
 from django.test import override_settings
 from model_mommy import mommy
-from notifications.models import Log, StatusUpdate, MemberUpdate, ReadLog, \
-    ActionContextQuerySet
+from notifications.models import Inbox, Log, StatusUpdate, MemberUpdate, \
+    ReadLog
 from notifications.views import LogListView, LogCountView, ReadLogUpdateView, \
     LogQuestionnairesListView, LogInformationUpdateCreateView, \
     LogSubscriptionPreferencesView, SignedLogSubscriptionPreferencesView
@@ -54,18 +54,6 @@ class LogListViewTest(TestCase):
     def test_force_login(self):
         self.assertIsInstance(self.view_instance, LoginRequiredMixin)
 
-    def test_queryset_method(self):
-        self.assertEqual(
-            self.view_instance.queryset_method,
-            'user_log_list'
-        )
-
-    def test_queryset_method_pending(self):
-        self.assertEqual(
-            self.get_view_with_get_querystring('is_pending').queryset_method,
-            'user_pending_list'
-        )
-
     def test_get_paginate_by(self):
         self.assertEqual(
             self.view_instance.get_paginate_by(None),
@@ -78,15 +66,27 @@ class LogListViewTest(TestCase):
             settings.NOTIFICATIONS_TEASER_PAGINATE_BY
         )
 
-    @mock.patch('notifications.views.Log.actions.user_log_list')
-    def test_get_queryset(self, mock_actions):
+    @mock.patch('notifications.views.Inbox.for_user')
+    def test_get_queryset(self, mock_for_user):
         self.view_instance.get_queryset()
-        mock_actions.assert_called_once_with(user={})
+        mock_for_user.assert_called_once_with({})
+        mock_for_user.return_value.get_logs.assert_called_once_with(
+            is_pending=False, is_unread=False
+        )
 
-    @mock.patch('notifications.views.Log.actions.user_pending_list')
-    def test_get_queryset_pending(self, mock_actions):
+    @mock.patch('notifications.views.Inbox.for_user')
+    def test_get_queryset_pending(self, mock_for_user):
         self.get_view_with_get_querystring('is_pending').get_queryset()
-        mock_actions.assert_called_once_with(user={})
+        mock_for_user.return_value.get_logs.assert_called_once_with(
+            is_pending=True, is_unread=False
+        )
+
+    @mock.patch('notifications.views.Inbox.for_user')
+    def test_get_queryset_unread(self, mock_for_user):
+        self.get_view_with_get_querystring('is_unread').get_queryset()
+        mock_for_user.return_value.get_logs.assert_called_once_with(
+            is_pending=False, is_unread=True
+        )
 
     @mock.patch.object(LogListView, 'add_user_aware_data')
     def test_get_context_data_logs(self, mock_add_user_aware_data):
@@ -136,16 +136,16 @@ class LogListViewTest(TestCase):
             {'foo': 'bar', 'result': '42'}
         )
 
-    @mock.patch('notifications.views.Log.actions.user_log_list')
-    def test_status_filter_queryset(self, mock_user_log_list):
-        mock_user_log_list.return_value = []
+    @mock.patch('notifications.views.Inbox.for_user')
+    def test_status_filter_queryset(self, mock_for_user):
+        mock_for_user.return_value.get_logs.return_value = []
         self.assertEqual(
             [], self.view_instance.get_queryset()
         )
 
-    @mock.patch('notifications.views.Log.actions.user_log_list')
-    def test_status_filter_queryset_for_status(self, mock_user_log_list):
-        mock_user_log_list.return_value = Log.objects.filter()
+    @mock.patch('notifications.views.Inbox.for_user')
+    def test_status_filter_queryset_for_status(self, mock_for_user):
+        mock_for_user.return_value.get_logs.return_value = Log.objects.filter()
         view = self.view
         view.get_statuses = mock.MagicMock(return_value=[3])
         view_instance = self.setup_view(
@@ -206,15 +206,23 @@ class ReadLogUpdateViewTest(TestCase):
             self.view_instance.validate_data(checked='1', log='1', user='123')
         )
 
+    @mock.patch('notifications.views.Inbox.sync_questionnaire')
     @mock.patch('notifications.views.ReadLog.objects.update_or_create')
-    def test_post_valid_checked(self, mock_get_or_create):
+    def test_post_valid_checked(self, mock_get_or_create, mock_sync):
+        read_log = mock.MagicMock()
+        mock_get_or_create.return_value = (read_log, True)
         self.view_instance.post(request=self.request)
         mock_get_or_create.assert_called_once_with(
             user_id='123', log_id='log', defaults={'is_read': True}
         )
+        mock_sync.assert_called_once_with(
+            [123], read_log.log.questionnaire_id
+        )
 
+    @mock.patch('notifications.views.Inbox.sync_questionnaire')
     @mock.patch('notifications.views.ReadLog.objects.update_or_create')
-    def test_post_valid_unchecked(self, mock_get_or_create):
+    def test_post_valid_unchecked(self, mock_get_or_create, mock_sync):
+        mock_get_or_create.return_value = (mock.MagicMock(), False)
         request = RequestFactory().post(
             reverse('notification_read'),
             data={'user': 123, 'log': 'log', 'checked': 'false'}
@@ -252,11 +260,10 @@ class LogCountViewTest(TestCase):
             _quantity=2
         )
 
-    @mock.patch('notifications.views.Log.actions.only_unread_logs')
-    def test_get_unread_only(self, mock_only_unread_logs):
+    def test_log_count_builds_inbox(self):
         self.view.get(request=self.request)
-        mock_only_unread_logs.assert_called_once_with(
-            user=self.request.user
+        self.assertEqual(
+            Inbox.objects.get(user=self.request.user).entries.count(), 4
         )
 
     def test_log_count(self):
@@ -282,10 +289,10 @@ class LogQuestionnairesListViewTest(TestCase):
         self.request.user = 'foo'
         self.view = self.setup_view(view=LogQuestionnairesListView(), request=self.request)
 
-    @mock.patch.object(ActionContextQuerySet, 'user_log_list')
-    def test_get_questionnaire_logs(self, mock_user_log_list):
+    @mock.patch('notifications.views.Inbox.for_user')
+    def test_get_questionnaire_logs(self, mock_for_user):
         self.view.get_questionnaire_logs('foo')
-        mock_user_log_list.assert_called_once_with(user='foo')
+        mock_for_user.assert_called_once_with('foo')
 
 
     @mock.patch.object(LogQuestionnairesListView, 'get_questionnaire_logs')
@@ -1,7 +1,7 @@
 from accounts.models import User
 from questionnaire.models import Questionnaire
 
-from .models import Log, StatusUpdate, ContentUpdate, MemberUpdate, \
+from .models import Inbox, Log, StatusUpdate, ContentUpdate, MemberUpdate, \
     InformationUpdate
 
 
@@ -30,6 +30,10 @@ class CreateLog:
         )
         self.log.subscribers.add(*members)
 
+    def add_to_inboxes(self):
+        # Call this once the log is complete (incl. its update).
+        Inbox.add_log(self.log)
+
 
 class ContentLog(CreateLog):
     """
@@ -39,6 +43,7 @@ class ContentLog(CreateLog):
         ContentUpdate.objects.create(
             log=self.log
         )
+        self.add_to_inboxes()
 
 
 class StatusLog(CreateLog):
@@ -55,6 +60,7 @@ class StatusLog(CreateLog):
             message=message,
             previous_status=previous_status,
         )
+        self.add_to_inboxes()
 
 
 class MemberLog(CreateLog):
@@ -67,6 +73,7 @@ class MemberLog(CreateLog):
             affected=affected,
             role=role
         )
+        self.add_to_inboxes()
 
 
 class InformationLog(CreateLog):
@@ -88,3 +95,4 @@ class InformationLog(CreateLog):
             log=self.log,
             info=info
         )
+        self.add_to_inboxes()
@@ -26,7 +26,7 @@ from questionnaire.view_utils import get_pagination_parameters
 
 from .forms import MailPreferencesUpdateForm
 from .utils import InformationLog
-from .models import Log, ReadLog, MailPreferences
+from .models import Inbox, Log, ReadLog, MailPreferences
 
 logger = logging.getLogger(__name__)
 
@@ -70,13 +70,6 @@ class LogListView(LoginRequiredMixin, ListView):
                 'next_status_text': False
             }
 
-    @property
-    def queryset_method(self):
-        """
-        Get the proper method name according to the GET request.
-        """
-        return 'user_pending_list' if 'is_pending' in self.request.GET.keys() else 'user_log_list'
-
     def get_paginate_by(self, queryset) -> int:
         """
         Return the setting variable according to the GET querystring.
@@ -105,10 +98,14 @@ class LogListView(LoginRequiredMixin, ListView):
 
     def get_queryset(self):
         """
-        Fetch notifications for the current user. Use the method as defined by
-        the instance variable. Filter according to questionnaire if requested.
+        Fetch notifications for the current user from the inbox, only pending
+        and / or unread ones if requested. Filter according to questionnaire if
+        requested.
         """
-        qs = getattr(Log.actions, self.queryset_method)(user=self.request.user)
+        qs = Inbox.for_user(self.request.user).get_logs(
+            is_pending='is_pending' in self.request.GET.keys(),
+            is_unread='is_unread' in self.request.GET.keys()
+        )
 
         # apply filter for actions ('status' on the frontend)
         statuses = self.get_statuses()
@@ -119,10 +116,6 @@ class LogListView(LoginRequiredMixin, ListView):
         if self.requested_questionnaire:
             qs = qs.filter(questionnaire__code=self.requested_questionnaire)
 
-        # apply filter for read/unread notifications
-        if 'is_unread' in self.request.GET.keys():
-            qs = qs.only_unread_logs(user=self.request.user)
-
         return qs
 
     def get_context_data(self, **kwargs):
@@ -171,11 +164,13 @@ class ReadLogUpdateView(LoginRequiredMixin, View):
         data = request.POST.dict()
         is_valid = self.validate_data(**data)
         if is_valid:
-            ReadLog.objects.update_or_create(
+            read_log, __ = ReadLog.objects.update_or_create(
                 user_id=data['user'], log_id=data['log'],
                 defaults={
                     'is_read': True if data['checked'] == 'true' else False}
             )
+            Inbox.sync_questionnaire(
+                [request.user.id], read_log.log.questionnaire_id)
             return HttpResponse(status=200)
         else:
             logging.error('Invalid attempt to update a ReadLog '
@@ -185,7 +180,7 @@ class ReadLogUpdateView(LoginRequiredMixin, View):
 
 class LogCountView(LoginRequiredMixin, View):
     """
-    Get the current number of 'pending' notifications for the current user.
+    Get the current number of unread notifications for the current user.
     Used to display the indicator with
     number next to the username in the menu.
     """
@@ -193,11 +188,7 @@ class LogCountView(LoginRequiredMixin, View):
 
     def get(self, request, *args, **kwargs):
         return HttpResponse(
-            content=Log.actions.only_unread_logs(
-                user=self.request.user
-            ).user_log_count(
-                user=self.request.user
-            )
+            content=Inbox.for_user(self.request.user).get_counts()['unread']
         )
 
 
@@ -209,10 +200,12 @@ class LogTodoView(LoginRequiredMixin, View):
     http_method_names = ['post']
 
     def post(self, request, *args, **kwargs):
-        pending = Log.actions.user_pending_list(user=request.user).values_list('id', flat=True)
         log_ids = [int(log_id) for log_id in request.POST.getlist('logs[]', [])]
+        pending = Inbox.for_user(request.user).entries.filter(
+            is_pending=True, log_id__in=log_ids
+        ).values_list('log_id', flat=True)
         return HttpResponse(
-            content=json.dumps(list(set(pending).intersection(log_ids))),
+            content=json.dumps(list(pending)),
             content_type='application/json'
         )
 
@@ -228,9 +221,7 @@ class LogQuestionnairesListView(LoginRequiredMixin, View):
         """
         Get all distinct questionnaires that the user has logs for.
         """
-        return Log.actions.user_log_list(
-            user=user
-        ).values_list(
+        return Inbox.for_user(user).get_logs().values_list(
             'questionnaire__code', flat=True
         ).order_by(
             'questionnaire_id'
@@ -311,6 +302,9 @@ class LogAllReadView(LoginRequiredMixin, View):
         ).update(
             is_deleted=True
         )
+        inbox = Inbox.for_user(self.request.user)
+        inbox.entries.filter(is_read=True).update(is_deleted=True)
+        inbox.delete_counts()
 
     def post(self, request, *args, **kwargs):
         if self.request.GET.get('delete', '') == 'true':
@@ -163,6 +163,8 @@ class BaseSettings(Configuration):
         ('medium', (1440, 1080)),
         # 'large' is the original uploaded image.
     )
+    # Number of threads creating the thumbnails of an upload.
+    UPLOAD_THUMBNAIL_WORKERS = 3
     THUMBNAIL_ALIASES = {
         'summary': {
             'screen': {
@@ -216,6 +218,20 @@ class BaseSettings(Configuration):
     }
 
     SUMMARY_PDF_PATH = join(MEDIA_ROOT, 'summary-pdf')
+    # Maximum size (in MB) of the rendered summaries. The cache is evicted by
+    # the management command 'clean_summary_pdfs'.
+    SUMMARY_PDF_CACHE_SIZE = values.IntegerValue(
+        environ_prefix='', default=2048)
+    # Number of seconds to wait for another process rendering the same summary.
+    SUMMARY_PDF_LOCK_TIMEOUT = 120
+
+    # Downloaded tiles of the static maps of questionnaires, and the number of
+    # seconds before a tile is downloaded again.
+    STATIC_MAP_TILE_CACHE_PATH = join(MEDIA_ROOT, 'map-tiles')
+    STATIC_MAP_TILE_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+
+    # Snapshots of the exports of all public questionnaires (API v2).
+    QUESTIONNAIRE_EXPORT_PATH = join(MEDIA_ROOT, 'export')
 
     TEMPLATES = [
         {
@@ -303,6 +319,15 @@ class BaseSettings(Configuration):
         'VALIDATOR_URL': None,
     }
     API_PAGE_SIZE = values.IntegerValue(default=25, environ_prefix='')
+    # Requests to the API are logged in batches: after this number of requests
+    # or if the oldest logged request is older than this number of seconds.
+    API_REQUEST_LOG_BUFFER_SIZE = values.IntegerValue(
+        default=100, environ_prefix='')
+    API_REQUEST_LOG_FLUSH_INTERVAL = 10
+    # Seconds the data of unchanged API responses (questionnaire details,
+    # configuration structure) is kept in the cache.
+    API_RESPONSE_CACHE_TIMEOUT = values.IntegerValue(
+        default=60 * 60, environ_prefix='')
 
     CORS_ORIGIN_WHITELIST = values.ListValue(environ_prefix='', default=[])
 
@@ -346,10 +371,20 @@ class BaseSettings(Configuration):
 
     # Flag for caching of the whole configuration object. Sections are always cached.
     USE_CACHING = values.BooleanValue(default=True)
+    # If set, compiled configurations are stored in memory-mapped files in this
+    # directory (shared by all processes of the host) instead of the default
+    # cache.
+    CONFIGURATION_SHARED_CACHE_PATH = values.Value(
+        environ_prefix='', default='')
     # django-cache-url doesn't support the redis package of our choice, set the redis location as
     # common environment (dict)value.
     CACHES = values.DictValue(environ_prefix='')
     KEY_PREFIX = values.Value(environ_prefix='', default='')
+    # Set to true if the queue workers (process_es_queue, process_static_maps
+    # and process_summary_queue) are running. Otherwise, the queued index
+    # updates and static maps are processed when the transaction is committed
+    # and summaries are only rendered on their first download.
+    USE_QUEUE_WORKERS = values.BooleanValue(environ_prefix='', default=False)
 
     # If set to true, the template 503.html is displayed.
     MAINTENANCE_MODE = values.BooleanValue(environ_prefix='', default=False)
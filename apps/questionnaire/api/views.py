@@ -2,7 +2,7 @@ from collections import OrderedDict
 import logging
 
 from django.core.paginator import EmptyPage
-from django.http import Http404
+from django.http import Http404, StreamingHttpResponse
 from django.utils.translation import get_language
 from django.shortcuts import get_list_or_404
 from django.db.models import Q
@@ -23,13 +23,16 @@ from PIL import Image
 from questionnaire.serializers import QuestionnaireInputSerializer
 from questionnaire.utils import validate_questionnaire_data, is_valid_questionnaire_format, compare_questionnaire_data
 from configuration.structure import ConfigurationStructure
+from api.conditional import ConditionalResponseMixin
 from api.views import LogEditAPIMixin, AppPermissionMixin
-from configuration.cache import get_configuration
+from configuration.cache import get_configuration, get_configuration_generation
 from api.views import LogUserMixin, PermissionMixin
 from configuration.configured_questionnaire import ConfiguredQuestionnaire
+from configuration.models import Configuration
 from questionnaire.views import ESQuestionnaireQueryMixin
 from search.search import get_element
 from ..conf import settings
+from ..export import EXPORT_FORMATS, get_export_chunks
 from ..models import Questionnaire, APIEditRequests, File
 from ..utils import get_list_values, get_questionnaire_data_in_single_language
 
@@ -53,7 +56,14 @@ class QuestionnaireAPIMixin(PermissionMixin, LogUserMixin, GenericAPIView):
         After discussion with the people consuming the api, the language of
         the content is used as key, i.e.: 'unccd_description': 'a title' becomes
         'definition: {'en': 'a title'}
+
+        The 'full' data of all questionnaires of the page is fetched with a
+        single query.
         """
+        es_hits = list(es_hits)
+        self.objects_data = self.get_objects_data(
+            codes=[es_hit.get('_source', {}).get('code') for es_hit in es_hits]
+        )
         for es_hit in es_hits:
             yield self.replace_keys(es_hit)
 
@@ -108,8 +118,23 @@ class QuestionnaireAPIMixin(PermissionMixin, LogUserMixin, GenericAPIView):
         return list_values
 
     def get_object_data(self, code: str) -> dict:
-        obj = self.object if hasattr(self, 'object') else self.get_current_object(code=code)
-        return obj.data
+        if hasattr(self, 'object'):
+            return self.object.data
+        objects_data = getattr(self, 'objects_data', {})
+        if code in objects_data:
+            return objects_data[code]
+        # Not (or no longer) public: raises 404 as before.
+        return self.get_current_object(code=code).data
+
+    def get_objects_data(self, codes: list) -> dict:
+        """
+        Returns: dict with the data of all public questionnaires by their code.
+        """
+        if not codes:
+            return {}
+        return dict(Questionnaire.with_status.public().filter(
+            code__in=codes
+        ).values_list('code', 'data'))
 
     def filter_dict(self, items: dict):
         """
@@ -153,6 +178,10 @@ class QuestionnaireListView(QuestionnaireAPIMixin, ESQuestionnaireQueryMixin):
     view (search/filter in QCAT) can be passed.
 
     ``page``: Optional page offset.
+
+    ``cursor``: Optional cursor for deep pagination, use an empty value for
+    the first page. The ``next`` link contains the cursor of the following
+    page. Use this to walk all questionnaires.
     """
     page_size = settings.API_PAGE_SIZE
     add_detail_url = True
@@ -221,10 +250,24 @@ class QuestionnaireListView(QuestionnaireAPIMixin, ESQuestionnaireQueryMixin):
             return remove_query_param(url, 'page')
         return replace_query_param(url, 'page', page_number)
 
+    def _get_cursor_link(self) -> str:
+        """
+        Returns:
+            string: URL of the next page (cursors only point forward)
+        """
+        if not self.next_cursor:
+            return ''
+        url = remove_query_param(self.request.build_absolute_uri(), 'page')
+        return replace_query_param(url, 'cursor', self.next_cursor)
+
     def get_next_link(self) -> str:
+        if self.search_after is not None:
+            return self._get_cursor_link()
         return self._get_paginate_link(self.current_page + 1)
 
     def get_previous_link(self)  -> str:
+        if self.search_after is not None:
+            return ''
         return self._get_paginate_link(self.current_page - 1)
 
 
@@ -251,13 +294,17 @@ class QuestionnaireDetailView(QuestionnaireAPIMixin):
         return Response(self.replace_keys(es_hit={'_source': es_hit}))
 
 
-class ConfiguredQuestionnaireDetailView(QuestionnaireDetailView):
+class ConfiguredQuestionnaireDetailView(
+        ConditionalResponseMixin, QuestionnaireDetailView):
     """
     Get a single Questionnaire for API v2.
 
     Return a single Questionnaire by its code. The returned data contains the
     full configuration (including labels of sections, questiongroups etc.).
 
+    Responses contain an ``ETag`` header, use ``If-None-Match`` to only fetch
+    changed questionnaires.
+
     ``identifier``: The identifier / code of the questionnaire.
     """
 
@@ -295,10 +342,91 @@ class ConfiguredQuestionnaireDetailView(QuestionnaireDetailView):
             **data
         ).store
 
+    def get_validators(self) -> list:
+        """
+        The response changes with a new version of the questionnaire or the
+        configuration, and with the (names of the) linked questionnaires.
+        """
+        configuration = self.object.configuration
+        links = list(self.object.links.filter(
+            status=settings.QUESTIONNAIRE_PUBLIC
+        ).values_list('id', 'updated'))
+        return [
+            self.object.id, self.object.version, self.object.updated,
+            configuration.code, configuration.edition, configuration.created,
+            get_configuration_generation(
+                configuration.code, configuration.edition),
+            *links
+        ]
+
+    def get_response_data(self) -> dict:
+        prepared_data = self.prepare_data()
+        return self.get_configured_questionnaire(**prepared_data)
+
     def get(self, request, *args, **kwargs):
         self.object = self.get_current_object()
-        prepared_data = self.prepare_data()
-        return Response(self.get_configured_questionnaire(**prepared_data))
+        return self.get_conditional_response(request)
+
+
+class QuestionnaireExportView(PermissionMixin, LogUserMixin, GenericAPIView):
+    """
+    Export all public questionnaires of a configuration for API v2.
+
+    Return all public questionnaires of the configuration edition in the
+    current language, as newline delimited JSON (one questionnaire per line,
+    the same data as the details) or as CSV (one column per question). Use
+    this instead of walking through the list to fetch all questionnaires.
+
+    ``configuration``: The code of the configuration (e.g. "technologies").
+
+    ``edition``: The edition of the configuration (e.g. "2018").
+
+    Optional request params:
+
+    ``file_format``: "ndjson" (default) or "csv".
+
+    ``compression``: "gzip" to download a gzip compressed file.
+    """
+
+    def perform_content_negotiation(self, request, force=False):
+        # The export is streamed as is and not rendered.
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, *args, **kwargs):
+        file_format = request.GET.get('file_format', 'ndjson')
+        if file_format not in EXPORT_FORMATS:
+            return Response(
+                {'detail': 'Available formats: {}.'.format(
+                    ', '.join(EXPORT_FORMATS))},
+                status=status.HTTP_400_BAD_REQUEST)
+        compress = request.GET.get('compression') == 'gzip'
+
+        configuration = get_object_or_404(
+            Configuration,
+            code=kwargs['configuration'],
+            edition=kwargs['edition']
+        )
+        language = get_language()
+        filename = '{}_{}_{}.{}'.format(
+            configuration.code, configuration.edition, language, file_format)
+        if compress:
+            content_type = 'application/gzip'
+            filename += '.gz'
+        else:
+            content_type = EXPORT_FORMATS[file_format]
+
+        response = StreamingHttpResponse(
+            get_export_chunks(
+                configuration=configuration,
+                language=language,
+                file_format=file_format,
+                compress=compress
+            ),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = 'attachment; filename="{}"'.format(
+            filename)
+        return response
 
 
 class QuestionnaireCreateNew(CreateModelMixin, AppPermissionMixin, LogEditAPIMixin, GenericAPIView):
@@ -714,6 +842,9 @@ class QuestionnaireMyData(AppPermissionMixin, LogEditAPIMixin, GenericAPIView):
         # Array for accumulating the questionnaires
         list_entries = []
 
+        # The images of all questionnaires are queried at once
+        files_data = File.get_list_image_data(query)
+
         for obj in query:
             # For each questionnaire following attributes are fetched
             # - name
@@ -726,7 +857,8 @@ class QuestionnaireMyData(AppPermissionMixin, LogEditAPIMixin, GenericAPIView):
             # - status <draft|public>
 
             # Metadata from the configuration template is fetched
-            questionnaire_data = obj.configuration_object.get_list_data([obj.data])[0]
+            questionnaire_data = obj.configuration_object.get_list_data(
+                [obj.data], files_data=files_data)[0]
 
             # Country & code specific definition/description fields are removed
             # - Only name, image path & short definition are appended
@@ -1,3 +1,5 @@
+import os
+
 from django.conf import settings  # noqa
 from appconf import AppConf
 from django.utils.translation import ugettext as _
@@ -80,3 +82,12 @@ class QuestionnaireConf(AppConf):
     )
 
     LOCK_TIME = 10  # Number of minutes that questionnaires are locked.
+
+    # Number of seconds the rendered sections of public questionnaires are
+    # kept in the cache for anonymous users.
+    DETAILS_CACHE_TIMEOUT = 60 * 60 * 24
+
+    # Bounding boxes of the countries ({iso2: [west, south, east, north]}),
+    # used for the static maps of questionnaires.
+    COUNTRY_BOUNDING_BOXES_PATH = os.path.join(
+        os.path.dirname(__file__), 'data', 'country_bounding_boxes.json')
@@ -0,0 +1,281 @@
+"""
+Export of all public questionnaires of a configuration (edition) in a given
+language, as newline delimited JSON (one questionnaire per line) or CSV (one
+column per question).
+
+The rows are built with
+:class:`configuration.configured_questionnaire.ConfiguredQuestionnaire` (the
+same as the details of the API v2) while iterating over the questionnaires
+with a server side cursor, so the export is streamed and never held in memory
+as a whole.
+
+Each export is written to a (gzip compressed) snapshot file in
+``QUESTIONNAIRE_EXPORT_PATH`` while it is streamed. The name of the snapshot
+contains a stamp of the exported questionnaires (see
+:func:`get_export_stamp`), further requests are served from the snapshot
+until a questionnaire of the configuration changes. The management command
+``export_questionnaires`` regenerates outdated snapshots periodically.
+"""
+import contextlib
+import csv
+import glob
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+
+from django.db.models import Count, Max
+from django.utils import translation
+from rest_framework.utils.encoders import JSONEncoder
+
+from configuration.cache import get_configuration, get_configuration_generation
+from configuration.configured_questionnaire import ConfiguredQuestionnaire
+from .conf import settings
+from .models import Questionnaire, QuestionnaireLink
+from .utils import get_questionnaire_data_in_single_language
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+# Increase this if the format of the exported rows changes, so all snapshots
+# are regenerated.
+EXPORT_VERSION = 1
+CHUNK_SIZE = 64 * 1024
+
+
+class Echo:
+    """
+    A file-like object for the csv writer, returning the written row.
+    """
+    def write(self, value):
+        return value
+
+
+def get_export_queryset(configuration):
+    return Questionnaire.with_status.public().filter(
+        configuration=configuration
+    ).order_by('id')
+
+
+def get_export_stamp(configuration) -> str:
+    """
+    Return a stamp of the exported questionnaires of a configuration, which
+    changes if a questionnaire is published, updated or removed, if a link of
+    an exported questionnaire (or the linked questionnaire) changes, or if
+    the configuration changes.
+    """
+    questionnaires = get_export_queryset(configuration)
+    aggregate = questionnaires.aggregate(
+        count=Count('id'), last_id=Max('id'), last_updated=Max('updated'))
+    # The names and URLs of the (public) linked questionnaires are exported.
+    links = QuestionnaireLink.objects.filter(
+        from_questionnaire__in=questionnaires.order_by(),
+        to_questionnaire__status=settings.QUESTIONNAIRE_PUBLIC
+    ).aggregate(
+        count=Count('id'), last_id=Max('id'),
+        last_updated=Max('to_questionnaire__updated'))
+    value = '|'.join(str(part) for part in [
+        EXPORT_VERSION, aggregate['count'], aggregate['last_id'],
+        aggregate['last_updated'], links['count'], links['last_id'],
+        links['last_updated'], configuration.created,
+        get_configuration_generation(configuration.code, configuration.edition)
+    ])
+    return hashlib.sha1(value.encode('utf-8')).hexdigest()[:16]
+
+
+def get_snapshot_prefix(configuration, language: str, file_format: str) -> str:
+    return os.path.join(
+        settings.QUESTIONNAIRE_EXPORT_PATH,
+        f'{configuration.code}_{configuration.edition}_{language}_'
+        f'{file_format}')
+
+
+def get_snapshot_path(configuration, language: str, file_format: str) -> str:
+    prefix = get_snapshot_prefix(configuration, language, file_format)
+    return f'{prefix}_{get_export_stamp(configuration)}.gz'
+
+
+def get_questionnaire_store(questionnaire, configuration_object) -> dict:
+    """
+    Return the questionnaire data combined with the configuration in the
+    current language, as in the details of the API v2.
+    """
+    language = translation.get_language()
+    data = get_questionnaire_data_in_single_language(
+        questionnaire_data=questionnaire.data,
+        locale=language,
+        original_locale=questionnaire.original_locale
+    )
+    links = questionnaire.links_property
+    for link in links:
+        for field in ['name', 'url']:
+            link[field] = link[field].get(language, link[field]['default'])
+    data['links'] = links
+    return ConfiguredQuestionnaire(
+        config=configuration_object,
+        questionnaire=questionnaire,
+        **data
+    ).store
+
+
+def iter_store_values(store: dict, path=()):
+    """
+    Yield the path (keywords joined by '.') and the value of all questions of
+    a store of a ConfiguredQuestionnaire.
+    """
+    for keyword, element in store.items():
+        if 'children' in element:
+            yield from iter_store_values(element['children'], path + (keyword,))
+        else:
+            yield '.'.join(path + (keyword,)), element.get('value')
+
+
+def get_csv_value(value) -> str:
+    """
+    Return a single cell for the value of a question. Multiple values are
+    separated with ' | '.
+    """
+    if value is None or value == '':
+        return ''
+    if isinstance(value, list):
+        return ' | '.join(filter(None, (get_csv_value(v) for v in value)))
+    if isinstance(value, dict):
+        if 'value' in value:
+            return get_csv_value(value['value'])
+        return json.dumps(value, cls=JSONEncoder)
+    return str(value)
+
+
+def iter_export(configuration, language: str, file_format: str):
+    """
+    Yield the lines of the export of all public questionnaires of a
+    configuration.
+    """
+    with translation.override(language):
+        configuration_object = get_configuration(
+            code=configuration.code, edition=configuration.edition)
+        questionnaires = get_export_queryset(configuration).iterator()
+
+        if file_format == 'csv':
+            writer = csv.writer(Echo())
+            empty_store = ConfiguredQuestionnaire(
+                config=configuration_object, questionnaire=None).store
+            yield writer.writerow(['code', 'version', 'updated'] + [
+                path for path, __ in iter_store_values(empty_store)])
+            for questionnaire in questionnaires:
+                store = get_questionnaire_store(
+                    questionnaire, configuration_object)
+                yield writer.writerow([
+                    questionnaire.code, questionnaire.version,
+                    questionnaire.updated.isoformat()
+                ] + [get_csv_value(value)
+                     for __, value in iter_store_values(store)])
+        else:
+            for questionnaire in questionnaires:
+                yield json.dumps({
+                    'code': questionnaire.code,
+                    'version': questionnaire.version,
+                    'updated': questionnaire.updated,
+                    'data': get_questionnaire_store(
+                        questionnaire, configuration_object),
+                }, cls=JSONEncoder) + '\n'
+
+
+def write_snapshot(snapshot_path: str, lines):
+    """
+    Yield the encoded lines and write them to the (compressed) snapshot. The
+    snapshot is written to a temporary file first and only moved if all lines
+    were written, so an interrupted download never leaves a partial snapshot.
+    Older snapshots of the same export are removed.
+    """
+    os.makedirs(os.path.dirname(snapshot_path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(snapshot_path))
+    is_complete = False
+    try:
+        with os.fdopen(fd, 'wb') as f, gzip.GzipFile(
+                fileobj=f, mode='wb') as snapshot:
+            for line in lines:
+                content = line.encode('utf-8')
+                snapshot.write(content)
+                yield content
+        os.replace(tmp_path, snapshot_path)
+        is_complete = True
+    finally:
+        if not is_complete:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
+    remove_old_snapshots(snapshot_path)
+
+
+def remove_old_snapshots(snapshot_path: str):
+    prefix = snapshot_path.rsplit('_', 1)[0]
+    for file_path in glob.glob(f'{glob.escape(prefix)}_*.gz'):
+        if file_path != snapshot_path:
+            with contextlib.suppress(OSError):
+                os.unlink(file_path)
+
+
+def read_snapshot(f, decompress: bool):
+    with f:
+        if decompress:
+            f = gzip.GzipFile(fileobj=f, mode='rb')
+        while True:
+            content = f.read(CHUNK_SIZE)
+            if not content:
+                break
+            yield content
+
+
+def compress_chunks(chunks):
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        content = compressor.compress(chunk)
+        if content:
+            yield content
+    yield compressor.flush()
+
+
+def get_export_chunks(configuration, language: str, file_format: str,
+                      compress: bool=False):
+    """
+    Return an iterator over the (encoded) export, from the snapshot if it is
+    up to date.
+
+    Args:
+        ``configuration`` (configuration.models.Configuration): The
+        configuration (edition) of the exported questionnaires.
+
+        ``language`` (str): The language of the export.
+
+        ``file_format`` (str): One of ``EXPORT_FORMATS``.
+
+        ``compress`` (bool): Whether the export is gzip compressed.
+    """
+    snapshot_path = get_snapshot_path(configuration, language, file_format)
+    try:
+        return read_snapshot(open(snapshot_path, 'rb'), decompress=not compress)
+    except OSError:
+        pass
+    chunks = write_snapshot(
+        snapshot_path, iter_export(configuration, language, file_format))
+    return compress_chunks(chunks) if compress else chunks
+
+
+def update_snapshot(configuration, language: str, file_format: str,
+                    force: bool=False) -> bool:
+    """
+    Write the snapshot of an export if it is outdated.
+
+    Returns:
+        ``bool``. Whether the snapshot was written.
+    """
+    snapshot_path = get_snapshot_path(configuration, language, file_format)
+    if not force and os.path.exists(snapshot_path):
+        return False
+    for __ in write_snapshot(
+            snapshot_path, iter_export(configuration, language, file_format)):
+        pass
+    return True
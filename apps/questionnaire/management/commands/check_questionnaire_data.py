@@ -4,18 +4,47 @@ incorrectly (according to the configuration) in the database. This mainly due to
 historic reasons (incorrect update of configuration) and should only concern
 old questionnaires (around ID 500).
 
+The data is checked in parallel (a pool of processes, each checking batches of
+questionnaires of the same configuration) while the questionnaires are
+streamed from the database. Only the questionnaires with errors are fixed
+afterwards.
+
 DO NOT FORGET TO UPDATE ELASTICSEARCH INDEX AFTER RUNNING THE SCRIPT!
 """
-
+import argparse
+import collections
+import datetime
+import json
+import multiprocessing
+import os
+
+from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import connections
 from django.db.models import Count
 from django.db.models.signals import pre_save
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 
+from configuration.cache import get_configuration
 from questionnaire.models import Questionnaire, QuestionnaireLink
 from questionnaire.receivers import prevent_updates_on_published_items
 from questionnaire.utils import clean_questionnaire_data
 
 
+def parse_since(value):
+    since = parse_datetime(value)
+    if since is None:
+        date = parse_date(value)
+        if date is None:
+            raise argparse.ArgumentTypeError(
+                'Invalid date: "{}" (use YYYY-MM-DD[ HH:MM])'.format(value))
+        since = datetime.datetime.combine(date, datetime.time.min)
+    if settings.USE_TZ and timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
 class Command(BaseCommand):
     """
     Run as
@@ -26,6 +55,9 @@ class Command(BaseCommand):
         python3 manage.py check_questionnaire_data --clean-data
     to actually clean the data and fix all errors which can be fixed
     automatically.
+
+    Use ``--report`` to write all errors to a file (one JSON object per line)
+    and ``--since`` to only check questionnaires updated since a given date.
     """
     help = 'Check and possibly clean questionnaire data.'
 
@@ -37,151 +69,269 @@ class Command(BaseCommand):
             default=False,
             help='Clean the data. Always check first!'
         )
+        parser.add_argument(
+            '--since',
+            type=parse_since,
+            dest='since',
+            help='Only check questionnaires updated since this date '
+                 '(YYYY-MM-DD or YYYY-MM-DD HH:MM).'
+        )
+        parser.add_argument(
+            '--report',
+            dest='report',
+            help='Write the errors to this file, one JSON object per line.'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            dest='workers',
+            help='Number of processes checking the data (default: number of '
+                 'CPUs).'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            dest='batch_size',
+            help='Number of questionnaires checked at once by a process.'
+        )
 
     def handle(self, *args, **options):
 
         do_data_clean = options.get('clean_data')
+        self.report = None
+        if options.get('report'):
+            self.report = open(options['report'], 'w')
+
+        questionnaires = Questionnaire.with_status.not_deleted()
+        if options.get('since'):
+            questionnaires = questionnaires.filter(
+                updated__gte=options['since'])
+
+        checked = 0
+        data_errors = {}
+        for batch_count, batch_errors in iter_check_results(
+                iter_batches(questionnaires, options['batch_size']),
+                options['workers']):
+            checked += batch_count
+            data_errors.update(batch_errors)
+
         if do_data_clean:
             pre_save.disconnect(prevent_updates_on_published_items,
                                 sender=Questionnaire)
 
-        questionnaires = Questionnaire.with_status.not_deleted().all()
-        error_questionnaires = []
-        grouped_errors = {}
-        for questionnaire in questionnaires:
-
-            cleaned_data, errors = clean_questionnaire_data(
-                questionnaire.data, questionnaire.configuration_object)
-
-            if errors:
-                error_questionnaires.append(questionnaire)
-
-                questionnaire_data = questionnaire.data
-                cleaned = False
-
-                print_questionnaire_name(questionnaire)
-
-                for error in errors:
-
-                    if error not in grouped_errors:
-                        grouped_errors[error] = []
-
-                    fixable = error in automatic_fixes
-                    if fixable:
-                        fixable_string = self.style.SQL_COLTYPE('Fixable')
-                    else:
-                        fixable_string = self.style.NOTICE('Not fixable')
-
-                    fixed_string = ''
-                    if do_data_clean and fixable:
-                        fix_function = automatic_fixes[error]
-                        questionnaire_data = fix_function(
-                            questionnaire_data)
-                        cleaned = True
-                        fixed_string = self.style.SQL_COLTYPE('Fixed.')
-
-                    print_error_message(fixable_string, error, fixed_string)
-
-                    grouped_errors[error].append(questionnaire.id)
-
-                print('---')
-                print(self.style.WARNING("{} error(s)".format(len(errors))))
-
-                if cleaned is True:
-                    questionnaire.data = questionnaire_data
-                    questionnaire.save()
-
-                # Fix the problem if there are too many header images. This can
-                # happen if more than one image were uploaded (if upload is
-                # slow, additional pictures can be added). It causes the
-                # interchange images to be broken. But really, it should be
-                # somehow fixed in the code, not afterwards in the data ...
-                # TODO: Prevent upload of multiple images in one upload field.
-                qg_image_data = questionnaire.data.get('qg_image', [])
-                if len(qg_image_data) > 1:
-                    print_questionnaire_name(questionnaire)
-                    fixable_string = self.style.NOTICE('Not fixable')
-                    error = 'Questionnaire has too many "qg_image" ' \
-                            'questiongroups'
-                    fixed_string = ''
-                    print_error_message(fixable_string, error, fixed_string)
-                elif len(qg_image_data) == 1:
-                    image_data = qg_image_data[0]
-                    error_questionnaires = self.check_images(
-                        image_data, questionnaire, error_questionnaires,
-                        do_data_clean, 'qg_image')
-
-                qg_photo_data_list = questionnaire.data.get('qg_photos', [])
-                for qg_photo_data in qg_photo_data_list:
-                    error_questionnaires = self.check_images(
-                        qg_photo_data, questionnaire, error_questionnaires,
-                        do_data_clean, 'qg_photos')
-
-            # Check the link count. This fixes the problem where duplicate link
-            # entries were created if for example the questionnaire was edited
-            # during the review process. This bug should have been fixed on
-            # Dec 8, 2016.
-            link_count_query = QuestionnaireLink.objects.filter(
-                from_questionnaire=questionnaire).values(
-                'to_questionnaire_id').annotate(
-                total=Count('to_questionnaire_id'))
-            duplicate_links = [
-                link for link in link_count_query if link['total'] > 1]
-            if duplicate_links:
-                if questionnaire not in error_questionnaires:
-                    error_questionnaires.append(questionnaire)
-
-                print_questionnaire_name(questionnaire)
-
-                for duplicate in duplicate_links:
-                    error = 'Too many links ({}) to questionnaire with ID {}.'.\
-                        format(duplicate['total'],
-                               duplicate['to_questionnaire_id'])
-                    fixable_string = self.style.SQL_COLTYPE('Fixable')
-
-                    fixed_string = ''
-                    if do_data_clean:
-                        to_questionnaire = Questionnaire.objects.get(
-                            pk=duplicate['to_questionnaire_id'])
-                        # Remove all links
-                        questionnaire.remove_link(to_questionnaire, symm=False)
-                        # Add a new (single) link
-                        questionnaire.add_link(to_questionnaire, symm=False)
-                        fixed_string = self.style.SQL_COLTYPE('Fixed.')
-
-                    print_error_message(fixable_string, error, fixed_string)
-
-        if do_data_clean:
-            pre_save.connect(prevent_updates_on_published_items,
-                             sender=Questionnaire)
+        try:
+            error_questionnaires = set()
+            for questionnaire in iter_questionnaires(list(data_errors)):
+                error_questionnaires.add(questionnaire.id)
+                self.fix_data_errors(
+                    questionnaire, data_errors[questionnaire.id],
+                    do_data_clean)
+
+            # Check the link count. This fixes the problem where duplicate
+            # link entries were created if for example the questionnaire was
+            # edited during the review process. This bug should have been
+            # fixed on Dec 8, 2016.
+            duplicate_links = collections.defaultdict(list)
+            for link in QuestionnaireLink.objects.filter(
+                    from_questionnaire__in=questionnaires
+            ).order_by().values(
+                'from_questionnaire_id', 'to_questionnaire_id'
+            ).annotate(
+                total=Count('to_questionnaire_id')
+            ).filter(total__gt=1):
+                duplicate_links[link['from_questionnaire_id']].append(link)
+            for questionnaire in iter_questionnaires(list(duplicate_links)):
+                error_questionnaires.add(questionnaire.id)
+                self.fix_duplicate_links(
+                    questionnaire, duplicate_links[questionnaire.id],
+                    do_data_clean)
+        finally:
+            if do_data_clean:
+                pre_save.connect(prevent_updates_on_published_items,
+                                 sender=Questionnaire)
+            if self.report:
+                self.report.close()
 
         print("\n\n{} questionnaires found with errors (out of {})".format(
-            len(error_questionnaires), len(questionnaires)))
+            len(error_questionnaires), checked))
+
+    def fix_data_errors(self, questionnaire, errors, do_data_clean):
+        questionnaire_data = questionnaire.data
+        cleaned = False
+
+        print_questionnaire_name(questionnaire)
+
+        for error in errors:
+
+            fixable = error in automatic_fixes
+            fixed = False
+            if do_data_clean and fixable:
+                fix_function = automatic_fixes[error]
+                questionnaire_data = fix_function(questionnaire_data)
+                cleaned = True
+                fixed = True
+
+            self.report_error(questionnaire, error, fixable, fixed)
+
+        print('---')
+        print(self.style.WARNING("{} error(s)".format(len(errors))))
+
+        if cleaned is True:
+            questionnaire.data = questionnaire_data
+            questionnaire.save()
+
+        # Fix the problem if there are too many header images. This can
+        # happen if more than one image were uploaded (if upload is
+        # slow, additional pictures can be added). It causes the
+        # interchange images to be broken. But really, it should be
+        # somehow fixed in the code, not afterwards in the data ...
+        # TODO: Prevent upload of multiple images in one upload field.
+        qg_image_data = questionnaire.data.get('qg_image', [])
+        if len(qg_image_data) > 1:
+            print_questionnaire_name(questionnaire)
+            error = 'Questionnaire has too many "qg_image" questiongroups'
+            self.report_error(questionnaire, error, False, False)
+        elif len(qg_image_data) == 1:
+            image_data = qg_image_data[0]
+            self.check_images(
+                image_data, questionnaire, do_data_clean, 'qg_image')
+
+        qg_photo_data_list = questionnaire.data.get('qg_photos', [])
+        for qg_photo_data in qg_photo_data_list:
+            self.check_images(
+                qg_photo_data, questionnaire, do_data_clean, 'qg_photos')
+
+    def fix_duplicate_links(self, questionnaire, duplicate_links,
+                            do_data_clean):
+        print_questionnaire_name(questionnaire)
+
+        for duplicate in duplicate_links:
+            error = 'Too many links ({}) to questionnaire with ID {}.'.format(
+                duplicate['total'], duplicate['to_questionnaire_id'])
+
+            fixed = False
+            if do_data_clean:
+                to_questionnaire = Questionnaire.objects.get(
+                    pk=duplicate['to_questionnaire_id'])
+                # Remove all links
+                questionnaire.remove_link(to_questionnaire, symm=False)
+                # Add a new (single) link
+                questionnaire.add_link(to_questionnaire, symm=False)
+                fixed = True
+
+            self.report_error(questionnaire, error, True, fixed)
 
     def check_images(
-            self, image_questiongroup, questionnaire, error_questionnaires,
-            do_data_clean, questiongroup):
+            self, image_questiongroup, questionnaire, do_data_clean,
+            questiongroup):
         image = image_questiongroup.get('image', '')
         image_parts = image.split(',')
         if len(image_parts) > 1:
-            if questionnaire not in error_questionnaires:
-                error_questionnaires.append(questionnaire)
-                print_questionnaire_name(questionnaire)
-
-            fixable_string = self.style.SQL_COLTYPE('Fixable')
             error = 'Questionnaire has too many images in questiongroup {}.'.\
                 format(questiongroup)
 
-            fixed_string = ''
+            fixed = False
             if do_data_clean:
                 last_image = image_parts[len(image_parts) - 1]
                 image_questiongroup['image'] = last_image
                 questionnaire.save()
-                fixed_string = self.style.SQL_COLTYPE('Fixed.')
+                fixed = True
+
+            self.report_error(questionnaire, error, True, fixed)
 
-            print_error_message(fixable_string, error, fixed_string)
+    def report_error(self, questionnaire, error, fixable, fixed):
+        if fixable:
+            fixable_string = self.style.SQL_COLTYPE('Fixable')
+        else:
+            fixable_string = self.style.NOTICE('Not fixable')
+        fixed_string = self.style.SQL_COLTYPE('Fixed.') if fixed else ''
+        print_error_message(fixable_string, error, fixed_string)
+
+        if self.report:
+            self.report.write(json.dumps({
+                'id': questionnaire.id,
+                'code': questionnaire.code,
+                'status': questionnaire.status,
+                'configuration': questionnaire.configuration.code,
+                'edition': questionnaire.configuration.edition,
+                'error': error,
+                'fixable': fixable,
+                'fixed': fixed,
+            }) + '\n')
+
+
+def iter_batches(questionnaires, batch_size: int):
+    """
+    Stream the data of the questionnaires (with a server side cursor) and
+    yield it in batches of the same configuration, as
+    ``(code, edition, [(id, data), ...])``.
+    """
+    rows = questionnaires.order_by('configuration_id', 'id').values_list(
+        'id', 'configuration__code', 'configuration__edition', 'data'
+    ).iterator()
+    configuration, batch = None, []
+    for questionnaire_id, code, edition, data in rows:
+        if batch and ((code, edition) != configuration or
+                      len(batch) >= batch_size):
+            yield configuration[0], configuration[1], batch
+            batch = []
+        configuration = (code, edition)
+        batch.append((questionnaire_id, data))
+    if batch:
+        yield configuration[0], configuration[1], batch
+
+
+def check_batch(code: str, edition: str, batch: list) -> tuple:
+    """
+    Check the data of a batch of questionnaires of the same configuration.
+    This runs in the worker processes.
+
+    Returns:
+        ``int``. The number of checked questionnaires.
+
+        ``list``. The errors as ``(id, [errors])`` of all questionnaires with
+        errors.
+    """
+    configuration = get_configuration(code=code, edition=edition)
+    batch_errors = []
+    for questionnaire_id, data in batch:
+        __, errors = clean_questionnaire_data(data, configuration)
+        if errors:
+            batch_errors.append((questionnaire_id, errors))
+    return len(batch), batch_errors
+
+
+def iter_check_results(batches, workers: int):
+    """
+    Check the batches in a pool of ``workers`` processes and yield the results
+    of :func:`check_batch`. Only a few batches per process are queued at once,
+    so the questionnaires are never all held in memory.
+    """
+    if workers <= 1:
+        for batch in batches:
+            yield check_batch(*batch)
+        return
+
+    # The processes must not share the database connection of this process.
+    connections.close_all()
+    with multiprocessing.Pool(workers) as pool:
+        pending = collections.deque()
+        for batch in batches:
+            pending.append(pool.apply_async(check_batch, batch))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+def iter_questionnaires(ids: list, chunk_size=500):
+    for i in range(0, len(ids), chunk_size):
+        yield from Questionnaire.objects.filter(
+            id__in=ids[i:i + chunk_size]
+        ).select_related('configuration').order_by('id')
 
-        return error_questionnaires
 
 def print_questionnaire_name(questionnaire):
     print(
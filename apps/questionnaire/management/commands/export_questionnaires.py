@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from configuration.models import Configuration
+from questionnaire.export import EXPORT_FORMATS, update_snapshot
+
+
+class Command(BaseCommand):
+    """
+    Regenerate the outdated snapshots of the exports of all public
+    questionnaires (see questionnaire.export). Run it periodically (e.g. with
+    cron), so the exports of the API are served from the snapshots.
+    """
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--configuration',
+            dest='configuration',
+            help='Only export the configuration with this code.'
+        )
+        parser.add_argument(
+            '--language',
+            action='append',
+            dest='languages',
+            help='Only export in this language (can be repeated).'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            dest='force',
+            default=False,
+            help='Regenerate the snapshots even if they are up to date.'
+        )
+
+    def handle(self, **options):
+        configurations = Configuration.objects.all()
+        if options['configuration']:
+            configurations = configurations.filter(
+                code=options['configuration'])
+        languages = options['languages'] or [
+            code for code, __ in settings.LANGUAGES]
+
+        for configuration in configurations:
+            for language in languages:
+                for file_format in EXPORT_FORMATS:
+                    if update_snapshot(
+                            configuration, language, file_format,
+                            force=options['force']):
+                        self.stdout.write(
+                            f'Exported {configuration.code} '
+                            f'{configuration.edition} ({language}, '
+                            f'{file_format}).')
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from questionnaire.static_map import process_static_map_queue
+
+
+class Command(BaseCommand):
+    """
+    Render the static maps of questionnaires whose geometry changed. Run it
+    periodically (e.g. with cron) or as a long running worker with
+    ``--interval``.
+    """
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=20,
+            dest='batch_size',
+            help='Number of jobs fetched at once.'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            dest='interval',
+            help='Keep running and process the queue every n seconds.'
+        )
+
+    def handle(self, **options):
+        while True:
+            rendered, errors = process_static_map_queue(
+                batch_size=options['batch_size'])
+            if rendered:
+                self.stdout.write(f'Rendered {rendered} static maps.')
+            for error in errors:
+                self.stderr.write(str(error))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
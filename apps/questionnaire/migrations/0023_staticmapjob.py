@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.26 on 2026-10-17 14:05
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questionnaire', '0022_auto_20200514_1659'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaticMapJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('questionnaire_id', models.IntegerField(unique=True)),
+                ('queued', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -2,24 +2,23 @@ import contextlib
 import json
 import collections
 
-import os
-import requests
 from django.contrib.gis.gdal.error import GDALException
 from django.contrib.gis.geos import GeometryCollection, GEOSGeometry
 from django.db.models import Q
 from os.path import join
-from uuid import uuid4
+from uuid import UUID, uuid4
 
 from django.contrib.auth import get_user_model
 from django.contrib.gis.db import models
 from django.contrib.messages import WARNING, SUCCESS
 from django.contrib.postgres.fields import JSONField
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.core.urlresolvers import reverse, NoReverseMatch
+from django.db import transaction
 from django.utils.functional import cached_property
 from django.utils.translation import ugettext as _, get_language, activate
 from django.utils import timezone
-from staticmap import StaticMap, CircleMarker, Polygon
 
 from accounts.models import User
 from configuration.cache import get_configuration
@@ -35,7 +34,7 @@ from questionnaire.upload import (
     get_url_by_file_name,
     get_file_path,
     store_file,
-    get_upload_folder_structure, get_upload_folder_path)
+    get_upload_folder_structure)
 
 STATUSES = (
     (settings.QUESTIONNAIRE_DRAFT, _('Draft')),
@@ -563,11 +562,8 @@ class Questionnaire(models.Model):
             # omit additional query
             return name
 
-        original_lang = self.questionnairetranslation_set.filter(
-            original_language=True
-        ).first()
-        if original_lang and names.get(original_lang.language):
-            return names[original_lang.language]
+        if self.original_locale and names.get(self.original_locale):
+            return names[self.original_locale]
 
         return ''
 
@@ -577,9 +573,9 @@ class Questionnaire(models.Model):
         """
         codes = self.get_question_data('qg_location', 'country')
         if codes:
-            values = Value.objects.filter(keyword__in=codes)
-            if values.exists():
-                return [value.get_translation(keyword='label') for value in values]
+            values = Value.objects.filter(
+                keyword__in=codes).select_related('translation')
+            return [value.get_translation(keyword='label') for value in values]
         return []
 
     def get_history_versions(self, user: User or None) -> list:
@@ -671,56 +667,13 @@ class Questionnaire(models.Model):
             # to create the static map image (again)
             return
 
-        # Create static map
-        width = 1000
-        height = 800
-        marker_diameter = 24
-        marker_color = '#0036FF'
-
-        m = StaticMap(width, height)
-
-        for point in iter(self.geom):
-            m.add_marker(CircleMarker((point.x,  point.y), marker_color, marker_diameter))
-
-        bbox = None
-        questionnaire_country = self.get_question_data('qg_location', 'country')
-
-        if len(questionnaire_country) == 1:
-            country_iso3 = questionnaire_country[0].replace('country_', '')
-            country_iso2 = settings.CONFIGURATION_COUNTRY_ISO_MAPPING.get(
-                country_iso3)
-
-            if country_iso2:
-                r = requests.get(
-                    'http://api.geonames.org/countryInfoJSON?username=wocat_webdev&country={}'.format(
-                        country_iso2))
-                geonames_country = r.json().get('geonames')
-
-                if len(geonames_country) == 1:
-                    ctry = geonames_country[0]
-                    poly_coords = [
-                        [ctry.get('west'), ctry.get('north')],
-                        [ctry.get('west'), ctry.get('south')],
-                        [ctry.get('east'), ctry.get('south')],
-                        [ctry.get('east'), ctry.get('north')],
-                        [ctry.get('west'), ctry.get('north')]
-                    ]
-
-                    bbox = Polygon(poly_coords, None, None)
-
-        if bbox:
-            m.add_polygon(bbox)
-            image = m.render()
-        else:
-            # No bbox found, guess zoom level
-            image = m.render(zoom=6)
-
-        map_folder = get_upload_folder_path(str(self.uuid), subfolder='maps')
-        if not os.path.exists(map_folder):
-            os.makedirs(map_folder)
-
-        filename = '{}_{}.jpg'.format(self.uuid, self.version)
-        image.save(os.path.join(map_folder, filename))
+        # The static map is rendered in the background, see
+        # questionnaire.static_map. Saving an existing job updates its queued
+        # time, so a job being rendered is kept to be rendered again.
+        StaticMapJob.objects.update_or_create(questionnaire_id=self.id)
+        if not settings.USE_QUEUE_WORKERS:
+            from questionnaire.static_map import process_static_map_queue
+            transaction.on_commit(process_static_map_queue)
 
     def add_flag(self, flag):
         """
@@ -1260,10 +1213,9 @@ class File(models.Model):
             * url: The URL of the original file.
         """
         if file_object is None:
-            try:
-                file_object = File.objects.get(uuid=uid)
-            except File.DoesNotExist:
+            if not uid:
                 return {}
+            return File.get_data_by_uids([uid]).get(str(uid), {})
 
         interchange_list = []
         for thumbnail_format in settings.UPLOAD_IMAGE_THUMBNAIL_FORMATS:
@@ -1296,6 +1248,73 @@ class File(models.Model):
             })
         return file_data
 
+    @staticmethod
+    def get_data_by_uids(uids) -> dict:
+        """
+        Get the data (see :func:`get_data`) of multiple files at once. Files
+        are never changed after the upload, their data is therefore cached by
+        UID. Files not found in the cache are queried in one query.
+
+        Args:
+            uids (iterable): The UIDs of the files.
+
+        Returns:
+            dict. The data of the files, by UID (as string, as passed). UIDs
+            which are not valid or without a file are missing.
+        """
+        # The UIDs are normalized (e.g. upper case UIDs), as files are
+        # queried and cached by their canonical UID.
+        canonical_uids = {}
+        for uid in uids:
+            if not uid:
+                continue
+            try:
+                canonical_uids[str(uid)] = str(UUID(str(uid)))
+            except ValueError:
+                continue
+        if not canonical_uids:
+            return {}
+
+        uids = set(canonical_uids.values())
+        cache_keys = {File.get_data_cache_key(uid): uid for uid in uids}
+        files_data = {
+            cache_keys[cache_key]: file_data for cache_key, file_data
+            in cache.get_many(list(cache_keys.keys())).items()}
+
+        missing_uids = uids - set(files_data.keys())
+        if missing_uids:
+            queried_data = {}
+            for file_object in File.objects.filter(uuid__in=missing_uids):
+                file_data = File.get_data(file_object=file_object)
+                queried_data[file_data['uid']] = file_data
+            cache.set_many({
+                File.get_data_cache_key(uid): file_data for uid, file_data
+                in queried_data.items()})
+            files_data.update(queried_data)
+
+        return {
+            uid: files_data[canonical_uid]
+            for uid, canonical_uid in canonical_uids.items()
+            if canonical_uid in files_data}
+
+    @staticmethod
+    def get_data_cache_key(uid) -> str:
+        return 'file_data_{}'.format(uid)
+
+    @staticmethod
+    def get_list_image_data(questionnaire_objects) -> dict:
+        """
+        Get the data of all images appearing in the list data of the given
+        questionnaires (see :func:`get_data_by_uids`), to be passed to
+        :func:`configuration.configuration.QuestionnaireConfiguration.get_list_data`.
+        """
+        uids = set()
+        for questionnaire_object in questionnaire_objects:
+            uids.update(
+                questionnaire_object.configuration_object.get_list_image_uids(
+                    [questionnaire_object.data]))
+        return File.get_data_by_uids(uids)
+
     @staticmethod
     def create_new(content_type, size=None, thumbnails=None, uuid=None):
         """
@@ -1348,6 +1367,23 @@ class File(models.Model):
         return get_url_by_file_name(file_name)
 
 
+class StaticMapJob(models.Model):
+    """
+    A questionnaire whose static map is to be rendered (again), because its
+    geometry changed. There is at most one job per questionnaire.
+
+    The jobs are processed by the management command ``process_static_maps``.
+    """
+    questionnaire_id = models.IntegerField(unique=True)
+    queued = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return str(self.questionnaire_id)
+
+
 class Lock(models.Model):
     """
     Locks questionnaire for editing. This collects more information than
@@ -66,7 +66,10 @@ class QuestionnaireSerializer(serializers.ModelSerializer):
 
     def get_list_data(self, obj, is_attribute=True):
         param = obj.data if is_attribute else obj
-        return self.config.get_list_data([param])[0]
+        # The data of the images can be passed in the context if it was
+        # queried for multiple questionnaires at once.
+        return self.config.get_list_data(
+            [param], files_data=self.context.get('files_data'))[0]
 
     def get_name(self, obj, is_attribute=True):
         param = obj.data if is_attribute else obj
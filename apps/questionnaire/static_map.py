@@ -0,0 +1,199 @@
+"""
+Static map images of questionnaires (the points of the questionnaire on a
+map of its country), e.g. used in the summary.
+
+Rendering a map needs the tiles of the base map and is therefore not done
+while saving a questionnaire:
+:meth:`questionnaire.models.Questionnaire.update_geometry` only queues a
+:class:`questionnaire.models.StaticMapJob`, the maps are rendered by the
+management command ``process_static_maps`` (or when the transaction is
+committed, if there are no queue workers, see ``USE_QUEUE_WORKERS``).
+
+The bounding boxes of the countries are read from a local dataset
+(``QUESTIONNAIRE_COUNTRY_BOUNDING_BOXES_PATH``) and the downloaded tiles are
+kept in ``STATIC_MAP_TILE_CACHE_PATH``, so maps of the same country mostly
+reuse the tiles of previous renders.
+"""
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from functools import lru_cache
+
+from staticmap import StaticMap, CircleMarker, Polygon
+
+from .conf import settings
+from .models import Questionnaire, StaticMapJob
+from .upload import get_upload_folder_path
+
+logger = logging.getLogger(__name__)
+
+MAP_WIDTH = 1000
+MAP_HEIGHT = 800
+MARKER_DIAMETER = 24
+MARKER_COLOR = '#0036FF'
+
+
+class CachedTileStaticMap(StaticMap):
+    """
+    A StaticMap which keeps the downloaded tiles in
+    ``STATIC_MAP_TILE_CACHE_PATH``. Tiles are downloaded again once they are
+    older than ``STATIC_MAP_TILE_CACHE_TIMEOUT`` seconds.
+    """
+    def get(self, url, **kwargs):
+        tile_path = get_tile_cache_path(url)
+        try:
+            if time.time() - os.path.getmtime(tile_path) < \
+                    settings.STATIC_MAP_TILE_CACHE_TIMEOUT:
+                with open(tile_path, 'rb') as f:
+                    return 200, f.read()
+        except OSError:
+            pass
+
+        status_code, content = super().get(url, **kwargs)
+        if status_code == 200 and content:
+            with contextlib.suppress(OSError):
+                write_tile(tile_path, content)
+        return status_code, content
+
+
+def get_tile_cache_path(url: str) -> str:
+    digest = hashlib.sha1(url.encode('utf-8')).hexdigest()
+    return os.path.join(
+        settings.STATIC_MAP_TILE_CACHE_PATH, digest[:2], digest)
+
+
+def write_tile(tile_path: str, content: bytes):
+    """
+    Write a tile to a temporary file first and then move it, so concurrent
+    renders never read a partially written tile.
+    """
+    os.makedirs(os.path.dirname(tile_path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(tile_path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, tile_path)
+    except OSError:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+
+
+@lru_cache(maxsize=4)
+def load_country_bounding_boxes(path: str) -> dict:
+    """
+    Return the bounding boxes of all countries as
+    ``{iso2: [west, south, east, north]}``. For countries crossing the
+    antimeridian (e.g. Russia or Fiji), ``east`` is greater than 180. If the
+    dataset cannot be read, no bounding boxes are available.
+    """
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        logger.exception(f'Cannot read country bounding boxes from {path}')
+        return {}
+
+
+def get_country_bounding_box(country_iso3: str):
+    """
+    Return the bounding box (west, south, east, north) of a country by its
+    ISO3 code, or None if it is not known.
+    """
+    country_iso2 = settings.CONFIGURATION_COUNTRY_ISO_MAPPING.get(country_iso3)
+    if not country_iso2:
+        return None
+    bounding_box = load_country_bounding_boxes(
+        settings.QUESTIONNAIRE_COUNTRY_BOUNDING_BOXES_PATH).get(country_iso2)
+    return tuple(bounding_box) if bounding_box else None
+
+
+def get_static_map_path(questionnaire: Questionnaire) -> str:
+    return os.path.join(
+        get_upload_folder_path(str(questionnaire.uuid), subfolder='maps'),
+        '{}_{}.jpg'.format(questionnaire.uuid, questionnaire.version))
+
+
+def create_static_map(questionnaire: Questionnaire):
+    """
+    Render the static map of a questionnaire with the points of its geometry.
+    If the questionnaire has exactly one country, the map shows the bounding
+    box of the country. Otherwise, the zoom level is guessed.
+
+    Returns:
+        ``str``. The path of the map image or None if the questionnaire has no
+        geometry.
+    """
+    if questionnaire.geom is None:
+        return None
+
+    bbox = None
+    questionnaire_country = questionnaire.get_question_data(
+        'qg_location', 'country')
+    if len(questionnaire_country) == 1:
+        bbox = get_country_bounding_box(
+            questionnaire_country[0].replace('country_', ''))
+
+    m = CachedTileStaticMap(MAP_WIDTH, MAP_HEIGHT)
+    for point in iter(questionnaire.geom):
+        x = point.x
+        if bbox and bbox[2] > 180 and x < bbox[0]:
+            # The bounding box crosses the antimeridian, points east of it
+            # are shifted to the same side.
+            x += 360
+        m.add_marker(CircleMarker((x, point.y), MARKER_COLOR, MARKER_DIAMETER))
+
+    if bbox:
+        west, south, east, north = bbox
+        m.add_polygon(Polygon([
+            [west, north], [west, south], [east, south], [east, north],
+            [west, north]
+        ], None, None))
+        image = m.render()
+    else:
+        # No bbox found, guess zoom level
+        image = m.render(zoom=6)
+
+    map_path = get_static_map_path(questionnaire)
+    os.makedirs(os.path.dirname(map_path), exist_ok=True)
+    image.save(map_path)
+    return map_path
+
+
+def process_static_map_queue(batch_size=20) -> tuple:
+    """
+    Render the static maps of all queued questionnaires. A job is only
+    removed once its map was rendered (or its questionnaire was deleted), so
+    failed renders are retried in the next run. If the geometry changes again
+    while the map is rendered, the job is queued again and kept.
+
+    Returns:
+        ``int``. The number of rendered maps.
+
+        ``list``. A list of errors occurred.
+    """
+    rendered, errors = 0, []
+    last_id = 0
+    while True:
+        jobs = list(StaticMapJob.objects.filter(id__gt=last_id)[:batch_size])
+        if not jobs:
+            break
+        last_id = jobs[-1].id
+        for job in jobs:
+            questionnaire = Questionnaire.with_status.not_deleted().filter(
+                id=job.questionnaire_id).first()
+            if questionnaire is not None:
+                try:
+                    if create_static_map(questionnaire):
+                        rendered += 1
+                except Exception as e:
+                    logger.exception(f'Cannot render static map of {job}')
+                    errors.append(f'{job}: {e}')
+                    continue
+            StaticMapJob.objects.filter(
+                id=job.id, queued=job.queued).delete()
+    return rendered, errors
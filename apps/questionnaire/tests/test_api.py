@@ -1,10 +1,13 @@
+import datetime
 import logging
 from unittest.mock import patch, MagicMock, sentinel, Mock
 
 import pytest
 from django.conf import settings
+from django.core.exceptions import SuspiciousOperation
 from django.http import Http404
 from django.test import RequestFactory
+from elasticsearch import TransportError
 from rest_framework.test import force_authenticate, APIRequestFactory
 from rest_framework.response import Response
 
@@ -16,6 +19,7 @@ from questionnaire.api.views import QuestionnaireListView, \
     QuestionnaireDetailView,  QuestionnaireAPIMixin, \
     ConfiguredQuestionnaireDetailView
 from search.tests.test_index import create_temp_indices
+from search.utils import decode_cursor
 
 
 @pytest.mark.usefixtures('es')
@@ -45,13 +49,14 @@ class QuestionnaireListViewTest(TestCase):
         user = create_new_user()
         request = APIRequestFactory().get(self.url)
         force_authenticate(request, user=user)
-        with patch('api.models.RequestLog.save') as mock_save:
+        with patch('api.views.log_request') as mock_log_request:
             view = QuestionnaireListView()
             view.configuration_code = 'sample'
             view.get_es_results = Mock()
             view.get_es_results.return_value = {}
             view.dispatch(request)
-            mock_save.assert_called_once_with()
+            mock_log_request.assert_called_once_with(
+                user=user, resource=request.build_absolute_uri())
 
     def test_api_detail_url(self):
         questionnaire = Questionnaire.objects.get(code='sample_1')
@@ -61,6 +66,28 @@ class QuestionnaireListViewTest(TestCase):
             item.get('api_url'), '/en/api/v1/questionnaires/sample_1/'
         )
 
+    def test_update_dict_keys_fetches_data_at_once(self):
+        questionnaire = Questionnaire.objects.get(code='sample_1')
+        serialized = QuestionnaireSerializer(questionnaire).data
+        with patch.object(self.view, 'get_current_object') as mock_current:
+            items = list(self.view.update_dict_keys(
+                es_hits=[{'_source': serialized}, {'_source': serialized}]
+            ))
+            mock_current.assert_not_called()
+        self.assertEqual(len(items), 2)
+        self.assertEqual(items[0]['data'], questionnaire.data)
+
+    def test_get_objects_data(self):
+        with self.assertNumQueries(1):
+            objects_data = self.view.get_objects_data(
+                codes=['sample_1', 'foo'])
+        self.assertEqual(
+            objects_data,
+            {'sample_1': Questionnaire.objects.get(code='sample_1').data}
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(self.view.get_objects_data(codes=[]), {})
+
     def test_current_page(self):
         request = self.factory.get('{}?page=5'.format(self.url))
         request.version = 'v1'
@@ -107,6 +134,47 @@ class QuestionnaireListViewTest(TestCase):
         view.get_previous_link()
         mock_get_paginate_link.assert_called_with(1)
 
+    def test_cursor_links(self):
+        request = self.factory.get(f'{self.url}?cursor=&page=2')
+        request.version = 'v2'
+        view = self.setup_view(self.view, request, identifier='sample_1')
+        view.set_attributes()
+        self.assertEqual(view.search_after, [])
+        self.assertEqual(view.current_page, 1)
+        view.next_cursor = 'abc'
+        self.assertEqual(
+            view.get_next_link(), f'http://testserver{self.url}?cursor=abc')
+        self.assertEqual(view.get_previous_link(), '')
+
+    @patch('questionnaire.views.advanced_search')
+    def test_cursor_sets_next_cursor(self, mock_advanced_search):
+        request = self.factory.get(f'{self.url}?cursor=&limit=1')
+        request.version = 'v2'
+        view = self.setup_view(self.view, request, identifier='sample_1')
+        view.set_attributes()
+        view.page_size = 1
+        mock_advanced_search.return_value = {
+            'hits': {'total': 2, 'hits': [{'sort': ['CH', 1.0, '1']}]}}
+        view.get_es_results(call_from='api')
+        self.assertEqual(
+            mock_advanced_search.call_args[1]['search_after'], [])
+        self.assertEqual(
+            decode_cursor(view.next_cursor), ['CH', 1.0, '1'])
+
+    @patch('questionnaire.views.advanced_search')
+    def test_cursor_not_matching_sort(self, mock_advanced_search):
+        request = self.factory.get(f'{self.url}?cursor=abc')
+        request.version = 'v2'
+        view = self.setup_view(self.view, request, identifier='sample_1')
+        view.search_after = ['CH']
+        view.page_size = 1
+        view.get_search_params = Mock(return_value={})
+        for side_effect in [
+                ValueError(), TransportError(400, 'parsing_exception')]:
+            mock_advanced_search.side_effect = side_effect
+            with self.assertRaises(SuspiciousOperation):
+                view.get_es_cursor_results()
+
     def test_response_type(self):
         self.view.get_es_results = Mock()
         self.view.get_es_results.return_value = {}
@@ -245,3 +313,19 @@ class ConfiguredQuestionnaireDetailViewTest(TestCase):
             original_locale=sentinel.original_locale,
             questionnaire_data=sentinel.data
         )
+
+    @patch('questionnaire.api.views.get_configuration_generation')
+    def test_validators(self, mock_generation):
+        mock_generation.return_value = 1
+        updated = datetime.datetime(2020, 1, 2)
+        self.view.object = MagicMock(
+            id=1, version=2, updated=updated,
+            configuration=MagicMock(
+                code='sample', edition='2015',
+                created=datetime.datetime(2020, 1, 1))
+        )
+        self.view.object.links.filter.return_value.values_list.\
+            return_value = [(3, datetime.datetime(2020, 1, 3))]
+        parts = self.view.get_validators()
+        self.assertEqual(parts[:3], [1, 2, updated])
+        self.assertIn((3, datetime.datetime(2020, 1, 3)), parts)
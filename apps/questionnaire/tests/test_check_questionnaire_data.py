@@ -0,0 +1,75 @@
+import argparse
+import json
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.core.management import call_command
+
+from qcat.tests import TestCase
+from questionnaire.management.commands.check_questionnaire_data import (
+    check_batch,
+    iter_batches,
+    parse_since,
+)
+from questionnaire.models import Questionnaire
+
+
+@patch('builtins.print')
+class CheckQuestionnaireDataTest(TestCase):
+
+    fixtures = [
+        'global_key_values',
+        'sample',
+        'sample_questionnaires',
+    ]
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.report_path = os.path.join(self.tmp_dir.name, 'report.jsonl')
+        Questionnaire.objects.filter(code='sample_1').update(
+            data={'qg_9': [{'foo': '1'}]})
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def get_report(self):
+        with open(self.report_path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_iter_batches(self, mock_print):
+        batches = list(iter_batches(
+            Questionnaire.with_status.not_deleted(), batch_size=1))
+        self.assertEqual(len(batches), Questionnaire.objects.count())
+        self.assertEqual(batches[0][:2], ('sample', '2015'))
+        self.assertEqual(len(batches[0][2]), 1)
+
+    def test_check_batch(self, mock_print):
+        count, errors = check_batch('sample', '2015', [
+            (1, {'qg_9': [{'foo': '1'}]}), (2, {'qg_9': [{'key_12': '1'}]})])
+        self.assertEqual(count, 2)
+        self.assertEqual([questionnaire_id for questionnaire_id, __ in errors],
+                         [1])
+
+    def test_report(self, mock_print):
+        call_command(
+            'check_questionnaire_data', workers=1, report=self.report_path)
+        report = [line for line in self.get_report()
+                  if line['code'] == 'sample_1']
+        self.assertEqual(len(report), 1)
+        self.assertEqual(report[0]['configuration'], 'sample')
+        self.assertIn('"foo"', report[0]['error'])
+        self.assertFalse(report[0]['fixable'])
+        self.assertFalse(report[0]['fixed'])
+
+    def test_since(self, mock_print):
+        call_command(
+            'check_questionnaire_data', workers=1, report=self.report_path,
+            since=parse_since('2100-01-01'))
+        self.assertEqual(self.get_report(), [])
+
+    def test_parse_since(self, mock_print):
+        self.assertEqual(parse_since('2020-01-02').day, 2)
+        self.assertEqual(parse_since('2020-01-02 10:30').hour, 10)
+        with self.assertRaises(argparse.ArgumentTypeError):
+            parse_since('foo')
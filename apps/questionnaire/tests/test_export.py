@@ -0,0 +1,142 @@
+import gzip
+import json
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.test.utils import override_settings
+
+from configuration.models import Configuration
+from qcat.tests import TestCase
+from questionnaire.export import (
+    get_csv_value,
+    get_export_chunks,
+    get_export_stamp,
+    iter_export,
+    iter_store_values,
+)
+from questionnaire.models import Questionnaire, QuestionnaireLink
+
+
+class ExportValuesTest(TestCase):
+
+    def test_iter_store_values(self):
+        store = {
+            'section': {'label': 'Section', 'children': {
+                'qg_1': {'label': 'Group', 'children': {
+                    'key_1': {'label': 'Key 1', 'value': 'foo'},
+                }},
+                'qg_links': {'label': 'Links', 'value': None},
+            }},
+        }
+        self.assertEqual(list(iter_store_values(store)), [
+            ('section.qg_1.key_1', 'foo'),
+            ('section.qg_links', None),
+        ])
+
+    def test_get_csv_value(self):
+        self.assertEqual(get_csv_value(''), '')
+        self.assertEqual(get_csv_value(None), '')
+        self.assertEqual(get_csv_value(1.5), '1.5')
+        self.assertEqual(
+            get_csv_value([{'value': 'foo'}, {'value': ['bar', 'baz']}]),
+            'foo | bar | baz')
+        self.assertEqual(get_csv_value([{'code': 'foo'}]), '{"code": "foo"}')
+
+
+@patch('questionnaire.export.get_export_stamp', return_value='abc')
+@patch('questionnaire.export.iter_export')
+class ExportSnapshotTest(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.override = override_settings(
+            QUESTIONNAIRE_EXPORT_PATH=self.tmp_dir.name)
+        self.override.enable()
+        self.configuration = Configuration(code='sample', edition='2015')
+
+    def tearDown(self):
+        self.override.disable()
+        self.tmp_dir.cleanup()
+
+    def get_export(self, compress=False):
+        return b''.join(get_export_chunks(
+            self.configuration, 'en', 'ndjson', compress=compress))
+
+    def test_export_is_written_to_snapshot(self, mock_iter_export, mock_stamp):
+        mock_iter_export.return_value = iter(['{"a": 1}\n', '{"b": 2}\n'])
+        self.assertEqual(self.get_export(), b'{"a": 1}\n{"b": 2}\n')
+        self.assertEqual(
+            os.listdir(self.tmp_dir.name), ['sample_2015_en_ndjson_abc.gz'])
+        self.assertEqual(self.get_export(), b'{"a": 1}\n{"b": 2}\n')
+        self.assertEqual(mock_iter_export.call_count, 1)
+
+    def test_compressed_export(self, mock_iter_export, mock_stamp):
+        mock_iter_export.return_value = iter(['{"a": 1}\n'])
+        self.assertEqual(
+            gzip.decompress(self.get_export(compress=True)), b'{"a": 1}\n')
+        self.assertEqual(
+            gzip.decompress(self.get_export(compress=True)), b'{"a": 1}\n')
+        self.assertEqual(mock_iter_export.call_count, 1)
+
+    def test_outdated_snapshot_is_replaced(self, mock_iter_export, mock_stamp):
+        mock_iter_export.return_value = iter(['{"a": 1}\n'])
+        self.get_export()
+        mock_stamp.return_value = 'def'
+        mock_iter_export.return_value = iter(['{"a": 2}\n'])
+        self.assertEqual(self.get_export(), b'{"a": 2}\n')
+        self.assertEqual(
+            os.listdir(self.tmp_dir.name), ['sample_2015_en_ndjson_def.gz'])
+
+    def test_interrupted_export_is_discarded(
+            self, mock_iter_export, mock_stamp):
+        mock_iter_export.return_value = iter(['{"a": 1}\n', '{"b": 2}\n'])
+        chunks = get_export_chunks(self.configuration, 'en', 'ndjson')
+        next(chunks)
+        chunks.close()
+        self.assertEqual(os.listdir(self.tmp_dir.name), [])
+
+
+class ExportTest(TestCase):
+
+    fixtures = [
+        'global_key_values',
+        'sample',
+        'sample_questionnaires',
+    ]
+
+    def setUp(self):
+        self.configuration = Configuration.objects.get(
+            code='sample', edition='2015')
+        self.public = Questionnaire.with_status.public().filter(
+            configuration=self.configuration)
+
+    def test_ndjson(self):
+        lines = list(iter_export(self.configuration, 'en', 'ndjson'))
+        self.assertEqual(len(lines), self.public.count())
+        self.assertEqual(
+            [json.loads(line)['code'] for line in lines],
+            list(self.public.order_by('id').values_list('code', flat=True)))
+
+    def test_csv(self):
+        lines = list(iter_export(self.configuration, 'en', 'csv'))
+        self.assertEqual(len(lines), self.public.count() + 1)
+        self.assertTrue(lines[0].startswith('code,version,updated,'))
+
+    def test_stamp_changes(self):
+        stamp = get_export_stamp(self.configuration)
+        self.assertEqual(get_export_stamp(self.configuration), stamp)
+        self.public.update(is_deleted=True)
+        self.assertNotEqual(get_export_stamp(self.configuration), stamp)
+
+    def test_stamp_changes_with_links(self):
+        questionnaire = self.public.first()
+        linked = Questionnaire.with_status.public().exclude(
+            id=questionnaire.id).first()
+        stamp = get_export_stamp(self.configuration)
+        link = QuestionnaireLink.objects.create(
+            from_questionnaire=questionnaire, from_status=questionnaire.status,
+            to_questionnaire=linked, to_status=linked.status)
+        self.assertNotEqual(get_export_stamp(self.configuration), stamp)
+        link.delete()
+        self.assertEqual(get_export_stamp(self.configuration), stamp)
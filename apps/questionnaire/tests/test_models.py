@@ -20,7 +20,7 @@ from configuration.utils import create_new_code
 from qcat.tests import TestCase
 from questionnaire.errors import QuestionnaireLockedException
 from questionnaire.models import Questionnaire, QuestionnaireLink, File, Lock, \
-    QuestionnaireTranslation
+    QuestionnaireTranslation, StaticMapJob
 
 from ..conf import settings
 
@@ -612,12 +612,32 @@ class QuestionnaireModelTest(TestCase):
         self.assertEqual(len(geojson['geometries']), 2)
         self.assertEqual(geojson['geometries'][0]['coordinates'], [7.5, 47.0])
         self.assertEqual(geojson['geometries'][1]['coordinates'], [8.5, 48.0])
+        self.assertTrue(StaticMapJob.objects.filter(
+            questionnaire_id=questionnaire.id).exists())
+
+    def test_update_geometry_does_not_queue_unchanged_geometry(self):
+        questionnaire = get_valid_questionnaire()
+        questionnaire.data = {'qg_39': [{'key_56': json.dumps({
+            "type": "FeatureCollection",
+            "features": [{
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [7.5, 47]},
+            }]
+        })}]}
+        questionnaire.save()
+        questionnaire.update_geometry('sample')
+        StaticMapJob.objects.all().delete()
+        questionnaire.update_geometry('sample')
+        self.assertFalse(StaticMapJob.objects.exists())
+        questionnaire.update_geometry('sample', force_update=True)
+        self.assertEqual(StaticMapJob.objects.count(), 1)
 
     def test_update_geometry_handles_no_geometry(self):
         questionnaire = get_valid_questionnaire()
         self.assertIsNone(questionnaire.geom)
         questionnaire.update_geometry('sample')
         self.assertIsNone(questionnaire.geom)
+        self.assertFalse(StaticMapJob.objects.exists())
 
     def test_update_geometry_handles_invalid_geometry(self):
         questionnaire = get_valid_questionnaire()
@@ -921,11 +941,50 @@ class FileModelTest(TestCase):
             thumbnails=mock_create_thumbnails.return_value, uuid='uid'
         )
 
-    @patch.object(File.objects, 'get')
-    def test_get_data_gets_object_if_not_provided(self, mock_objects_get):
-        mock_objects_get.return_value = get_valid_file()
-        File.get_data(file_object=None, uid='uid')
-        mock_objects_get.assert_called_once_with(uuid='uid')
+    @patch.object(File, 'get_data_by_uids')
+    def test_get_data_gets_object_if_not_provided(self, mock_get_data_by_uids):
+        mock_get_data_by_uids.return_value = {'uid': sentinel.file_data}
+        ret = File.get_data(file_object=None, uid='uid')
+        mock_get_data_by_uids.assert_called_once_with(['uid'])
+        self.assertEqual(ret, sentinel.file_data)
+
+    @patch('questionnaire.models.cache')
+    def test_get_data_by_uids_queries_once(self, mock_cache):
+        mock_cache.get_many.return_value = {}
+        files = [get_valid_file(), get_valid_file()]
+        uids = [str(f.uuid) for f in files]
+        with self.assertNumQueries(1):
+            ret = File.get_data_by_uids(uids + ['foo'])
+        self.assertEqual(sorted(ret.keys()), sorted(uids))
+        self.assertEqual(ret[uids[0]], File.get_data(file_object=files[0]))
+        cached = mock_cache.set_many.call_args[0][0]
+        self.assertEqual(
+            sorted(cached.keys()),
+            sorted([File.get_data_cache_key(uid) for uid in uids]))
+
+    @patch('questionnaire.models.cache')
+    def test_get_data_by_uids_uses_cache(self, mock_cache):
+        uid = str(uuid.uuid4())
+        mock_cache.get_many.return_value = {
+            File.get_data_cache_key(uid): sentinel.file_data}
+        with self.assertNumQueries(0):
+            ret = File.get_data_by_uids([uid])
+        self.assertEqual(ret, {uid: sentinel.file_data})
+        mock_cache.set_many.assert_not_called()
+
+    def test_get_data_by_uids_empty(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(File.get_data_by_uids([None, '', 'foo']), {})
+
+    @patch('questionnaire.models.cache')
+    def test_get_data_by_uids_normalizes_uids(self, mock_cache):
+        mock_cache.get_many.return_value = {}
+        file = get_valid_file()
+        uid = str(file.uuid).upper()
+        ret = File.get_data_by_uids([uid])
+        self.assertEqual(ret, {uid: File.get_data(file_object=file)})
+        mock_cache.get_many.assert_called_once_with(
+            [File.get_data_cache_key(str(file.uuid))])
 
     def test_get_data_returns_empty_if_no_file_found(self):
         ret = File.get_data(file_object=None, uid='uid')
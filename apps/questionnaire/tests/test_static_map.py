@@ -0,0 +1,184 @@
+import json
+import os
+import tempfile
+import time
+from unittest.mock import patch, MagicMock
+
+from django.conf import settings
+from django.test.utils import override_settings
+
+from qcat.tests import TestCase
+from questionnaire.models import StaticMapJob
+from questionnaire.static_map import (
+    CachedTileStaticMap,
+    create_static_map,
+    get_country_bounding_box,
+    get_tile_cache_path,
+    load_country_bounding_boxes,
+    process_static_map_queue,
+)
+
+
+class CountryBoundingBoxTest(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'boxes.json')
+        with open(self.path, 'w') as f:
+            json.dump({'CH': [5.97, 45.83, 10.45, 47.78]}, f)
+        load_country_bounding_boxes.cache_clear()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+        load_country_bounding_boxes.cache_clear()
+
+    def test_returns_bounding_box_by_iso3(self):
+        with override_settings(
+                QUESTIONNAIRE_COUNTRY_BOUNDING_BOXES_PATH=self.path):
+            self.assertEqual(
+                get_country_bounding_box('CHE'), (5.97, 45.83, 10.45, 47.78))
+
+    def test_unknown_country(self):
+        with override_settings(
+                QUESTIONNAIRE_COUNTRY_BOUNDING_BOXES_PATH=self.path):
+            self.assertIsNone(get_country_bounding_box('AUT'))
+            self.assertIsNone(get_country_bounding_box('foo'))
+
+    def test_missing_dataset(self):
+        with override_settings(QUESTIONNAIRE_COUNTRY_BOUNDING_BOXES_PATH=(
+                os.path.join(self.tmp_dir.name, 'foo.json'))):
+            self.assertIsNone(get_country_bounding_box('CHE'))
+
+    def test_shipped_dataset(self):
+        self.assertEqual(len(get_country_bounding_box('CHE')), 4)
+
+    def test_shipped_dataset_contains_all_countries(self):
+        for country_iso3 in settings.CONFIGURATION_COUNTRY_ISO_MAPPING:
+            west, south, east, north = get_country_bounding_box(country_iso3)
+            self.assertLess(west, east)
+            self.assertLess(south, north)
+            if country_iso3 != 'ATA':
+                # Only Antarctica spans the whole world.
+                self.assertLess(east - west, 180)
+
+
+class CachedTileStaticMapTest(TestCase):
+
+    url = 'http://a.tile.osm.org/6/33/22.png'
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.override = override_settings(
+            STATIC_MAP_TILE_CACHE_PATH=self.tmp_dir.name)
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        self.tmp_dir.cleanup()
+
+    @patch('staticmap.StaticMap.get', return_value=(200, b'tile'))
+    def test_tile_is_downloaded_once(self, mock_get):
+        static_map = CachedTileStaticMap(100, 100)
+        self.assertEqual(static_map.get(self.url), (200, b'tile'))
+        self.assertEqual(static_map.get(self.url), (200, b'tile'))
+        mock_get.assert_called_once_with(self.url)
+
+    @patch('staticmap.StaticMap.get', return_value=(404, b''))
+    def test_failed_download_is_not_cached(self, mock_get):
+        static_map = CachedTileStaticMap(100, 100)
+        self.assertEqual(static_map.get(self.url)[0], 404)
+        self.assertFalse(os.path.exists(get_tile_cache_path(self.url)))
+
+    @override_settings(STATIC_MAP_TILE_CACHE_TIMEOUT=60)
+    @patch('staticmap.StaticMap.get', return_value=(200, b'tile'))
+    def test_expired_tile_is_downloaded_again(self, mock_get):
+        static_map = CachedTileStaticMap(100, 100)
+        static_map.get(self.url)
+        expired = time.time() - 120
+        os.utime(get_tile_cache_path(self.url), (expired, expired))
+        static_map.get(self.url)
+        self.assertEqual(mock_get.call_count, 2)
+
+
+class CreateStaticMapTest(TestCase):
+
+    def get_questionnaire(self, countries):
+        return MagicMock(
+            geom=[MagicMock(x=7.5, y=47)], uuid='foo', version=1,
+            get_question_data=MagicMock(return_value=countries))
+
+    def test_no_geometry(self):
+        self.assertIsNone(create_static_map(MagicMock(geom=None)))
+
+    @patch('questionnaire.static_map.os.makedirs')
+    @patch('questionnaire.static_map.get_country_bounding_box')
+    @patch('questionnaire.static_map.CachedTileStaticMap')
+    def test_uses_country_bounding_box(
+            self, mock_static_map, mock_bbox, mock_makedirs):
+        mock_bbox.return_value = (5.97, 45.83, 10.45, 47.78)
+        create_static_map(self.get_questionnaire(['country_CHE']))
+        mock_bbox.assert_called_once_with('CHE')
+        self.assertEqual(mock_static_map.return_value.add_polygon.call_count, 1)
+        mock_static_map.return_value.render.assert_called_once_with()
+
+    @patch('questionnaire.static_map.os.makedirs')
+    @patch('questionnaire.static_map.CircleMarker')
+    @patch('questionnaire.static_map.get_country_bounding_box')
+    @patch('questionnaire.static_map.CachedTileStaticMap')
+    def test_bounding_box_across_antimeridian(
+            self, mock_static_map, mock_bbox, mock_marker, mock_makedirs):
+        mock_bbox.return_value = (19.64, 41.19, 190.95, 81.85)
+        questionnaire = self.get_questionnaire(['country_RUS'])
+        questionnaire.geom = [MagicMock(x=-175, y=65), MagicMock(x=37, y=55)]
+        create_static_map(questionnaire)
+        self.assertEqual(
+            [c[0][0] for c in mock_marker.call_args_list],
+            [(185, 65), (37, 55)])
+
+    @patch('questionnaire.static_map.os.makedirs')
+    @patch('questionnaire.static_map.get_country_bounding_box')
+    @patch('questionnaire.static_map.CachedTileStaticMap')
+    def test_guesses_zoom_for_multiple_countries(
+            self, mock_static_map, mock_bbox, mock_makedirs):
+        create_static_map(
+            self.get_questionnaire(['country_CHE', 'country_AUT']))
+        self.assertEqual(mock_bbox.call_count, 0)
+        mock_static_map.return_value.render.assert_called_once_with(zoom=6)
+
+
+class ProcessStaticMapQueueTest(TestCase):
+
+    @patch('questionnaire.static_map.Questionnaire')
+    @patch('questionnaire.static_map.create_static_map')
+    def test_process_static_map_queue(
+            self, mock_create_static_map, mock_questionnaire):
+        StaticMapJob.objects.create(questionnaire_id=1)
+        StaticMapJob.objects.create(questionnaire_id=2)
+        StaticMapJob.objects.create(questionnaire_id=3)
+        mock_create_static_map.side_effect = ['foo.jpg', Exception('foo'), None]
+        rendered, errors = process_static_map_queue(batch_size=2)
+        self.assertEqual(rendered, 1)
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(
+            list(StaticMapJob.objects.values_list(
+                'questionnaire_id', flat=True)), [2])
+
+    @patch('questionnaire.static_map.Questionnaire')
+    @patch('questionnaire.static_map.create_static_map')
+    def test_requeued_job_is_kept(
+            self, mock_create_static_map, mock_questionnaire):
+        StaticMapJob.objects.create(questionnaire_id=1)
+
+        def requeue(questionnaire):
+            StaticMapJob.objects.update_or_create(questionnaire_id=1)
+            return 'foo.jpg'
+        mock_create_static_map.side_effect = requeue
+        process_static_map_queue()
+        self.assertTrue(StaticMapJob.objects.exists())
+
+    @patch('questionnaire.static_map.create_static_map')
+    def test_deleted_questionnaire_is_skipped(self, mock_create_static_map):
+        StaticMapJob.objects.create(questionnaire_id=-1)
+        self.assertEqual(process_static_map_queue(), (0, []))
+        self.assertEqual(mock_create_static_map.call_count, 0)
+        self.assertFalse(StaticMapJob.objects.exists())
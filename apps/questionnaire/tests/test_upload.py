@@ -1,15 +1,18 @@
 import os
+import tempfile
 from django.conf import settings
 
 from django.test.utils import override_settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from unittest.mock import patch, Mock
+from PIL import Image
 
 from qcat.tests import TestCase
 from questionnaire.upload import (
     get_all_file_extensions,
     get_file_extension_by_content_type,
     create_thumbnails,
+    get_upload_folder_path,
     get_upload_folder_structure,
     get_url_by_file_name,
     retrieve_file,
@@ -36,13 +39,74 @@ TEST_UPLOAD_VALID_FILES = {
 
 @override_settings(
     UPLOAD_IMAGE_THUMBNAIL_FORMATS=TEST_UPLOAD_IMAGE_THUMBNAIL_FORMATS)
-@patch('questionnaire.upload.os')
 class CreateThumbnailsTest(TestCase):
 
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.override = override_settings(MEDIA_ROOT=self.tmp_dir.name)
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        self.tmp_dir.cleanup()
+
+    def create_image(self, size, mode='RGB', image_format='JPEG'):
+        file_path = os.path.join(self.tmp_dir.name, 'original')
+        Image.new(mode, size).save(file_path, image_format)
+        return file_path
+
+    def get_thumbnail(self, uid):
+        return Image.open(os.path.join(
+            get_upload_folder_path(uid), '{}.jpg'.format(uid)))
+
     @patch('questionnaire.upload.subprocess')
-    def test_calls_subprocess(self, mock_subprocess, mock_os):
-        create_thumbnails('path', 'content_type')
+    def test_calls_subprocess_for_pdf(self, mock_subprocess):
+        thumbnails = create_thumbnails('path', 'application/pdf')
         self.assertEqual(mock_subprocess.call.call_count, 3)
+        self.assertEqual(
+            list(thumbnails.keys()), ['default', 'small', 'medium'])
+        self.assertIn('path[0]', mock_subprocess.call.call_args[0][0])
+
+    @patch('questionnaire.upload.subprocess')
+    def test_image_without_subprocess(self, mock_subprocess):
+        file_path = self.create_image((2000, 1000))
+        thumbnails = create_thumbnails(file_path, 'image/jpeg')
+        mock_subprocess.call.assert_not_called()
+        self.assertEqual(
+            sorted(thumbnails.keys()), ['default', 'medium', 'small'])
+        self.assertEqual(
+            self.get_thumbnail(thumbnails['default']).size, (640, 320))
+        self.assertEqual(
+            self.get_thumbnail(thumbnails['medium']).size, (1440, 720))
+
+    def test_image_decoded_once(self):
+        file_path = self.create_image((100, 100))
+        with patch('questionnaire.upload.Image.open',
+                   wraps=Image.open) as mock_open:
+            create_thumbnails(file_path, 'image/jpeg')
+        mock_open.assert_called_once_with(file_path)
+
+    def test_small_image_is_enlarged(self):
+        file_path = self.create_image((320, 480))
+        thumbnails = create_thumbnails(file_path, 'image/jpeg')
+        self.assertEqual(
+            self.get_thumbnail(thumbnails['default']).size, (320, 480))
+        self.assertEqual(
+            self.get_thumbnail(thumbnails['small']).size, (512, 768))
+
+    def test_transparent_image(self):
+        file_path = self.create_image(
+            (640, 480), mode='RGBA', image_format='PNG')
+        thumbnails = create_thumbnails(file_path, 'image/png')
+        thumbnail = self.get_thumbnail(thumbnails['default'])
+        self.assertEqual(thumbnail.mode, 'RGB')
+        self.assertEqual(thumbnail.getpixel((0, 0)), (255, 255, 255))
+
+    def test_invalid_image(self):
+        file_path = os.path.join(self.tmp_dir.name, 'original')
+        with open(file_path, 'wb') as f:
+            f.write(b'foo')
+        self.assertEqual(create_thumbnails(file_path, 'image/jpeg'), {})
 
 
 @patch('questionnaire.upload.os.makedirs')
@@ -7,6 +7,7 @@ from collections import namedtuple
 from configuration.cache import get_configuration
 from django.conf import settings
 from django.contrib.auth.models import Group
+from django.db.models import Q
 from django.http import QueryDict
 from django.test.client import RequestFactory
 from django.test.utils import override_settings
@@ -24,16 +25,19 @@ from questionnaire.utils import (
     clean_questionnaire_data,
     compare_questionnaire_data,
     get_active_filters,
+    get_es_list_values,
     get_questionnaire_data_in_single_language,
     get_questionnaire_data_for_translation_form,
     get_questiongroup_data_from_translation_form,
     get_link_data,
     get_link_display,
+    get_links_by_questionnaire,
     get_list_values,
     handle_review_actions,
     is_valid_questionnaire_format,
     query_questionnaire,
     query_questionnaires,
+    prefetch_list_metadata,
     prepare_list_values)
 from questionnaire.tests.test_models import get_valid_metadata, \
     get_valid_questionnaire
@@ -932,9 +936,13 @@ class GetListValuesTest(TestCase):
         ret_1 = ret[0]
         self.assertEqual(ret_1.get('configuration'), 'sample')
 
+    @patch('questionnaire.utils.get_links_by_questionnaire')
+    @patch('questionnaire.utils.prefetch_list_metadata', side_effect=list)
     @patch('questionnaire.utils.get_link_data')
-    def test_returns_values_from_database(self, mock_get_link_data):
+    def test_returns_values_from_database(
+            self, mock_get_link_data, mock_prefetch, mock_get_links):
         obj = Mock()
+        mock_get_links.return_value = {obj.id: []}
         obj.configuration.code = 'sample'
         obj.configuration.edition = '2015'
         obj.data = {}
@@ -959,10 +967,13 @@ class GetListValuesTest(TestCase):
         self.assertEqual(ret_1.get('editors'), ['editor'])
         self.assertEqual(ret_1.get('links'), {})
 
+    @patch('questionnaire.utils.get_links_by_questionnaire')
+    @patch('questionnaire.utils.prefetch_list_metadata', side_effect=list)
     @patch('questionnaire.utils.get_link_data')
     def test_db_uses_provided_configuration(
-            self, mock_get_link_data):
+            self, mock_get_link_data, mock_prefetch, mock_get_links):
         obj = Mock()
+        mock_get_links.return_value = {obj.id: []}
         obj.configuration.code = 'sample'
         obj.configuration.edition = '2015'
         obj.links.all.return_value = []
@@ -979,12 +990,41 @@ class GetListValuesTest(TestCase):
         self.assertEqual(len(ret_1), self.values_length)
         self.assertEqual(ret_1.get('configuration'), 'sample')
 
-    @patch.object(QuestionnaireSerializer, 'to_list_values')
-    def test_to_value_calls_prepare_data(self, mock_to_list_values):
+    @patch('questionnaire.utils.prepare_list_values')
+    def test_to_value_calls_prepare_data(self, mock_prepare_list_values):
         obj = get_valid_questionnaire()
         serialized = QuestionnaireSerializer(obj).data
         get_list_values(es_hits=[{'_source': serialized}])
-        mock_to_list_values.assert_called_with(lang='en')
+        self.assertEqual(
+            mock_prepare_list_values.call_args[1]['lang'], 'en')
+
+    def test_es_list_values_equal_serializer_list_values(self):
+        obj = get_valid_questionnaire()
+        source = dict(QuestionnaireSerializer(obj).data)
+        serializer = QuestionnaireSerializer(data=dict(source))
+        self.assertTrue(serializer.is_valid())
+        expected = serializer.to_list_values(lang='en')
+        self.assertEqual(get_es_list_values([{'_source': source}]), [expected])
+
+    @patch('questionnaire.utils.get_configuration')
+    def test_es_list_values_resolve_configuration_once(
+            self, mock_get_configuration):
+        mock_get_configuration.return_value = get_configuration(
+            code='sample', edition='2015')
+        obj = get_valid_questionnaire()
+        source = dict(QuestionnaireSerializer(obj).data)
+        get_es_list_values(
+            [{'_source': dict(source)}, {'_source': dict(source)}])
+        mock_get_configuration.assert_called_once_with(
+            code='sample', edition='2015')
+
+    @patch('questionnaire.utils.logger')
+    def test_es_list_values_invalid_source_uses_serializer(self, mock_logger):
+        obj = get_valid_questionnaire()
+        source = dict(QuestionnaireSerializer(obj).data)
+        source['original_locale'] = None
+        self.assertEqual(get_es_list_values([{'_source': source}]), [])
+        mock_logger.warning.assert_called_once()
 
     def test_prepare_list_values(self):
         obj = get_valid_questionnaire()
@@ -1017,6 +1057,49 @@ class GetListValuesTest(TestCase):
         self.assertEqual(prepared['name'], 'foo')
 
 
+@override_settings(USE_CACHING=False)
+class PrefetchListMetadataTest(TestCase):
+
+    fixtures = [
+        'sample_global_key_values',
+        'sample',
+    ]
+
+    def test_metadata_equals_queried_metadata(self):
+        questionnaire = get_valid_questionnaire()
+        expected = Questionnaire.objects.get(pk=questionnaire.pk).get_metadata()
+        obj = prefetch_list_metadata(
+            Questionnaire.objects.filter(pk=questionnaire.pk))[0]
+        with self.assertNumQueries(0):
+            metadata = obj.get_metadata()
+        self.assertEqual(metadata, expected)
+
+    def test_constant_number_of_queries(self):
+        user = create_new_user()
+        for __ in range(3):
+            get_valid_questionnaire(user=user)
+        # Configurations, flags, translations and memberships.
+        with self.assertNumQueries(5):
+            objects = prefetch_list_metadata(Questionnaire.objects.all())
+        self.assertEqual(len(objects), 3)
+
+    def test_links_by_questionnaire(self):
+        questionnaire_1 = get_valid_questionnaire()
+        questionnaire_2 = get_valid_questionnaire()
+        questionnaire_2.status = settings.QUESTIONNAIRE_PUBLIC
+        questionnaire_2.save()
+        questionnaire_3 = get_valid_questionnaire()
+        questionnaire_1.add_link(questionnaire_2)
+        questionnaire_1.add_link(questionnaire_3)
+        links = get_links_by_questionnaire(
+            [questionnaire_1, questionnaire_3],
+            Q(status=settings.QUESTIONNAIRE_PUBLIC))
+        self.assertEqual(links, {
+            questionnaire_1.id: [questionnaire_2],
+            questionnaire_3.id: [],
+        })
+
+
 @patch('questionnaire.utils.messages')
 class HandleReviewActionsTest(TestCase):
 
@@ -1168,13 +1251,12 @@ class HandleReviewActionsTest(TestCase):
             'permission to do so.')
 
     @patch('questionnaire.utils.Questionnaire')
-    @patch('questionnaire.utils.delete_questionnaires_from_es')
-    @patch('questionnaire.utils.put_questionnaire_data')
+    @patch('questionnaire.utils.queue_questionnaire_deletion')
+    @patch('questionnaire.utils.queue_questionnaire_update')
     @patch('questionnaire.signals.change_status.send')
     def test_publish_updates_status_of_previously_public(
             self, mock_change_status, mock_put_data, mock_delete_data,
             mock_Questionnaire, mock_messages):
-        mock_put_data.return_value = None, []
         RolesPermissions = namedtuple(
             'RolesPermissions', ['roles', 'permissions'])
         self.obj.get_roles_permissions.return_value = RolesPermissions(
@@ -1191,13 +1273,12 @@ class HandleReviewActionsTest(TestCase):
         prev.save.assert_called_once_with()
 
     @patch('questionnaire.utils.Questionnaire')
-    @patch('questionnaire.utils.delete_questionnaires_from_es')
-    @patch('questionnaire.utils.put_questionnaire_data')
+    @patch('questionnaire.utils.queue_questionnaire_deletion')
+    @patch('questionnaire.utils.queue_questionnaire_update')
     @patch('questionnaire.signals.change_status.send')
     def test_publish_removes_previously_public_from_es(
             self, mock_change_status, mock_put_data, mock_delete_data,
             mock_Questionnaire, mock_messages):
-        mock_put_data.return_value = None, []
         RolesPermissions = namedtuple(
             'RolesPermissions', ['roles', 'permissions'])
         self.obj.get_roles_permissions.return_value = RolesPermissions(
@@ -1212,11 +1293,10 @@ class HandleReviewActionsTest(TestCase):
         handle_review_actions(self.request, self.obj, 'sample')
         mock_delete_data.assert_called_once_with([prev])
 
-    @patch('questionnaire.utils.put_questionnaire_data')
+    @patch('questionnaire.utils.queue_questionnaire_update')
     @patch('questionnaire.signals.change_status.send')
     def test_publish_updates_status(self, mock_change_status, mock_put_data,
                                     mock_messages):
-        mock_put_data.return_value = None, []
         RolesPermissions = namedtuple(
             'RolesPermissions', ['roles', 'permissions'])
         self.obj.get_roles_permissions.return_value = RolesPermissions(
@@ -1232,11 +1312,10 @@ class HandleReviewActionsTest(TestCase):
             self.request,
             'The questionnaire was successfully set public.')
 
-    @patch('questionnaire.utils.put_questionnaire_data')
+    @patch('questionnaire.utils.queue_questionnaire_update')
     @patch('questionnaire.signals.change_status.send')
-    def test_publish_calls_put_questionnaire_data(
+    def test_publish_queues_questionnaire_update(
             self, mock_change_status, mock_put_data, mock_messages):
-        mock_put_data.return_value = None, []
         RolesPermissions = namedtuple(
             'RolesPermissions', ['roles', 'permissions'])
         self.obj.get_roles_permissions.return_value = RolesPermissions(
@@ -1247,13 +1326,12 @@ class HandleReviewActionsTest(TestCase):
         self.request.user = Mock()
         self.request.POST = {'publish': 'foo'}
         handle_review_actions(self.request, self.obj, 'sample')
-        mock_put_data.assert_called_once_with([self.obj])
+        mock_put_data.assert_any_call([self.obj])
 
-    @patch('questionnaire.utils.put_questionnaire_data')
+    @patch('questionnaire.utils.queue_questionnaire_update')
     @patch('questionnaire.signals.change_status.send')
-    def test_publish_calls_put_questionnaire_data_for_all_links(
+    def test_publish_queues_questionnaire_update_for_all_links(
             self, mock_change_status, mock_put_data, mock_messages):
-        mock_put_data.return_value = None, []
         mock_link = Mock()
         RolesPermissions = namedtuple(
             'RolesPermissions', ['roles', 'permissions'])
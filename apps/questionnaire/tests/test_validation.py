@@ -0,0 +1,102 @@
+from unittest.mock import patch, MagicMock
+
+from configuration.configuration import QuestionnaireConfiguration
+from qcat.tests import TestCase
+from questionnaire.utils import clean_questionnaire_data, \
+    validate_questionnaire_data
+from questionnaire.validation import INVALID, QuestionnaireDataValidator, \
+    QuestionValidator, evaluate_conditions, get_data_validator
+
+
+class QuestionnaireDataValidatorTest(TestCase):
+
+    fixtures = [
+        'sample_global_key_values',
+        'sample',
+        'sample_projects',
+    ]
+
+    def setUp(self):
+        self.conf = QuestionnaireConfiguration('sample')
+
+    def test_validator_is_kept_on_configuration(self):
+        validator = get_data_validator(self.conf)
+        self.assertIsInstance(validator, QuestionnaireDataValidator)
+        self.assertIs(get_data_validator(self.conf), validator)
+
+    def test_validator_is_compiled_once(self):
+        data = {'qg_9': [{'key_12': '1'}]}
+        with patch.object(
+                QuestionnaireDataValidator, '__init__',
+                wraps=QuestionnaireDataValidator.__init__,
+                autospec=True) as mock_init:
+            clean_questionnaire_data(data, self.conf)
+            validate_questionnaire_data(data, self.conf)
+        self.assertEqual(mock_init.call_count, 1)
+
+    def test_compiles_questiongroups(self):
+        validator = get_data_validator(self.conf)
+        self.assertEqual(
+            set(validator.questiongroups),
+            set(qg.keyword for qg in self.conf.get_questiongroups()))
+        self.assertIn('key_12', validator.questiongroups['qg_9'].questions)
+
+    def test_validate_rejects_unknown_questiongroup(self):
+        data = {'foo': [{'key_12': '1'}]}
+        cleaned, errors = validate_questionnaire_data(data, self.conf)
+        self.assertEqual(cleaned, {})
+        self.assertEqual(len(errors), 1)
+
+    def test_clean_keeps_unknown_questiongroup(self):
+        data = {'foo': [{'key_12': '1'}]}
+        cleaned, errors = clean_questionnaire_data(data, self.conf)
+        self.assertEqual(cleaned, data)
+        self.assertEqual(errors, [])
+
+
+class QuestionValidatorTest(TestCase):
+
+    def get_validator(self, **kwargs):
+        question = MagicMock(
+            keyword='key_1', field_type='select', max_length=None,
+            form_options={}, choices=[('a', 'A'), ('b', 'B')],
+            conditional=False)
+        for key, value in kwargs.items():
+            setattr(question, key, value)
+        return QuestionValidator(question)
+
+    def test_choice(self):
+        validator = self.get_validator()
+        errors = []
+        self.assertEqual(validator.clean('a', 'qg_1', errors), 'a')
+        self.assertIs(validator.clean('c', 'qg_1', errors), INVALID)
+        self.assertIs(validator.clean(['a'], 'qg_1', errors), INVALID)
+        self.assertEqual(len(errors), 2)
+
+    def test_list_with_too_many_values(self):
+        validator = self.get_validator(
+            field_type='checkbox',
+            form_options={'field_options': {'data-cb-max-choices': 1}})
+        errors = []
+        self.assertEqual(validator.clean(['a'], 'qg_1', errors), ['a'])
+        self.assertIs(validator.clean(['a', 'b'], 'qg_1', errors), INVALID)
+        self.assertEqual(len(errors), 1)
+
+    def test_unknown_field_type(self):
+        validator = self.get_validator(field_type='foo')
+        with self.assertRaises(NotImplementedError):
+            validator.clean('a', 'qg_1', [])
+
+
+class EvaluateConditionsTest(TestCase):
+
+    def test_numeric_conditions(self):
+        self.assertTrue(evaluate_conditions(5, ['>1', '<10']))
+        self.assertFalse(evaluate_conditions(15, ['>1', '<10']))
+
+    def test_string_conditions(self):
+        self.assertTrue(evaluate_conditions('foo', ['=="foo"']))
+        self.assertFalse(evaluate_conditions('bar', ['=="foo"']))
+
+    def test_invalid_conditions(self):
+        self.assertFalse(evaluate_conditions(5, ['foo(']))
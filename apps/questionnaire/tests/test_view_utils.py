@@ -3,12 +3,16 @@ from unittest.mock import patch, Mock
 from qcat.tests import TestCase
 from questionnaire.view_utils import (
     ESPagination,
+    get_cursor_parameter,
     get_limit_parameter,
     get_page_parameter,
     get_paginator,
 )
+from django.core.exceptions import SuspiciousOperation
 from django.core.paginator import Paginator, Page
 
+from search.utils import encode_cursor
+
 
 def get_valid_pagination_parameters():
     return {
@@ -137,3 +141,26 @@ class GetPageParameterTest(TestCase):
         self.request.GET = {'page': 0}
         page = get_page_parameter(self.request)
         self.assertEqual(page, self.default_page)
+
+
+class GetCursorParameterTest(TestCase):
+
+    def setUp(self):
+        self.request = Mock()
+
+    def test_returns_none_if_no_cursor_in_request(self):
+        self.request.GET = {}
+        self.assertIsNone(get_cursor_parameter(self.request))
+
+    def test_returns_empty_list_for_first_page(self):
+        self.request.GET = {'cursor': ''}
+        self.assertEqual(get_cursor_parameter(self.request), [])
+
+    def test_returns_sort_values(self):
+        self.request.GET = {'cursor': encode_cursor(['CH', 1.5, '12'])}
+        self.assertEqual(get_cursor_parameter(self.request), ['CH', 1.5, '12'])
+
+    def test_raises_if_cursor_invalid(self):
+        self.request.GET = {'cursor': 'foo'}
+        with self.assertRaises(SuspiciousOperation):
+            get_cursor_parameter(self.request)
@@ -12,6 +12,7 @@ from configuration.configuration import (
     QuestionnaireConfiguration,
 )
 from qcat.tests import TestCase
+from questionnaire.conf import settings
 from questionnaire.models import File, Questionnaire
 from questionnaire.views import (
     generic_file_upload,
@@ -270,6 +271,64 @@ class QuestionnaireViewTest(TestCase):
     def test_get_steps(self):
         self.assertListEqual(self.view.get_steps(), ['cat_0', 'cat_1', 'cat_2', 'cat_3', 'cat_4', 'cat_5'])
 
+    def get_anonymous_view(self):
+        request = RequestFactory().get('/en/sample/view/app_1')
+        request.user = AnonymousUser()
+        view = self.setup_view(self.view, request, identifier='sample_1')
+        view.object = Questionnaire.objects.get(code='sample_1')
+        view.object.status = settings.QUESTIONNAIRE_PUBLIC
+        return view
+
+    def test_details_cache_key_authenticated(self):
+        self.view.object = Questionnaire.objects.get(code='sample_1')
+        self.view.object.status = settings.QUESTIONNAIRE_PUBLIC
+        self.assertIsNone(self.view.get_details_cache_key({}, {}))
+
+    def test_details_cache_key_not_public(self):
+        view = self.get_anonymous_view()
+        view.object.status = settings.QUESTIONNAIRE_DRAFT
+        self.assertIsNone(view.get_details_cache_key({}, {}))
+
+    def test_details_cache_key_anonymous_public(self):
+        view = self.get_anonymous_view()
+        key = view.get_details_cache_key({}, {})
+        self.assertIn(f'_{view.object.id}_', key)
+        self.assertEqual(key, view.get_details_cache_key({}, {}))
+        self.assertNotEqual(
+            key, view.get_details_cache_key({'qg_1': [{'key_1': 'foo'}]}, {}))
+        self.assertNotEqual(
+            key, view.get_details_cache_key({}, {'sample': [{'id': 1}]}))
+
+    @patch('questionnaire.views.cache')
+    @patch.object(QuestionnaireConfiguration, 'get_details')
+    def test_rendered_sections_from_cache(self, mock_get_details, mock_cache):
+        mock_cache.get.return_value = ['section']
+        view = self.get_anonymous_view()
+        self.assertEqual(view.get_rendered_sections({}, links={}), ['section'])
+        mock_get_details.assert_not_called()
+
+    @patch('questionnaire.views.cache')
+    @patch.object(QuestionnaireConfiguration, 'get_details')
+    def test_rendered_sections_added_to_cache(
+            self, mock_get_details, mock_cache):
+        mock_cache.get.return_value = None
+        mock_get_details.return_value = ['section']
+        view = self.get_anonymous_view()
+        self.assertEqual(view.get_rendered_sections({}, links={}), ['section'])
+        mock_cache.set.assert_called_once_with(
+            view.get_details_cache_key({}, {}), ['section'],
+            settings.QUESTIONNAIRE_DETAILS_CACHE_TIMEOUT)
+
+    @patch('questionnaire.views.cache')
+    @patch.object(QuestionnaireConfiguration, 'get_details')
+    def test_rendered_sections_authenticated_not_cached(
+            self, mock_get_details, mock_cache):
+        self.view.object = Questionnaire.objects.get(code='sample_1')
+        self.view.get_rendered_sections({}, links={})
+        mock_cache.get.assert_not_called()
+        mock_cache.set.assert_not_called()
+        self.assertTrue(mock_get_details.called)
+
     @patch('questionnaire.views.handle_review_actions')
     def test_post(self, mock_review):
         self.view.post(self.request)
@@ -1,15 +1,20 @@
+import logging
 import magic
 import os
 import sys
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
 from django.core.files.uploadedfile import UploadedFile
 from django.utils.translation import ugettext as _
+from PIL import Image
 from uuid import uuid4
 
+logger = logging.getLogger(__name__)
 
 UPLOAD_THUMBNAIL_EXTENSION = 'jpg'
 UPLOAD_THUMBNAIL_CONTENT_TYPE = 'image/jpeg'
+UPLOAD_THUMBNAIL_QUALITY = 85
 
 
 def create_thumbnails(file_path, content_type):
@@ -17,7 +22,9 @@ def create_thumbnails(file_path, content_type):
     Create thumbnails for a file found under a given path. The thumbnails are
     stored and the identifiers returned in a dictionaries with their format.
 
-    Parameters taken from http://stackoverflow.com/a/7262050/841644
+    Images are decoded only once (JPEGs at a reduced size if possible) and the
+    thumbnails of all formats are created from the decoded image in parallel.
+    Only the thumbnails of PDFs are created with ImageMagick (``convert``).
 
     Args:
         file_path: The path of the original file.
@@ -28,34 +35,103 @@ def create_thumbnails(file_path, content_type):
         dict. A dictionary where each key is a thumbnail format and the value
         the identifier of the respective thumbnail file.
     """
-    quality = '85%'
+    thumbnail_formats = settings.UPLOAD_IMAGE_THUMBNAIL_FORMATS
+    if content_type == 'application/pdf':
+        return {
+            format_name: create_pdf_thumbnail(file_path, format_settings)
+            for format_name, format_settings in thumbnail_formats}
 
-    thumbnails = {}
-    for format_name, format_settings in settings.UPLOAD_IMAGE_THUMBNAIL_FORMATS:
-        uid = str(uuid4())
+    try:
+        image = open_image(
+            file_path, max_size=(
+                max(s[0] for __, s in thumbnail_formats),
+                max(s[1] for __, s in thumbnail_formats)))
+    except (OSError, ValueError):
+        logger.exception(f'Cannot create thumbnails of {file_path}')
+        return {}
 
-        resize_format = '{}x{}'.format(format_settings[0], format_settings[1])
+    def create_format(thumbnail_format):
+        format_name, format_settings = thumbnail_format
+        return format_name, create_image_thumbnail(image, format_settings)
 
-        folder_path = get_upload_folder_path(uid)
-        if not os.path.exists(folder_path):
-            os.makedirs(folder_path)
-        thumbnail_path = os.path.join(
-            folder_path, '{}.{}'.format(uid, UPLOAD_THUMBNAIL_EXTENSION))
+    max_workers = max(1, min(
+        len(thumbnail_formats), settings.UPLOAD_THUMBNAIL_WORKERS))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(executor.map(create_format, thumbnail_formats))
 
-        if content_type == 'application/pdf':
-            params = '-density 300 -background white -alpha remove'
-        else:
-            params = '-strip -interlace Plane -sampling-factor 4:2:0'
 
-        cmd = 'convert -quality {quality} -resize {size} {params} ' \
-              '{input}[0] {output}'.format(quality=quality, size=resize_format,
-                                           params=params, input=file_path,
-                                           output=thumbnail_path)
-        subprocess.call(cmd, shell=True)
+def open_image(file_path, max_size):
+    """
+    Open and decode an image (the first frame only). JPEGs are decoded at the
+    smallest scale still larger than ``max_size``. Transparent areas are
+    filled with white, as the thumbnails are stored as JPEGs.
 
-        thumbnails[format_name] = uid
+    Args:
+        file_path: The path of the image.
+
+        max_size: The largest (width, height) of the thumbnails.
 
-    return thumbnails
+    Returns:
+        PIL.Image.Image. The decoded image in RGB mode.
+    """
+    with Image.open(file_path) as image:
+        image.draft('RGB', max_size)
+        image.load()
+        if image.mode in ('RGBA', 'LA') or (
+                image.mode == 'P' and 'transparency' in image.info):
+            rgba_image = image.convert('RGBA')
+            decoded = Image.new('RGB', rgba_image.size, (255, 255, 255))
+            decoded.paste(rgba_image, mask=rgba_image.split()[3])
+            return decoded
+        return image.convert('RGB')
+
+
+def create_image_thumbnail(image, size):
+    """
+    Resize a decoded image to fit the given size (keeping the aspect ratio)
+    and store it as progressive JPEG without metadata.
+
+    Returns:
+        str. The identifier of the thumbnail.
+    """
+    uid = str(uuid4())
+    width, height = image.size
+    scale = min(size[0] / width, size[1] / height)
+    resized = image.resize(
+        (max(1, round(width * scale)), max(1, round(height * scale))),
+        Image.LANCZOS)
+    resized.save(
+        get_thumbnail_path(uid), 'JPEG', quality=UPLOAD_THUMBNAIL_QUALITY,
+        progressive=True, subsampling=2)
+    return uid
+
+
+def create_pdf_thumbnail(file_path, size):
+    """
+    Create the thumbnail of the first page of a PDF with ImageMagick.
+
+    Parameters taken from http://stackoverflow.com/a/7262050/841644
+
+    Returns:
+        str. The identifier of the thumbnail.
+    """
+    uid = str(uuid4())
+    subprocess.call([
+        'convert', '-quality', f'{UPLOAD_THUMBNAIL_QUALITY}%',
+        '-resize', '{}x{}'.format(size[0], size[1]),
+        '-density', '300', '-background', 'white', '-alpha', 'remove',
+        f'{file_path}[0]', get_thumbnail_path(uid)])
+    return uid
+
+
+def get_thumbnail_path(uid):
+    """
+    Return the path of a new thumbnail, the folder is created if necessary.
+    """
+    folder_path = get_upload_folder_path(uid)
+    os.makedirs(folder_path, exist_ok=True)
+    return os.path.join(
+        folder_path, '{}.{}'.format(uid, UPLOAD_THUMBNAIL_EXTENSION))
 
 
 def store_file(file):
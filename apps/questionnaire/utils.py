@@ -1,36 +1,38 @@
 import ast
-import json
 import logging
 from uuid import UUID
 
 from django.apps import apps
 from django.contrib import messages
-from django.db import IntegrityError
-from django.db.models import Q
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch, Q, prefetch_related_objects
 from django.db.models.signals import pre_save
 from django.template.loader import render_to_string
 from django.shortcuts import redirect
 from django.utils.functional import Promise
 from django.utils.translation import ugettext as _, get_language
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import DateTimeField
 
 from accounts.client import remote_user_client
 from accounts.models import User
 from configuration.cache import get_configuration
 from configuration.configuration import QuestionnaireQuestion, \
     QuestionnaireConfiguration
-from configuration.utils import get_configuration_query_filter, \
-    get_choices_from_model, get_choices_from_questiongroups
+from configuration.utils import get_configuration_query_filter
 from qcat.errors import QuestionnaireFormatError
 from questionnaire.errors import QuestionnaireLockedException
 from questionnaire.receivers import prevent_updates_on_published_items
 from questionnaire.serializers import QuestionnaireSerializer
 from search.index import (
-    put_questionnaire_data,
-    delete_questionnaires_from_es,
+    queue_questionnaire_deletion,
+    queue_questionnaire_update,
 )
 from .conf import settings
-from .models import Questionnaire, Flag, Lock
+from .models import Questionnaire, File, Flag, Lock, QuestionnaireLink, \
+    QuestionnaireMembership
 from .signals import change_status, change_member, delete_questionnaire
+from .validation import get_data_validator
 
 logger = logging.getLogger(__name__)
 
@@ -39,11 +41,15 @@ def validate_questionnaire_data(data, configuration, no_limit_check=False):
     """
     Validate a questionnaire data dictionary so it can be saved to the
     database. This namely removes all empty values and parses measured
-    values to integers.
+    values to integers. Questiongroups which are not part of the configuration
+    are an error.
 
     This function can also be used to test if a questionnaire data
     dictionary is empty (if returned cleaned data = {}).
 
+    The checks are compiled once per configuration, see
+    :mod:`questionnaire.validation`.
+
     Args:
         ``data`` (dict): A questionnaire data dictionary.
 
@@ -57,308 +63,12 @@ def validate_questionnaire_data(data, configuration, no_limit_check=False):
         ``list``. A list with errors encountered. Empty if the
         dictionary is valid.
     """
-    errors = []
-    cleaned_data = {}
     try:
         is_valid_questionnaire_format(data)
     except QuestionnaireFormatError as e:
-        return cleaned_data, [str(e)]
-    """
-    Collect the questiongroup conditions. This can be done only once for
-    all questiongroups for performance reasons.
-    The conditions are collected in a dict of form:
-    {
-        "CONDITION_NAME": ("QG_KEYWORD", "Q_KEYWORD", ["COND_1", "COND_2"])
-    }
-    """
-    questiongroup_conditions = {}
-    for questiongroup in configuration.get_questiongroups():
-        for question in questiongroup.questions:
-            for conditions in question.questiongroup_conditions:
-                condition, condition_name = conditions.split('|')
-                if condition_name in questiongroup_conditions:
-                    questiongroup_conditions[condition_name][2].append(
-                        condition)
-                else:
-                    questiongroup_conditions[condition_name] = \
-                        questiongroup.keyword, question.keyword, [condition]
-    for qg_keyword, qg_data_list in data.items():
-        questiongroup = configuration.get_questiongroup_by_keyword(qg_keyword)
-        if questiongroup is None:
-            # If the questiongroup is not part of the configuration raise error
-            errors.append(
-                "Questiongroup with keyword '{}' is not valid for this Configuration".format(
-                    qg_keyword))
-            continue
-        if questiongroup.max_num < len(qg_data_list):
-            errors.append(
-                'Questiongroup with keyword "{}" has a max_num of {} but '
-                'appears {} times'.format(
-                    qg_keyword, questiongroup.max_num, len(qg_data_list)))
-            continue
-        if questiongroup.inherited_configuration:
-            # Do not store linked questiongroups
-            continue
-        cleaned_qg_list = []
-        ordered_qg = False
-        for qg_data in qg_data_list:
-            cleaned_qg = {}
-            for key, value in qg_data.items():
-                if not value and not isinstance(value, (bool, int)):
-                    continue
-                if key == '__order':
-                    cleaned_qg['__order'] = value
-                    continue
-                question = questiongroup.get_question_by_key_keyword(key)
-                if question is None:
-                    errors.append(
-                        'Question with keyword "{}" is not valid for '
-                        'Questiongroup with keyword "{}"'.format(
-                            key, qg_keyword))
-                    continue
-                if question.conditional:
-                    for q in question.questiongroup.questions:
-                        for c in q.conditions:
-                            if key in c[2]:
-                                cond_data = qg_data.get(q.keyword)
-                                if not cond_data or c[0] not in cond_data:
-                                    errors.append(
-                                        'Key "{}" is only valid if "{}={}"'
-                                        .format(key, q.keyword, c[0]))
-                if question.field_type in ['measure']:
-                    try:
-                        value = int(value)
-                    except ValueError:
-                        errors.append(
-                            'Measure value "{}" of key "{}" (questiongroup '
-                            '"{}") is not valid.'.format(
-                                value, key, qg_keyword))
-                        continue
-                if question.field_type in [
-                        'bool', 'measure', 'select_type', 'select', 'radio',
-                    'select_conditional_custom']:
-                    if value not in [c[0] for c in question.choices]:
-                        errors.append(
-                            'Value "{}" is not valid for key "{}" ('
-                            'questiongroup "{}").'.format(
-                                value, key, qg_keyword))
-                        continue
-                elif question.field_type in [
-                    'select_conditional_questiongroup']:
-                    # This is checked later.
-                    pass
-                elif question.field_type in [
-                        'checkbox', 'image_checkbox', 'cb_bool', 'multi_select']:
-                    if not isinstance(value, list):
-                        errors.append(
-                            'Value "{}" of key "{}" needs to be a list'.format(
-                                value, key))
-                        continue
-                    if question.field_type in ['cb_bool']:
-                        try:
-                            value = [int(v) for v in value]
-                        except ValueError:
-                            errors.append(
-                                'Value "{}" is not a valid boolean checkbox '
-                                'value for key "{}" (questiongroup "{}")'
-                                .format(value, key, qg_keyword))
-                            continue
-                    for v in value:
-                        if v not in [c[0] for c in question.choices]:
-                            errors.append(
-                                'Value "{}" is not valid for key "{}" ('
-                                'questiongroup "{}").'.format(
-                                    value, key, qg_keyword))
-                            continue
-                    max_cb = question.form_options.get('field_options', {}).get(
-                        'data-cb-max-choices')
-                    if max_cb and len(value) > max_cb:
-                        errors.append('Key "{}" has too many values: {}'.format(
-                            key, value))
-                        continue
-                elif question.field_type in ['char', 'text', 'wms_layer']:
-                    if not isinstance(value, dict):
-                        errors.append(
-                            'Value "{}" of key "{}" needs to be a dict.'
-                            .format(value, key))
-                        continue
-                    translations = {}
-                    for locale, translation in value.items():
-                        if translation:
-                            if (not no_limit_check and question.max_length and
-                                    len(translation) > question.max_length):
-
-                                subcategory = questiongroup.get_top_subcategory()
-                                subcategory_name = '{} {}'.format(
-                                    subcategory.form_options.get('numbering'),
-                                    subcategory.label)
-                                error_msg = 'Value of question "{}" of ' \
-                                            'subcategory "{}" is too long. It ' \
-                                            'can only contain {} ' \
-                                            'characters.'.format(
-                                                question.label,
-                                                subcategory_name,
-                                                question.max_length)
-                                errors.append(error_msg)
-                                continue
-                            translations[locale] = translation
-                    value = translations
-                elif question.field_type in ['int']:
-                    try:
-                        value = int(value)
-                    except ValueError:
-                        errors.append('Value "{}" of key "{}" is not a valid '
-                                      'integer.'.format(value, key))
-                        continue
-                elif question.field_type in ['float']:
-                    try:
-                        value = float(value)
-                    except ValueError:
-                        errors.append('Value "{}" of key "{}" is not a valid '
-                                      'number.'.format(value, key))
-                        continue
-                elif question.field_type in ['select_model']:
-                    model = question.form_options.get('model')
-                    choices = get_choices_from_model(model, only_active=False)
-                    if str(value) not in [str(c[0]) for c in choices]:
-                        errors.append('The value is not a valid choice of model'
-                                      ' "{}"'.format(model))
-                        continue
-                    try:
-                        value = int(value)
-                    except TypeError:
-                        value = None
-                elif question.field_type in ['todo']:
-                    value = None
-                elif question.field_type in ['image', 'file', 'date']:
-                    pass
-                elif question.field_type in [
-                        'user_id', 'link_id', 'hidden', 'display_only']:
-                    pass
-                elif question.field_type in ['link_video']:
-                    # TODO: This should be properly checked!
-                    pass
-                elif question.field_type in ['map']:
-                    # A very rough check if the value is a GeoJSON.
-                    try:
-                        geojson = json.loads(value)
-                    except ValueError:
-                        errors.append('Invalid geometry: "{}"'.format(value))
-                        continue
-                    for feature in geojson.get('features', []):
-                        geom = feature.get('geometry', {})
-                        if 'coordinates' not in geom or 'type' not in geom:
-                            errors.append('Invalid geometry: "{}"'.format(value))
-                            continue
-                else:
-                    raise NotImplementedError(
-                        'Field type "{}" needs to be checked properly'.format(
-                            question.field_type))
-                if value or isinstance(value, (bool, int, float)):
-                    cleaned_qg[key] = value
-            if cleaned_qg:
-                if len(cleaned_qg) == 1 and '__order' in cleaned_qg:
-                    continue
-                cleaned_qg_list.append(cleaned_qg)
-                if '__order' in cleaned_qg:
-                    ordered_qg = True
-        if ordered_qg is True:
-            cleaned_qg_list = sorted(
-                cleaned_qg_list, key=lambda qg: qg.get('__order', 0))
-        if cleaned_qg_list:
-            cleaned_data[qg_keyword] = cleaned_qg_list
-        if cleaned_qg_list and questiongroup.questiongroup_condition:
-            condition_fulfilled = False
-            for condition_name, condition_data in questiongroup_conditions.\
-                    items():
-                if condition_name != questiongroup.questiongroup_condition:
-                    continue
-                for qg_data in data.get(condition_data[0], []):
-                    condition_value = qg_data.get(condition_data[1])
-                    if isinstance(condition_value, list):
-                        all_values_evaluated = False
-                        for cond_value in condition_value:
-                            evaluated = True
-                            for c in condition_data[2]:
-                                try:
-                                    evaluated = evaluated and eval(
-                                        '{}{}'.format(cond_value, c))
-                                except NameError:
-                                    evaluated = evaluated and eval(
-                                        '"{}"{}'.format(cond_value, c))
-                                except:
-                                    evaluated = False
-                                    continue
-                            all_values_evaluated = (
-                                all_values_evaluated or evaluated)
-                        condition_fulfilled = (
-                            condition_fulfilled or all_values_evaluated)
-                    else:
-                        evaluated = True
-                        for c in condition_data[2]:
-                            try:
-                                evaluated = evaluated and eval('{}{}'.format(
-                                    condition_value, c))
-                            except NameError:
-                                evaluated = evaluated and eval(
-                                    '"{}"{}'.format(condition_value, c))
-                            except:
-                                evaluated = False
-                                continue
-                        condition_fulfilled = evaluated or condition_fulfilled
-            if condition_fulfilled is False:
-                errors.append(
-                    'Questiongroup with keyword "{}" requires condition "{}".'.
-                    format(
-                        questiongroup.keyword,
-                        questiongroup.questiongroup_condition))
-
-    # Check for select_conditional_questiongroup questions. This needs to be
-    # done after cleaning the data JSON as these questions depend on other
-    # questiongroups. Empty questiongroups (eg. {'qg_42': [{'key_57': ''}], ...}
-    # are now cleaned.
-    for qg_keyword, cleaned_qg_list in cleaned_data.items():
-
-        questiongroup = configuration.get_questiongroup_by_keyword(qg_keyword)
-        if questiongroup is None:
-            continue
-
-        select_conditional_questiongroup_data_list = []
-        select_conditional_questiongroup_found = False
-
-        for qg_data in cleaned_qg_list:
-            select_conditional_questiongroup_data = {}
-            for key, value in qg_data.items():
-
-                question = questiongroup.get_question_by_key_keyword(key)
-                if question is None:
-                    continue
-
-                if question.field_type in ['select_conditional_questiongroup']:
-                    select_conditional_questiongroup_found = True
-
-                    # Set currently valid question choices
-                    questiongroups = question.form_options.get(
-                        'options_by_questiongroups', [])
-                    question.choices = get_choices_from_questiongroups(
-                        cleaned_data, questiongroups, configuration.keyword,
-                        configuration.edition)
-
-                    if value in [c[0] for c in question.choices]:
-                        # Only copy values which are valid options.
-                        select_conditional_questiongroup_data[key] = value
-
-                else:
-                    select_conditional_questiongroup_data[key] = value
-
-            select_conditional_questiongroup_data_list.append(
-                select_conditional_questiongroup_data)
-
-        if select_conditional_questiongroup_found:
-            cleaned_data[
-                qg_keyword] = select_conditional_questiongroup_data_list
-
-    return cleaned_data, errors
+        return {}, [str(e)]
+    return get_data_validator(configuration).validate(
+        data, no_limit_check=no_limit_check)
 
 
 def clean_questionnaire_data(data, configuration, no_limit_check=False):
@@ -367,6 +77,10 @@ def clean_questionnaire_data(data, configuration, no_limit_check=False):
     database. This namely removes all empty values and parses measured
     values to integers.
 
+    If a questiongroup is not part of the current configuration (because the
+    data is based on an old configuration or the questionnaire also has other
+    configurations - modules?), it is stored as it is.
+
     This function can also be used to test if a questionnaire data
     dictionary is empty (if returned cleaned data = {}).
 
@@ -383,309 +97,12 @@ def clean_questionnaire_data(data, configuration, no_limit_check=False):
         ``list``. A list with errors encountered. Empty if the
         dictionary is valid.
     """
-    errors = []
-    cleaned_data = {}
     try:
         is_valid_questionnaire_format(data)
     except QuestionnaireFormatError as e:
-        return cleaned_data, [str(e)]
-    """
-    Collect the questiongroup conditions. This can be done only once for
-    all questiongroups for performance reasons.
-    The conditions are collected in a dict of form:
-    {
-        "CONDITION_NAME": ("QG_KEYWORD", "Q_KEYWORD", ["COND_1", "COND_2"])
-    }
-    """
-    questiongroup_conditions = {}
-    for questiongroup in configuration.get_questiongroups():
-        for question in questiongroup.questions:
-            for conditions in question.questiongroup_conditions:
-                condition, condition_name = conditions.split('|')
-                if condition_name in questiongroup_conditions:
-                    questiongroup_conditions[condition_name][2].append(
-                        condition)
-                else:
-                    questiongroup_conditions[condition_name] = \
-                        questiongroup.keyword, question.keyword, [condition]
-    for qg_keyword, qg_data_list in data.items():
-        questiongroup = configuration.get_questiongroup_by_keyword(qg_keyword)
-        if questiongroup is None:
-            # If the questiongroup is not part of the current configuration
-            # (because the data is based on an old configuration or the
-            # questionnaire also has other configurations - modules?), it is
-            # stored as it is.
-            cleaned_data[qg_keyword] = qg_data_list
-            continue
-        if questiongroup.max_num < len(qg_data_list):
-            errors.append(
-                'Questiongroup with keyword "{}" has a max_num of {} but '
-                'appears {} times'.format(
-                    qg_keyword, questiongroup.max_num, len(qg_data_list)))
-            continue
-        if questiongroup.inherited_configuration:
-            # Do not store linked questiongroups
-            continue
-        cleaned_qg_list = []
-        ordered_qg = False
-        for qg_data in qg_data_list:
-            cleaned_qg = {}
-            for key, value in qg_data.items():
-                if not value and not isinstance(value, (bool, int)):
-                    continue
-                if key == '__order':
-                    cleaned_qg['__order'] = value
-                    continue
-                question = questiongroup.get_question_by_key_keyword(key)
-                if question is None:
-                    errors.append(
-                        'Question with keyword "{}" is not valid for '
-                        'Questiongroup with keyword "{}"'.format(
-                            key, qg_keyword))
-                    continue
-                if question.conditional:
-                    for q in question.questiongroup.questions:
-                        for c in q.conditions:
-                            if key in c[2]:
-                                cond_data = qg_data.get(q.keyword)
-                                if not cond_data or c[0] not in cond_data:
-                                    errors.append(
-                                        'Key "{}" is only valid if "{}={}"'
-                                        .format(key, q.keyword, c[0]))
-                if question.field_type in ['measure']:
-                    try:
-                        value = int(value)
-                    except ValueError:
-                        errors.append(
-                            'Measure value "{}" of key "{}" (questiongroup '
-                            '"{}") is not valid.'.format(
-                                value, key, qg_keyword))
-                        continue
-                if question.field_type in [
-                        'bool', 'measure', 'select_type', 'select', 'radio',
-                    'select_conditional_custom']:
-                    if value not in [c[0] for c in question.choices]:
-                        errors.append(
-                            'Value "{}" is not valid for key "{}" ('
-                            'questiongroup "{}").'.format(
-                                value, key, qg_keyword))
-                        continue
-                elif question.field_type in [
-                    'select_conditional_questiongroup']:
-                    # This is checked later.
-                    pass
-                elif question.field_type in [
-                        'checkbox', 'image_checkbox', 'cb_bool', 'multi_select']:
-                    if not isinstance(value, list):
-                        errors.append(
-                            'Value "{}" of key "{}" needs to be a list'.format(
-                                value, key))
-                        continue
-                    if question.field_type in ['cb_bool']:
-                        try:
-                            value = [int(v) for v in value]
-                        except ValueError:
-                            errors.append(
-                                'Value "{}" is not a valid boolean checkbox '
-                                'value for key "{}" (questiongroup "{}")'
-                                .format(value, key, qg_keyword))
-                            continue
-                    for v in value:
-                        if v not in [c[0] for c in question.choices]:
-                            errors.append(
-                                'Value "{}" is not valid for key "{}" ('
-                                'questiongroup "{}").'.format(
-                                    value, key, qg_keyword))
-                            continue
-                    max_cb = question.form_options.get('field_options', {}).get(
-                        'data-cb-max-choices')
-                    if max_cb and len(value) > max_cb:
-                        errors.append('Key "{}" has too many values: {}'.format(
-                            key, value))
-                        continue
-                elif question.field_type in ['char', 'text', 'wms_layer']:
-                    if not isinstance(value, dict):
-                        errors.append(
-                            'Value "{}" of key "{}" needs to be a dict.'
-                            .format(value, key))
-                        continue
-                    translations = {}
-                    for locale, translation in value.items():
-                        if translation:
-                            if (not no_limit_check and question.max_length and
-                                    len(translation) > question.max_length):
-
-                                subcategory = questiongroup.get_top_subcategory()
-                                subcategory_name = '{} {}'.format(
-                                    subcategory.form_options.get('numbering'),
-                                    subcategory.label)
-                                error_msg = 'Value of question "{}" of ' \
-                                            'subcategory "{}" is too long. It ' \
-                                            'can only contain {} ' \
-                                            'characters.'.format(
-                                                question.label,
-                                                subcategory_name,
-                                                question.max_length)
-                                errors.append(error_msg)
-                                continue
-                            translations[locale] = translation
-                    value = translations
-                elif question.field_type in ['int']:
-                    try:
-                        value = int(value)
-                    except ValueError:
-                        errors.append('Value "{}" of key "{}" is not a valid '
-                                      'integer.'.format(value, key))
-                        continue
-                elif question.field_type in ['float']:
-                    try:
-                        value = float(value)
-                    except ValueError:
-                        errors.append('Value "{}" of key "{}" is not a valid '
-                                      'number.'.format(value, key))
-                        continue
-                elif question.field_type in ['select_model']:
-                    model = question.form_options.get('model')
-                    choices = get_choices_from_model(model, only_active=False)
-                    if str(value) not in [str(c[0]) for c in choices]:
-                        errors.append('The value is not a valid choice of model'
-                                      ' "{}"'.format(model))
-                        continue
-                    try:
-                        value = int(value)
-                    except TypeError:
-                        value = None
-                elif question.field_type in ['todo']:
-                    value = None
-                elif question.field_type in ['image', 'file', 'date']:
-                    pass
-                elif question.field_type in [
-                        'user_id', 'link_id', 'hidden', 'display_only']:
-                    pass
-                elif question.field_type in ['link_video']:
-                    # TODO: This should be properly checked!
-                    pass
-                elif question.field_type in ['map']:
-                    # A very rough check if the value is a GeoJSON.
-                    try:
-                        geojson = json.loads(value)
-                    except ValueError:
-                        errors.append('Invalid geometry: "{}"'.format(value))
-                        continue
-                    for feature in geojson.get('features', []):
-                        geom = feature.get('geometry', {})
-                        if 'coordinates' not in geom or 'type' not in geom:
-                            errors.append('Invalid geometry: "{}"'.format(value))
-                            continue
-                else:
-                    raise NotImplementedError(
-                        'Field type "{}" needs to be checked properly'.format(
-                            question.field_type))
-                if value or isinstance(value, (bool, int, float)):
-                    cleaned_qg[key] = value
-            if cleaned_qg:
-                if len(cleaned_qg) == 1 and '__order' in cleaned_qg:
-                    continue
-                cleaned_qg_list.append(cleaned_qg)
-                if '__order' in cleaned_qg:
-                    ordered_qg = True
-        if ordered_qg is True:
-            cleaned_qg_list = sorted(
-                cleaned_qg_list, key=lambda qg: qg.get('__order', 0))
-        if cleaned_qg_list:
-            cleaned_data[qg_keyword] = cleaned_qg_list
-        if cleaned_qg_list and questiongroup.questiongroup_condition:
-            condition_fulfilled = False
-            for condition_name, condition_data in questiongroup_conditions.\
-                    items():
-                if condition_name != questiongroup.questiongroup_condition:
-                    continue
-                for qg_data in data.get(condition_data[0], []):
-                    condition_value = qg_data.get(condition_data[1])
-                    if isinstance(condition_value, list):
-                        all_values_evaluated = False
-                        for cond_value in condition_value:
-                            evaluated = True
-                            for c in condition_data[2]:
-                                try:
-                                    evaluated = evaluated and eval(
-                                        '{}{}'.format(cond_value, c))
-                                except NameError:
-                                    evaluated = evaluated and eval(
-                                        '"{}"{}'.format(cond_value, c))
-                                except:
-                                    evaluated = False
-                                    continue
-                            all_values_evaluated = (
-                                all_values_evaluated or evaluated)
-                        condition_fulfilled = (
-                            condition_fulfilled or all_values_evaluated)
-                    else:
-                        evaluated = True
-                        for c in condition_data[2]:
-                            try:
-                                evaluated = evaluated and eval('{}{}'.format(
-                                    condition_value, c))
-                            except NameError:
-                                evaluated = evaluated and eval(
-                                    '"{}"{}'.format(condition_value, c))
-                            except:
-                                evaluated = False
-                                continue
-                        condition_fulfilled = evaluated or condition_fulfilled
-            if condition_fulfilled is False:
-                errors.append(
-                    'Questiongroup with keyword "{}" requires condition "{}".'.
-                    format(
-                        questiongroup.keyword,
-                        questiongroup.questiongroup_condition))
-
-    # Check for select_conditional_questiongroup questions. This needs to be
-    # done after cleaning the data JSON as these questions depend on other
-    # questiongroups. Empty questiongroups (eg. {'qg_42': [{'key_57': ''}], ...}
-    # are now cleaned.
-    for qg_keyword, cleaned_qg_list in cleaned_data.items():
-
-        questiongroup = configuration.get_questiongroup_by_keyword(qg_keyword)
-        if questiongroup is None:
-            continue
-
-        select_conditional_questiongroup_data_list = []
-        select_conditional_questiongroup_found = False
-
-        for qg_data in cleaned_qg_list:
-            select_conditional_questiongroup_data = {}
-            for key, value in qg_data.items():
-
-                question = questiongroup.get_question_by_key_keyword(key)
-                if question is None:
-                    continue
-
-                if question.field_type in ['select_conditional_questiongroup']:
-                    select_conditional_questiongroup_found = True
-
-                    # Set currently valid question choices
-                    questiongroups = question.form_options.get(
-                        'options_by_questiongroups', [])
-                    question.choices = get_choices_from_questiongroups(
-                        cleaned_data, questiongroups, configuration.keyword,
-                        configuration.edition)
-
-                    if value in [c[0] for c in question.choices]:
-                        # Only copy values which are valid options.
-                        select_conditional_questiongroup_data[key] = value
-
-                else:
-                    select_conditional_questiongroup_data[key] = value
-
-            select_conditional_questiongroup_data_list.append(
-                select_conditional_questiongroup_data)
-
-        if select_conditional_questiongroup_found:
-            cleaned_data[
-                qg_keyword] = select_conditional_questiongroup_data_list
-
-    return cleaned_data, errors
+        return {}, [str(e)]
+    return get_data_validator(configuration).validate(
+        data, no_limit_check=no_limit_check, keep_unknown_questiongroups=True)
 
 
 def is_valid_questionnaire_format(questionnaire_data):
@@ -1195,6 +612,98 @@ def get_link_data(linked_objects, link_configuration_code=None):
     return links
 
 
+def prefetch_list_metadata(questionnaire_objects) -> list:
+    """
+    Load the metadata of a list (eg. a page) of questionnaires in a constant
+    number of queries: The configurations, memberships, translations and
+    flags of all questionnaires are queried at once and set as the (cached)
+    properties used by :func:`questionnaire.models.Questionnaire.get_metadata`.
+
+    Args:
+        ``questionnaire_objects`` (list): A list (queryset) of
+        :class:`questionnaire.models.Questionnaire` objects.
+
+    Returns:
+        ``list``. The questionnaire objects.
+    """
+    questionnaire_objects = list(questionnaire_objects)
+    prefetch_related_objects(
+        questionnaire_objects,
+        'configuration',
+        'flags',
+        'questionnairetranslation_set',
+        Prefetch(
+            'questionnairemembership_set',
+            queryset=QuestionnaireMembership.objects.select_related(
+                'user').order_by('id')),
+    )
+
+    roles = {
+        settings.QUESTIONNAIRE_COMPILER: 'compilers',
+        settings.QUESTIONNAIRE_EDITOR: 'editors',
+        settings.QUESTIONNAIRE_REVIEWER: 'reviewers',
+    }
+    for obj in questionnaire_objects:
+        members = {attribute: [] for attribute in roles.values()}
+        for membership in obj.questionnairemembership_set.all():
+            if membership.role in roles:
+                members[roles[membership.role]].append({
+                    'id': membership.user.id,
+                    'name': str(membership.user),
+                })
+
+        translations = obj.questionnairetranslation_set.all()
+        original_locale = next(
+            (t.language for t in translations if t.original_language), None)
+
+        # Set the values of the cached properties.
+        obj.__dict__.update(members)
+        obj.__dict__.update({
+            'translations': [t.language for t in translations],
+            'original_locale': original_locale,
+            'flags_property': [{
+                'flag': flag.flag,
+                'name': flag.get_flag_display(),
+                'helptext': flag.get_helptext(),
+            } for flag in obj.flags.all()],
+        })
+
+    return questionnaire_objects
+
+
+def get_links_by_questionnaire(questionnaire_objects, status_filter) -> dict:
+    """
+    Return the linked questionnaires (matching the status filter) of a list
+    of questionnaires, queried at once.
+
+    Args:
+        ``questionnaire_objects`` (list): A list (queryset) of
+        :class:`questionnaire.models.Questionnaire` objects.
+
+        ``status_filter`` (``django.db.models.Q``). The status filter for
+        the linked questionnaires.
+
+    Returns:
+        ``dict``. The lists of linked questionnaires by ID of the
+        questionnaire.
+    """
+    link_ids = QuestionnaireLink.objects.filter(
+        from_questionnaire_id__in=[obj.id for obj in questionnaire_objects]
+    ).order_by('id').values_list('from_questionnaire_id', 'to_questionnaire_id')
+
+    linked_objects = Questionnaire.objects.filter(status_filter).filter(
+        id__in={to_id for __, to_id in link_ids}
+    ).select_related('configuration').prefetch_related(
+        'questionnairetranslation_set'
+    ).distinct().in_bulk()
+
+    links = {obj.id: [] for obj in questionnaire_objects}
+    for from_id, to_id in link_ids:
+        if to_id in linked_objects:
+            links[from_id].append(linked_objects[to_id])
+    return links
+
+
 def get_link_display(configuration_code, name, identifier):
     """
     Return the representation of a linked questionnaire used for display
@@ -1452,25 +961,21 @@ def get_list_values(
         questionnaire_objects = []
     list_entries = []
 
-    for result in es_hits:
-        # Results from Elasticsearch. List values are already available.
-        if result.get('_source'):
+    # Results from Elasticsearch. List values are already available.
+    list_entries.extend(get_es_list_values(es_hits))
 
-            serializer = QuestionnaireSerializer(
-                data=result['_source']
-            )
-
-            if serializer.is_valid():
-                serializer.to_list_values(lang=get_language())
-                list_entries.append(serializer.validated_data)
-            else:
-                logger.warning('Invalid data on the serializer: {}'.format(serializer.errors))
+    questionnaire_objects = prefetch_list_metadata(questionnaire_objects)
+    files_data = File.get_list_image_data(questionnaire_objects)
+    if with_links is True:
+        links_by_questionnaire = get_links_by_questionnaire(
+            questionnaire_objects, status_filter or Q())
 
     for obj in questionnaire_objects:
         # Results from database query. List values have to be retrieved
         # through the configuration of the questionnaires.
         template_value = {
-            'list_data': obj.configuration_object.get_list_data([obj.data])[0]
+            'list_data': obj.configuration_object.get_list_data(
+                [obj.data], files_data=files_data)[0]
         }
 
         metadata = obj.get_metadata()
@@ -1484,7 +989,7 @@ def get_list_values(
         # Reorder the links: Group them by linked configuration
         links = {}
         if with_links is True:
-            link_data = get_link_data(obj.links.filter(status_filter))
+            link_data = get_link_data(links_by_questionnaire[obj.id])
 
             for questionnaire_configuration, link_dicts in link_data.items():
                 for link_dict in link_dicts:
@@ -1504,6 +1009,99 @@ def get_list_values(
     return list_entries
 
 
+def get_es_list_values(es_hits: list) -> list:
+    """
+    Prepare the list values of Elasticsearch hits. The list values are
+    projected directly from the ``_source`` of the hits, without validating
+    them with the :class:`questionnaire.serializers.QuestionnaireSerializer`.
+    The configuration of each ``serializer_config`` and
+    ``serializer_edition`` is resolved only once.
+
+    Hits which do not have the expected format are passed through the
+    serializer (and dropped with a warning if they are invalid).
+
+    Args:
+        ``es_hits`` (list): A list of hits as retrieved from an
+        Elasticsearch query.
+
+    Returns:
+        ``list``. A list of dictionaries containing the list values.
+    """
+    language = get_language()
+    configurations = {}
+    list_entries = []
+    for result in es_hits:
+        source = result.get('_source')
+        if not source:
+            continue
+
+        data = get_es_list_source_data(source)
+        if data is None:
+            serializer = QuestionnaireSerializer(data=source)
+            if serializer.is_valid():
+                serializer.to_list_values(lang=language)
+                list_entries.append(serializer.validated_data)
+            else:
+                logger.warning('Invalid data on the serializer: {}'.format(
+                    serializer.errors))
+            continue
+
+        configuration_key = (
+            source['serializer_config'], source['serializer_edition'])
+        if configuration_key not in configurations:
+            configurations[configuration_key] = get_configuration(
+                code=configuration_key[0], edition=configuration_key[1])
+
+        list_entries.append(prepare_list_values(
+            data=data, config=configurations[configuration_key],
+            lang=language))
+
+    return list_entries
+
+
+# Serializer fields which contain lists.
+ES_LIST_SOURCE_LIST_FIELDS = [
+    'compilers', 'editors', 'flags', 'links', 'reviewers', 'status',
+    'translations']
+es_list_source_datetime_field = DateTimeField()
+
+
+def get_es_list_source_data(source: dict):
+    """
+    Return the fields of the serializer from the ``_source`` of a hit, in the
+    same format as the validated data of the serializer. Returns ``None`` if
+    the source does not have the expected format.
+    """
+    try:
+        data = {
+            field: source[field]
+            for field in QuestionnaireSerializer.Meta.fields
+        }
+    except KeyError:
+        return None
+
+    if not data['serializer_config'] or not data['serializer_edition']:
+        return None
+    if not isinstance(data['code'], str):
+        return None
+    if not data['original_locale'] or not isinstance(
+            data['original_locale'], str):
+        return None
+    if not all(isinstance(data[field], list)
+               for field in ES_LIST_SOURCE_LIST_FIELDS):
+        return None
+
+    try:
+        for field in ['created', 'updated']:
+            data[field] = es_list_source_datetime_field.to_internal_value(
+                data[field])
+    except ValidationError:
+        return None
+
+    return data
+
+
+@transaction.atomic
 def handle_review_actions(request, questionnaire_object, configuration_code):
     """
     Handle review and form submission actions. Updates the Questionnaire
@@ -1652,7 +1250,7 @@ def handle_review_actions(request, questionnaire_object, configuration_code):
             return
 
         # Set the previously "public" Questionnaire to "inactive".
-        # Also remove it from ES.
+        # Also remove it from ES (through the indexing queue).
         previously_public = Questionnaire.objects.filter(
             code=questionnaire_object.code,
             status=settings.QUESTIONNAIRE_PUBLIC
@@ -1661,7 +1259,7 @@ def handle_review_actions(request, questionnaire_object, configuration_code):
             previous_object_previous_status = previous_object.status
             previous_object.status = settings.QUESTIONNAIRE_INACTIVE
             previous_object.save()
-            delete_questionnaires_from_es([previous_object])
+            queue_questionnaire_deletion([previous_object])
             change_status.send(
                 sender=settings.NOTIFICATIONS_CHANGE_STATUS,
                 questionnaire=previous_object,
@@ -1688,23 +1286,15 @@ def handle_review_actions(request, questionnaire_object, configuration_code):
             else:
                 return
 
-        added, errors = put_questionnaire_data([questionnaire_object])
+        queue_questionnaire_update([questionnaire_object])
 
         # It is important to also put the data of the linked
         # questionnaires so changes (eg. name change) appear in their
         # links.
         # However, do this only where the linked questionnaire is "public"!
         # Otherwise, "draft" questionnaires would appear in the list.
-        links_by_configuration = {}
-        for link in questionnaire_object.links.filter(
-                status=settings.QUESTIONNAIRE_PUBLIC):
-            configuration_object = link.configuration
-            if configuration_object.code not in links_by_configuration:
-                links_by_configuration[configuration_object.code] = []
-            links_by_configuration[configuration_object.code].append(link)
-
-        for link_configuration, links in links_by_configuration.items():
-            added, errors = put_questionnaire_data(links)
+        queue_questionnaire_update(questionnaire_object.links.filter(
+            status=settings.QUESTIONNAIRE_PUBLIC))
 
         messages.success(
             request, _('The questionnaire was successfully set public.'))
@@ -1834,7 +1424,9 @@ def handle_review_actions(request, questionnaire_object, configuration_code):
                 user = User.objects.get(pk=user_id)
             except User.DoesNotExist:
                 try:
-                    user = User.create_new(id=user_id, email=user_info['email'])
+                    with transaction.atomic():
+                        user = User.create_new(
+                            id=user_id, email=user_info['email'])
                 except IntegrityError:
                     user_error.append(user_info)
                     continue
@@ -1913,7 +1505,9 @@ def handle_review_actions(request, questionnaire_object, configuration_code):
             new_compiler = User.objects.get(pk=user_id)
         except User.DoesNotExist:
             try:
-                new_compiler = User.create_new(id=user_id, email=user_info['email'])
+                with transaction.atomic():
+                    new_compiler = User.create_new(
+                        id=user_id, email=user_info['email'])
             except IntegrityError:
                 messages.error(
                     request, 'A user with this email address exists already.')
@@ -1972,8 +1566,7 @@ def handle_review_actions(request, questionnaire_object, configuration_code):
 
         # Re-add the questionnaire to ES if it was public
         if questionnaire_object.status == settings.QUESTIONNAIRE_PUBLIC:
-            delete_questionnaires_from_es([questionnaire_object])
-            added, errors = put_questionnaire_data([questionnaire_object])
+            queue_questionnaire_update([questionnaire_object])
 
         messages.success(request, 'Compiler was changed successfully')
 
@@ -2106,7 +1699,7 @@ def handle_review_actions(request, questionnaire_object, configuration_code):
                 return
 
         if questionnaire_object.status == settings.QUESTIONNAIRE_PUBLIC:
-            delete_questionnaires_from_es([questionnaire_object])
+            queue_questionnaire_deletion([questionnaire_object])
             pre_save.connect(
                 prevent_updates_on_published_items, sender=Questionnaire)
         messages.success(request, _('The questionnaire was succesfully removed'))
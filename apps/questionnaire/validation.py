@@ -0,0 +1,435 @@
+"""
+Validation of questionnaire data against a configuration, see
+:func:`questionnaire.utils.validate_questionnaire_data` and
+:func:`questionnaire.utils.clean_questionnaire_data`.
+
+Everything the validation needs from the configuration (the questiongroup
+conditions, the allowed keys, the limits, the choices and the checks by field
+type) is collected once in a :class:`QuestionnaireDataValidator`. The
+validator is kept on the configuration object (see
+:func:`get_data_validator`), so it is cached together with the configuration
+and the submitted data is validated in a single pass.
+"""
+import json
+
+from configuration.utils import get_choices_from_model, \
+    get_choices_from_questiongroups
+
+# Returned by the checks of a question if the value must not be stored.
+INVALID = object()
+
+CHOICE_FIELD_TYPES = [
+    'bool', 'measure', 'select_type', 'select', 'radio',
+    'select_conditional_custom']
+LIST_FIELD_TYPES = ['checkbox', 'image_checkbox', 'cb_bool', 'multi_select']
+
+# The name of the check (method "clean_[name]" of QuestionValidator) by field
+# type.
+FIELD_TYPE_CHECKS = {
+    'measure': 'measure',
+    **{field_type: 'choice' for field_type in [
+        'bool', 'select_type', 'select', 'radio',
+        'select_conditional_custom']},
+    **{field_type: 'list' for field_type in LIST_FIELD_TYPES},
+    **{field_type: 'translations' for field_type in [
+        'char', 'text', 'wms_layer']},
+    'int': 'int',
+    'float': 'float',
+    'select_model': 'model',
+    'todo': 'todo',
+    'map': 'map',
+    # select_conditional_questiongroup is checked after all questiongroups.
+    **{field_type: 'unchanged' for field_type in [
+        'select_conditional_questiongroup', 'image', 'file', 'date',
+        'user_id', 'link_id', 'hidden', 'display_only', 'link_video']},
+}
+
+
+class QuestionValidator:
+    """
+    The checks of a single question.
+    """
+    def __init__(self, question):
+        self.question = question
+        self.keyword = question.keyword
+        self.field_type = question.field_type
+        self.max_length = question.max_length
+        self.max_choices = question.form_options.get(
+            'field_options', {}).get('data-cb-max-choices')
+        self.choices = None
+        if self.field_type in CHOICE_FIELD_TYPES + LIST_FIELD_TYPES:
+            self.choices = set(c[0] for c in question.choices)
+
+        # The values of other questions of the questiongroup this question
+        # depends on, as (keyword, value).
+        self.required_conditions = []
+        if question.conditional:
+            self.required_conditions = [
+                (q.keyword, c[0]) for q in question.questiongroup.questions
+                for c in q.conditions if self.keyword in c[2]]
+
+        check = FIELD_TYPE_CHECKS.get(self.field_type)
+        self.clean = getattr(self, f'clean_{check}', self.clean_unknown)
+
+    def is_choice(self, value) -> bool:
+        try:
+            return value in self.choices
+        except TypeError:
+            # Unhashable values (e.g. lists) are never a valid choice.
+            return False
+
+    def clean_measure(self, value, qg_keyword, errors, **kwargs):
+        try:
+            value = int(value)
+        except ValueError:
+            errors.append(
+                'Measure value "{}" of key "{}" (questiongroup '
+                '"{}") is not valid.'.format(value, self.keyword, qg_keyword))
+            return INVALID
+        return self.clean_choice(value, qg_keyword, errors)
+
+    def clean_choice(self, value, qg_keyword, errors, **kwargs):
+        if not self.is_choice(value):
+            errors.append(
+                'Value "{}" is not valid for key "{}" ('
+                'questiongroup "{}").'.format(value, self.keyword, qg_keyword))
+            return INVALID
+        return value
+
+    def clean_list(self, value, qg_keyword, errors, **kwargs):
+        if not isinstance(value, list):
+            errors.append('Value "{}" of key "{}" needs to be a list'.format(
+                value, self.keyword))
+            return INVALID
+        if self.field_type == 'cb_bool':
+            try:
+                value = [int(v) for v in value]
+            except ValueError:
+                errors.append(
+                    'Value "{}" is not a valid boolean checkbox value for key '
+                    '"{}" (questiongroup "{}")'.format(
+                        value, self.keyword, qg_keyword))
+                return INVALID
+        for v in value:
+            if not self.is_choice(v):
+                errors.append(
+                    'Value "{}" is not valid for key "{}" ('
+                    'questiongroup "{}").'.format(
+                        value, self.keyword, qg_keyword))
+        if self.max_choices and len(value) > self.max_choices:
+            errors.append('Key "{}" has too many values: {}'.format(
+                self.keyword, value))
+            return INVALID
+        return value
+
+    def clean_translations(
+            self, value, qg_keyword, errors, no_limit_check=False, **kwargs):
+        if not isinstance(value, dict):
+            errors.append('Value "{}" of key "{}" needs to be a dict.'.format(
+                value, self.keyword))
+            return INVALID
+        translations = {}
+        for locale, translation in value.items():
+            if not translation:
+                continue
+            if (not no_limit_check and self.max_length and
+                    len(translation) > self.max_length):
+                subcategory = self.question.questiongroup.get_top_subcategory()
+                subcategory_name = '{} {}'.format(
+                    subcategory.form_options.get('numbering'),
+                    subcategory.label)
+                errors.append(
+                    'Value of question "{}" of subcategory "{}" is too long. '
+                    'It can only contain {} characters.'.format(
+                        self.question.label, subcategory_name,
+                        self.max_length))
+                continue
+            translations[locale] = translation
+        return translations
+
+    def clean_int(self, value, qg_keyword, errors, **kwargs):
+        try:
+            return int(value)
+        except ValueError:
+            errors.append('Value "{}" of key "{}" is not a valid '
+                          'integer.'.format(value, self.keyword))
+            return INVALID
+
+    def clean_float(self, value, qg_keyword, errors, **kwargs):
+        try:
+            return float(value)
+        except ValueError:
+            errors.append('Value "{}" of key "{}" is not a valid '
+                          'number.'.format(value, self.keyword))
+            return INVALID
+
+    def clean_model(self, value, qg_keyword, errors, **kwargs):
+        # The choices of a model change, they are not compiled.
+        model = self.question.form_options.get('model')
+        choices = get_choices_from_model(model, only_active=False)
+        if str(value) not in [str(c[0]) for c in choices]:
+            errors.append(
+                'The value is not a valid choice of model "{}"'.format(model))
+            return INVALID
+        try:
+            return int(value)
+        except TypeError:
+            return None
+
+    def clean_todo(self, value, qg_keyword, errors, **kwargs):
+        return None
+
+    def clean_map(self, value, qg_keyword, errors, **kwargs):
+        # A very rough check if the value is a GeoJSON.
+        try:
+            geojson = json.loads(value)
+        except ValueError:
+            errors.append('Invalid geometry: "{}"'.format(value))
+            return INVALID
+        for feature in geojson.get('features', []):
+            geom = feature.get('geometry', {})
+            if 'coordinates' not in geom or 'type' not in geom:
+                errors.append('Invalid geometry: "{}"'.format(value))
+        return value
+
+    def clean_unchanged(self, value, qg_keyword, errors, **kwargs):
+        return value
+
+    def clean_unknown(self, value, qg_keyword, errors, **kwargs):
+        raise NotImplementedError(
+            'Field type "{}" needs to be checked properly'.format(
+                self.field_type))
+
+
+class QuestiongroupValidator:
+    """
+    The limits and the questions of a single questiongroup.
+    """
+    def __init__(self, questiongroup):
+        self.questiongroup = questiongroup
+        self.keyword = questiongroup.keyword
+        self.max_num = questiongroup.max_num
+        self.is_inherited = bool(questiongroup.inherited_configuration)
+        self.questiongroup_condition = questiongroup.questiongroup_condition
+        self.questions = {
+            keyword: QuestionValidator(question) for keyword, question
+            in questiongroup.questions_by_keyword.items()}
+        self.select_conditional_questions = [
+            question for question in self.questions.values()
+            if question.field_type == 'select_conditional_questiongroup']
+
+
+class QuestionnaireDataValidator:
+    """
+    Validate and clean questionnaire data of a configuration.
+    """
+    def __init__(self, configuration):
+        self.configuration_keyword = configuration.keyword
+        self.edition = configuration.edition
+        self.questiongroups = {}
+        # The questiongroup conditions in the form:
+        # {"CONDITION_NAME": ("QG_KEYWORD", "Q_KEYWORD", ["COND_1", "COND_2"])}
+        self.questiongroup_conditions = {}
+        for questiongroup in configuration.get_questiongroups():
+            self.questiongroups.setdefault(
+                questiongroup.keyword, QuestiongroupValidator(questiongroup))
+            for question in questiongroup.questions:
+                for conditions in question.questiongroup_conditions:
+                    condition, condition_name = conditions.split('|')
+                    if condition_name in self.questiongroup_conditions:
+                        self.questiongroup_conditions[condition_name][2].\
+                            append(condition)
+                    else:
+                        self.questiongroup_conditions[condition_name] = \
+                            questiongroup.keyword, question.keyword, \
+                            [condition]
+
+    def validate(self, data: dict, no_limit_check=False,
+                 keep_unknown_questiongroups=False) -> tuple:
+        """
+        Validate and clean questionnaire data (of a valid format).
+
+        Args:
+            ``data`` (dict): A questionnaire data dictionary.
+
+            ``no_limit_check`` (bool): Whether to skip the check of the
+            maximum length of texts.
+
+            ``keep_unknown_questiongroups`` (bool): Whether questiongroups
+            which are not part of the configuration are kept as they are.
+            Otherwise, they are an error.
+
+        Returns:
+            ``dict``. The cleaned questionnaire data dictionary.
+
+            ``list``. A list with errors encountered.
+        """
+        errors = []
+        cleaned_data = {}
+        for qg_keyword, qg_data_list in data.items():
+            questiongroup = self.questiongroups.get(qg_keyword)
+            if questiongroup is None:
+                if keep_unknown_questiongroups:
+                    cleaned_data[qg_keyword] = qg_data_list
+                else:
+                    errors.append(
+                        "Questiongroup with keyword '{}' is not valid for "
+                        "this Configuration".format(qg_keyword))
+                continue
+            if questiongroup.max_num < len(qg_data_list):
+                errors.append(
+                    'Questiongroup with keyword "{}" has a max_num of {} but '
+                    'appears {} times'.format(
+                        qg_keyword, questiongroup.max_num, len(qg_data_list)))
+                continue
+            if questiongroup.is_inherited:
+                # Do not store linked questiongroups
+                continue
+            cleaned_qg_list = self.clean_questiongroup_data(
+                questiongroup, qg_data_list, errors, no_limit_check)
+            if cleaned_qg_list:
+                cleaned_data[qg_keyword] = cleaned_qg_list
+                if questiongroup.questiongroup_condition and not \
+                        self.is_condition_fulfilled(
+                            questiongroup.questiongroup_condition, data):
+                    errors.append(
+                        'Questiongroup with keyword "{}" requires condition '
+                        '"{}".'.format(
+                            qg_keyword, questiongroup.questiongroup_condition))
+
+        # Check for select_conditional_questiongroup questions. This needs to
+        # be done after cleaning the data as these questions depend on other
+        # questiongroups.
+        for qg_keyword, cleaned_qg_list in cleaned_data.items():
+            questiongroup = self.questiongroups.get(qg_keyword)
+            if questiongroup is None or \
+                    not questiongroup.select_conditional_questions:
+                continue
+            self.clean_select_conditional_questiongroup(
+                questiongroup, cleaned_data, qg_keyword)
+
+        return cleaned_data, errors
+
+    def clean_questiongroup_data(
+            self, questiongroup: QuestiongroupValidator, qg_data_list: list,
+            errors: list, no_limit_check: bool) -> list:
+        cleaned_qg_list = []
+        ordered_qg = False
+        for qg_data in qg_data_list:
+            cleaned_qg = {}
+            for key, value in qg_data.items():
+                if not value and not isinstance(value, (bool, int)):
+                    continue
+                if key == '__order':
+                    cleaned_qg['__order'] = value
+                    continue
+                question = questiongroup.questions.get(key)
+                if question is None:
+                    errors.append(
+                        'Question with keyword "{}" is not valid for '
+                        'Questiongroup with keyword "{}"'.format(
+                            key, questiongroup.keyword))
+                    continue
+                for condition_keyword, condition_value in \
+                        question.required_conditions:
+                    cond_data = qg_data.get(condition_keyword)
+                    if not cond_data or condition_value not in cond_data:
+                        errors.append(
+                            'Key "{}" is only valid if "{}={}"'.format(
+                                key, condition_keyword, condition_value))
+                value = question.clean(
+                    value, questiongroup.keyword, errors,
+                    no_limit_check=no_limit_check)
+                if value is INVALID:
+                    continue
+                if value or isinstance(value, (bool, int, float)):
+                    cleaned_qg[key] = value
+            if cleaned_qg:
+                if len(cleaned_qg) == 1 and '__order' in cleaned_qg:
+                    continue
+                cleaned_qg_list.append(cleaned_qg)
+                if '__order' in cleaned_qg:
+                    ordered_qg = True
+        if ordered_qg is True:
+            cleaned_qg_list = sorted(
+                cleaned_qg_list, key=lambda qg: qg.get('__order', 0))
+        return cleaned_qg_list
+
+    def is_condition_fulfilled(self, condition_name: str, data: dict) -> bool:
+        condition_data = self.questiongroup_conditions.get(condition_name)
+        if condition_data is None:
+            return False
+        qg_keyword, q_keyword, conditions = condition_data
+        condition_fulfilled = False
+        for qg_data in data.get(qg_keyword, []):
+            condition_value = qg_data.get(q_keyword)
+            if isinstance(condition_value, list):
+                for cond_value in condition_value:
+                    condition_fulfilled = condition_fulfilled or \
+                        evaluate_conditions(cond_value, conditions)
+            else:
+                condition_fulfilled = condition_fulfilled or \
+                    evaluate_conditions(condition_value, conditions)
+        return condition_fulfilled
+
+    def clean_select_conditional_questiongroup(
+            self, questiongroup: QuestiongroupValidator, cleaned_data: dict,
+            qg_keyword: str):
+        """
+        Only keep the values of select_conditional_questiongroup questions
+        which are valid options for the (cleaned) data of the other
+        questiongroups.
+        """
+        qg_data_list = []
+        is_found = False
+        for qg_data in cleaned_data[qg_keyword]:
+            cleaned_qg = {}
+            for key, value in qg_data.items():
+                question = questiongroup.questions.get(key)
+                if question is None:
+                    continue
+                if question.field_type == 'select_conditional_questiongroup':
+                    is_found = True
+                    # Set currently valid question choices
+                    question.question.choices = get_choices_from_questiongroups(
+                        cleaned_data,
+                        question.question.form_options.get(
+                            'options_by_questiongroups', []),
+                        self.configuration_keyword, self.edition)
+                    if value in [c[0] for c in question.question.choices]:
+                        # Only copy values which are valid options.
+                        cleaned_qg[key] = value
+                else:
+                    cleaned_qg[key] = value
+            qg_data_list.append(cleaned_qg)
+        if is_found:
+            cleaned_data[qg_keyword] = qg_data_list
+
+
+def evaluate_conditions(value, conditions: list) -> bool:
+    """
+    Evaluate the conditions (e.g. ['>5', '<10']) of a questiongroup for a
+    value.
+    """
+    evaluated = True
+    for c in conditions:
+        try:
+            evaluated = evaluated and eval('{}{}'.format(value, c))
+        except NameError:
+            evaluated = evaluated and eval('"{}"{}'.format(value, c))
+        except Exception:
+            evaluated = False
+            continue
+    return evaluated
+
+
+def get_data_validator(configuration) -> QuestionnaireDataValidator:
+    """
+    Return the validator of a configuration. It is created once and then kept
+    on the configuration object.
+    """
+    validator = configuration.__dict__.get('data_validator')
+    if validator is None:
+        validator = QuestionnaireDataValidator(configuration)
+        configuration.data_validator = validator
+    return validator
@@ -1,6 +1,9 @@
 from collections import Sequence
+from django.core.exceptions import SuspiciousOperation
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 
+from search.utils import decode_cursor
+
 
 class ESPagination(Sequence):
     """
@@ -180,3 +183,32 @@ def get_page_parameter(request):
     if page <= 0:
         return DEFAULT_PAGE
     return page
+
+
+def get_cursor_parameter(request):
+    """
+    Return the sort values of the ``cursor`` parameter of the request's GET
+    parameters. If a cursor is passed, the results are paginated with
+    ``search_after`` instead of pages. An empty cursor requests the first
+    page.
+
+    Args:
+        ``request`` (django.http.HttpRequest): The request object with
+        parameter ``cursor`` set.
+
+    Returns:
+        ``list`` or ``None``. The sort values or ``None`` if no cursor is
+        passed.
+
+    Raises:
+        ``SuspiciousOperation`` if the cursor is not valid.
+    """
+    cursor = request.GET.get('cursor')
+    if cursor is None:
+        return None
+    if cursor == '':
+        return []
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise SuspiciousOperation('Invalid cursor')
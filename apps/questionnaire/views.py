@@ -1,5 +1,7 @@
 import collections
 import contextlib
+import hashlib
+import json
 import logging
 from itertools import chain, groupby
 
@@ -7,7 +9,8 @@ import operator
 from configuration.models import Project, Institution, Configuration
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.core.exceptions import ValidationError
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousOperation, ValidationError
 from django.core.urlresolvers import reverse
 from django.db.models import Q
 from django.http import (
@@ -33,14 +36,16 @@ from braces.views import LoginRequiredMixin
 from elasticsearch import TransportError
 
 from accounts.views import QuestionnaireSearchView
-from configuration.cache import get_configuration
+from configuration.cache import get_configuration, \
+    get_configuration_generation
 from configuration.utils import get_configuration_index_filter
 from questionnaire.signals import change_questionnaire_data
 from questionnaire.upload import (
     retrieve_file,
     UPLOAD_THUMBNAIL_CONTENT_TYPE,
 )
-from search.search import advanced_search, get_aggregated_values
+from search.search import advanced_search, get_aggregated_values, \
+    get_facet_counts
 
 from .errors import QuestionnaireLockedException
 from .models import Questionnaire, File, QUESTIONNAIRE_ROLES, Lock, Flag
@@ -58,10 +63,12 @@ from .utils import (
     query_questionnaire)
 from .view_utils import (
     ESPagination,
+    get_cursor_parameter,
     get_pagination_parameters,
     get_paginator,
     get_limit_parameter,
     get_page_parameter)
+from search.utils import encode_cursor
 from .conf import settings
 
 logger = logging.getLogger(__name__)
@@ -721,7 +728,8 @@ class QuestionnaireView(QuestionnaireRetrieveMixin, StepsMixin, InheritedDataMix
         except ZeroDivisionError:
             completeness_percentage = 0
 
-        sections = self.questionnaire_configuration.get_details(
+        questionnaire_links = self.get_links()
+        sections = self.get_rendered_sections(
             data, permissions=permissions,
             edit_step_route='{}:questionnaire_new_step'.format(
                 self.url_namespace),
@@ -729,7 +737,7 @@ class QuestionnaireView(QuestionnaireRetrieveMixin, StepsMixin, InheritedDataMix
             csrf_token=csrf_token,
             edited_questiongroups=edited_questiongroups,
             view_mode=self.view_mode,
-            links=self.get_links(),
+            links=questionnaire_links,
             review_config=review_config,
             user=request.user if request.user.is_authenticated() else None,
             completeness_percentage=completeness_percentage
@@ -740,7 +748,7 @@ class QuestionnaireView(QuestionnaireRetrieveMixin, StepsMixin, InheritedDataMix
         module_form_config = {}
         available_modules = self.questionnaire_configuration.get_modules()
         if self.has_object:
-            for link_config, link_list in self.get_links().items():
+            for link_config, link_list in questionnaire_links.items():
                 if link_config in available_modules:
                     modules[link_config] = link_list
                 else:
@@ -796,6 +804,59 @@ class QuestionnaireView(QuestionnaireRetrieveMixin, StepsMixin, InheritedDataMix
             raise Http404()
         return super().get_object()
 
+    def get_rendered_sections(self, data, **kwargs) -> list:
+        """
+        Render the sections of the questionnaire details. If the output does
+        not depend on the permissions of the user (see
+        :func:`get_details_cache_key`), it is kept in the cache.
+        """
+        cache_key = self.get_details_cache_key(data, kwargs.get('links'))
+        if cache_key is not None:
+            sections = cache.get(cache_key)
+            if sections is not None:
+                return sections
+
+        sections = self.questionnaire_configuration.get_details(data, **kwargs)
+
+        if cache_key is not None:
+            cache.set(
+                cache_key, sections,
+                settings.QUESTIONNAIRE_DETAILS_CACHE_TIMEOUT)
+        return sections
+
+    def get_details_cache_key(self, data: dict, links: dict):
+        """
+        Return the key of the cached sections or None if the sections cannot
+        be cached. Only the sections of public questionnaires shown to
+        anonymous users are cached, as they do not contain anything depending
+        on the permissions.
+
+        Public questionnaires are not updated anymore, but the linked
+        questionnaires, the metadata (e.g. flags) and the configuration may
+        change. The key therefore contains a digest of the data, links and
+        metadata along with the generation of the configuration.
+        """
+        if (self.request.user.is_authenticated() or not self.has_object
+                or self.object.status != settings.QUESTIONNAIRE_PUBLIC):
+            return None
+
+        content = json.dumps({
+            'data': data,
+            'links': {
+                configuration: [link.get('id') for link in link_list]
+                for configuration, link_list in (links or {}).items()},
+            'metadata': self.object.get_metadata(),
+        }, sort_keys=True, default=str)
+        digest = hashlib.md5(content.encode('utf-8')).hexdigest()
+
+        configuration = self.object.configuration
+        generation = get_configuration_generation(
+            configuration.code, configuration.edition)
+
+        return 'questionnaire_details_{}_{}_{}_{}_{}_{}'.format(
+            self.object.id, int(self.object.updated.timestamp()), generation,
+            get_language(), self.view_mode, digest)
+
     def get_review_config(self, permissions, roles, **kwargs):
         """
         Create a dict with the review_config, this is required for proper display
@@ -1175,13 +1236,24 @@ class QuestionnaireStepView(LoginRequiredMixin, QuestionnaireRetrieveMixin,
 class ESQuestionnaireQueryMixin:
     """
     Mixin to query paginated Questionnaires from elasticsearch.
+
+    The results are paginated by page number (``page``) or, if the parameter
+    ``cursor`` is passed, with cursors (``search_after``). Cursors are not
+    limited in depth and the cursor of the next page is available as
+    ``next_cursor`` after querying the results.
     """
+    search_after = None
+    next_cursor = None
 
     def set_attributes(self):
         """
         Set parameters, mostly required for pagination.
         """
-        self.current_page = get_page_parameter(self.request)
+        self.search_after = get_cursor_parameter(self.request)
+        if self.search_after is None:
+            self.current_page = get_page_parameter(self.request)
+        else:
+            self.current_page = 1
         self.page_size = getattr(
             self, 'page_size', get_limit_parameter(self.request))
         self.offset = self.current_page * self.page_size - self.page_size
@@ -1217,11 +1289,14 @@ class ESQuestionnaireQueryMixin:
         Returns:
             dict. Elasticsearch query result.
         """
+        if self.search_after is not None:
+            return self.get_es_cursor_results()
+
         try:
             # Blank search returns all items within all indexes.
             es_search_results = advanced_search(
                 limit=self.page_size, offset=self.offset,
-                **self.get_filter_params()
+                **self.get_search_params()
             )
         except TransportError:
             # See https://redmine.cde.unibe.ch/issues/1093
@@ -1240,6 +1315,28 @@ class ESQuestionnaireQueryMixin:
 
         return es_search_results
 
+    def get_es_cursor_results(self):
+        """
+        Query the page following the cursor and set the cursor of the next
+        page (if there is one). A cursor which does not match the sort of the
+        query (e.g. of another search) is rejected with a bad request.
+        """
+        try:
+            es_search_results = advanced_search(
+                limit=self.page_size, search_after=self.search_after,
+                **self.get_search_params()
+            )
+        except ValueError:
+            raise SuspiciousOperation('Invalid cursor')
+        except TransportError as e:
+            if e.status_code == 400:
+                raise SuspiciousOperation('Invalid cursor')
+            raise
+        hits = es_search_results.get('hits', {}).get('hits', [])
+        if len(hits) == self.page_size:
+            self.next_cursor = encode_cursor(hits[-1]['sort'])
+        return es_search_results
+
     def get_es_paginated_results(self, es_search_results):
         """
         Returns:
@@ -1254,6 +1351,9 @@ class ESQuestionnaireQueryMixin:
             es_pagination, self.current_page, self.page_size
         )
 
+    def get_search_params(self):
+        return self.get_filter_params()
+
     def get_filter_params(self):
         # Get the filters and prepare them to be passed to the search.
         query_string, filter_params = self.get_filters()
@@ -1382,7 +1482,8 @@ class QuestionnaireListView(TemplateView, ESQuestionnaireQueryMixin):
             'rendered_list': render_to_string(
                 self.get_partial_list_template_names(), filter_values),
             'pagination': render_to_string('pagination.html', filter_values),
-            'count': filter_values.get('count', 0)
+            'count': filter_values.get('count', 0),
+            'next_cursor': self.next_cursor,
         }
 
     def get_template_values(self, list_values, questionnaires):
@@ -1406,11 +1507,36 @@ class QuestionnaireFilterView(QuestionnaireListView):
     call_from = 'filter'
 
     template_configuration_code = None
+    facet_counts = {}
 
     def get_template_names(self):
         return '{}/questionnaire/filter.html'.format(
             self.template_configuration_code)
 
+    def get_es_results(self, call_from=None):
+        es_search_results = super().get_es_results(call_from=call_from)
+        self.facet_counts = get_facet_counts(es_search_results)
+        return es_search_results
+
+    def get_search_params(self):
+        """
+        Count the values of the active advanced filters in the same request
+        as the hits.
+        """
+        search_params = super().get_search_params()
+        advanced_filter_paths = [
+            f.path for f in self.configuration.get_filter_keys()]
+        active_filters = get_active_filters(
+            questionnaire_configuration=self.configuration,
+            query_dict=self.request.GET
+        )
+        search_params['facets'] = [
+            (f.get('questiongroup'), f.get('key'), f.get('type'))
+            for f in active_filters
+            if f'{f.get("questiongroup")}__{f.get("key")}' in
+            advanced_filter_paths]
+        return search_params
+
     def get_filter_template_names(self):
         return '{}/questionnaire/partial/advanced_filter.html'.format(
             self.template_configuration_code)
@@ -1450,9 +1576,13 @@ class QuestionnaireFilterView(QuestionnaireListView):
             if key_path not in advanced_filter_paths:
                 continue
 
-            aggregated_values = get_aggregated_values(
-                questiongroup, key, active_filter['type'],
-                **self.get_filter_params())
+            # The values are usually counted along with the hits, query them
+            # separately only if this was not possible.
+            aggregated_values = self.facet_counts.get(key_path)
+            if aggregated_values is None:
+                aggregated_values = get_aggregated_values(
+                    questiongroup, key, active_filter['type'],
+                    **self.get_filter_params())
 
             values_counted = []
             for c in active_filter.get('choices', []):
@@ -1,10 +1,21 @@
+import contextlib
+import json
+import multiprocessing
+import os
+import weakref
+from functools import reduce
+from operator import or_
+
 from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F, Q
 from elasticsearch import Elasticsearch, RequestError
-from elasticsearch.helpers import reindex, bulk
+from elasticsearch.helpers import reindex, bulk, streaming_bulk
 
 from configuration.configuration import QuestionnaireConfiguration
-from questionnaire.models import Questionnaire
+from questionnaire.models import File, Questionnaire
 from questionnaire.serializers import QuestionnaireSerializer
+from .models import IndexQueueEntry
 from .utils import get_analyzer, get_alias, force_strings, ElasticsearchAlias
 
 
@@ -294,25 +305,78 @@ def put_questionnaire_data(questionnaire_objects, **kwargs):
     """
     refresh_aliases = set()
 
+    questionnaire_objects = list(questionnaire_objects)
+    files_data = File.get_list_image_data(questionnaire_objects)
+
     actions = []
     for obj in questionnaire_objects:
+        action = get_questionnaire_action(obj, files_data=files_data)
+        refresh_aliases.add(action['_index'])
+        actions.append(action)
 
-        alias = get_alias(
-            ElasticsearchAlias.from_configuration(configuration=obj.configuration_object)
-        )
-        refresh_aliases.add(alias)
+    actions_executed, errors = bulk(es, actions, **kwargs)
+
+    es.indices.refresh(index=','.join(refresh_aliases))
+    return actions_executed, errors
+
+
+def get_questionnaire_action(obj: Questionnaire, files_data=None) -> dict:
+    """
+    Serialize a questionnaire and return the bulk action to index it.
+
+    Args:
+        ``obj`` (:class:`questionnaire.models.Questionnaire`): The
+        questionnaire to be indexed.
 
-        serialized = QuestionnaireSerializer(instance=obj).data
+    Kwargs:
+        ``files_data`` (dict): The data of the images in the list data, see
+        :func:`questionnaire.models.File.get_list_image_data`.
+
+    Returns:
+        ``dict``. The bulk action (index and document) of the questionnaire.
+    """
+    plan = get_index_plan(obj.configuration_object)
+
+    serialized = QuestionnaireSerializer(
+        instance=obj, context={'files_data': files_data}).data
+
+    # The serializer calls a method (get_list_data) on the configuration
+    # object, which returns values that are prepared to be presented on the
+    # frontend and include lazy translation objects. Cast them to strings.
+    serialized['list_data'] = force_strings(serialized['list_data'])
+
+    # The country field is used as default order of the list and needs to be
+    # set in the ES data. Set it manually if not available.
+    if 'country' not in serialized['list_data']:
+        serialized['list_data']['country'] = None
+
+    serialized['filter_data'] = plan.get_filter_data(obj.data)
+    plan.add_ordered_values(serialized.get('data', {}))
+
+    return {
+        '_index': plan.alias,
+        '_type': 'questionnaire',
+        '_id': obj.id,
+        '_source': serialized,
+    }
 
-        # The serializer calls a method (get_list_data) on the configuration
-        # object, which returns values that are prepared to be presented on the
-        # frontend and include lazy translation objects. Cast them to strings.
-        serialized['list_data'] = force_strings(serialized['list_data'])
 
-        # The country field is used as default order of the list and needs to be
-        # set in the ES data. Set it manually if not available.
-        if 'country' not in serialized['list_data']:
-            serialized['list_data']['country'] = None
+class IndexPlan:
+    """
+    Everything needed to build the documents of one configuration which does
+    not depend on the questionnaire: the alias, the filter paths and the
+    ordered values of the filters. It is built once per configuration object
+    and reused for all its questionnaires.
+
+    The list data is extracted by the configuration itself (see
+    :func:`configuration.configuration.QuestionnaireConfiguration.get_list_data`),
+    which already keeps an index of the questions appearing in the list.
+    """
+
+    def __init__(self, configuration: QuestionnaireConfiguration):
+        self.alias = get_alias(
+            ElasticsearchAlias.from_configuration(configuration=configuration)
+        )
 
         # Collect the filter values as specified in the configuration
         # Global filter keys first
@@ -322,41 +386,56 @@ def put_questionnaire_data(questionnaire_objects, **kwargs):
         # Extend with specific filter keys for this configuration.
         filter_paths.extend([
             (filter_key.path, filter_key.key, filter_key.questiongroup)
-            for filter_key in obj.configuration_object.get_filter_keys()])
-
+            for filter_key in configuration.get_filter_keys()])
+        self.filter_paths = tuple(filter_paths)
+
+        self.ordered_filter_values = tuple(
+            (questiongroup, key, tuple(ordered_values)) for
+            questiongroup, key, ordered_values in
+            get_ordered_filter_values(configuration))
+
+    def get_filter_data(self, data: dict) -> dict:
+        """
+        Return the values of all filter paths found in the (raw)
+        questionnaire data.
+        """
         filter_data = {}
-        for path, key, questiongroup in filter_paths:
+        for path, key, questiongroup in self.filter_paths:
             q_data = [
-                qg_data.get(key) for qg_data in obj.data.get(questiongroup, [])]
+                qg_data.get(key) for qg_data in data.get(questiongroup, [])]
             # Remove None values and add only if not empty.
             q_data = [v for v in q_data if v is not None]
             if q_data:
                 filter_data[path] = q_data
-        serialized['filter_data'] = filter_data
-
-        # Add ordered values to document data
-        for ordered_filter in get_ordered_filter_values(obj.configuration_object):
-            ordered_qg_data = serialized.get(
-                'data', {}).get(ordered_filter[0], [])
-
-            for ordered_data in ordered_qg_data:
-                values = ordered_data.get(ordered_filter[1], [])
-                values_order = [
-                    o[0] for o in ordered_filter[2] if o[1] in values]
-                ordered_data[f'{ordered_filter[1]}_order'] = values_order
-
-        action = {
-            '_index': alias,
-            '_type': 'questionnaire',
-            '_id': obj.id,
-            '_source': serialized,
-        }
-        actions.append(action)
+        return filter_data
 
-    actions_executed, errors = bulk(es, actions, **kwargs)
+    def add_ordered_values(self, data: dict):
+        """
+        Add the order of the selected values (as ``[key]_order``) to the
+        serialized questionnaire data, in place.
+        """
+        for questiongroup, key, ordered_values in self.ordered_filter_values:
+            for ordered_data in data.get(questiongroup, []):
+                values = ordered_data.get(key, [])
+                ordered_data[f'{key}_order'] = [
+                    o[0] for o in ordered_values if o[1] in values]
+
+
+# Index plans by configuration object. The configuration objects are cached
+# (see :func:`configuration.cache.get_configuration`), the plans are dropped
+# together with them.
+index_plans = weakref.WeakKeyDictionary()
 
-    es.indices.refresh(index=','.join(refresh_aliases))
-    return actions_executed, errors
+
+def get_index_plan(configuration: QuestionnaireConfiguration) -> IndexPlan:
+    """
+    Return the (cached) index plan of a configuration.
+    """
+    plan = index_plans.get(configuration)
+    if plan is None:
+        plan = IndexPlan(configuration)
+        index_plans[configuration] = plan
+    return plan
 
 
 def get_ordered_filter_values(configuration: QuestionnaireConfiguration) -> list:
@@ -384,14 +463,149 @@ def get_ordered_filter_values(configuration: QuestionnaireConfiguration) -> list
     return ordered_filter_values
 
 
-def put_all_data():
+def put_all_data(**kwargs):
     """
     Put data from all configurations to the es index.
+
+    .. seealso::
+        :func:`reindex_public_questionnaires`
+    """
+    return reindex_public_questionnaires(request_timeout=60, **kwargs)
+
+
+def reindex_public_questionnaires(
+        processes=None, chunk_size=100, checkpoint_path=None, **kwargs):
+    """
+    Put all public questionnaires to the es index.
+
+    The ids of the questionnaires are read (ordered) with a server-side
+    cursor and split into chunks. The chunks are serialized in a pool of
+    processes (each with its own configuration cache) and indexed with
+    ``streaming_bulk``. Only ``processes`` chunks are held in memory at any
+    time.
+
+    If a ``checkpoint_path`` is provided, the id of the last indexed
+    questionnaire is written to this file after each chunk, until a chunk
+    reports errors. If the file exists when starting, only the questionnaires
+    after this id are indexed, which allows to resume an interrupted (or
+    failed) run. The file is deleted when all questionnaires are indexed.
+
+    Args:
+        ``processes`` (int): The number of processes serializing the
+        questionnaires. Defaults to the number of CPUs.
+
+        ``chunk_size`` (int): The number of questionnaires per chunk.
+
+        ``checkpoint_path`` (str): The path of the checkpoint file.
+
+        ``**kwargs``: Passed to ``streaming_bulk``.
+
+    Returns:
+        ``int``. Count of objects created or updated.
+
+        ``list``. A list of errors occurred.
+    """
+    processes = processes or os.cpu_count() or 1
+    after_id = read_reindex_checkpoint(checkpoint_path)
+
+    indexed = 0
+    errors = []
+    refresh_aliases = set()
+
+    def index_chunks(pool, chunks):
+        nonlocal indexed
+        for questionnaire_ids, actions in zip(
+                chunks, pool.map(get_questionnaire_actions, chunks)):
+            for success, info in streaming_bulk(
+                    es, actions, chunk_size=chunk_size, raise_on_error=False,
+                    **kwargs):
+                if success:
+                    indexed += 1
+                else:
+                    errors.append(info)
+            refresh_aliases.update(action['_index'] for action in actions)
+            # The checkpoint is only advanced as long as all chunks were
+            # indexed without errors, so a resumed run retries failed chunks.
+            if not errors:
+                write_reindex_checkpoint(checkpoint_path, questionnaire_ids[-1])
+
+    # Database connections must not be shared with the forked processes, they
+    # open their own connections when needed.
+    connections.close_all()
+    with multiprocessing.Pool(processes=processes) as pool:
+        chunks = []
+        for questionnaire_ids in get_public_questionnaire_id_chunks(
+                chunk_size, after_id=after_id):
+            chunks.append(questionnaire_ids)
+            if len(chunks) == processes:
+                index_chunks(pool, chunks)
+                chunks = []
+        if chunks:
+            index_chunks(pool, chunks)
+
+    if refresh_aliases:
+        es.indices.refresh(index=','.join(refresh_aliases))
+    if checkpoint_path and not errors:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(checkpoint_path)
+    return indexed, errors
+
+
+def get_public_questionnaire_id_chunks(chunk_size: int, after_id=None):
+    """
+    Yield lists of (at most ``chunk_size``) ids of all public questionnaires,
+    ordered by id. The ids are read with a server-side cursor.
+    """
+    queryset = Questionnaire.with_status.public().order_by('id')
+    if after_id is not None:
+        queryset = queryset.filter(id__gt=after_id)
+    chunk = []
+    for questionnaire_id in queryset.values_list('id', flat=True).iterator():
+        chunk.append(questionnaire_id)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def get_questionnaire_actions(questionnaire_ids: list) -> list:
     """
-    put_questionnaire_data(
-        questionnaire_objects=Questionnaire.with_status.public(),
-        request_timeout=60
+    Return the bulk actions for a list of questionnaire ids. This is executed
+    in the processes of the pool of :func:`reindex_public_questionnaires`.
+    """
+    questionnaires = Questionnaire.objects.filter(
+        id__in=questionnaire_ids
+    ).select_related(
+        'configuration'
+    ).order_by(
+        'id'
     )
+    files_data = File.get_list_image_data(questionnaires)
+    return [
+        get_questionnaire_action(obj, files_data=files_data)
+        for obj in questionnaires]
+
+
+def read_reindex_checkpoint(checkpoint_path):
+    """
+    Return the id of the last indexed questionnaire of an interrupted run, or
+    None if there is no checkpoint.
+    """
+    if not checkpoint_path:
+        return None
+    try:
+        with open(checkpoint_path) as f:
+            return json.load(f).get('last_id')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def write_reindex_checkpoint(checkpoint_path, last_id: int):
+    if not checkpoint_path:
+        return
+    with open(checkpoint_path, 'w') as f:
+        json.dump({'last_id': last_id}, f)
 
 
 def delete_questionnaires_from_es(questionnaire_objects):
@@ -415,6 +629,170 @@ def delete_questionnaires_from_es(questionnaire_objects):
             pass
 
 
+# Number of failed attempts after which a queue entry is dropped.
+INDEX_QUEUE_MAX_ATTEMPTS = 5
+
+
+def queue_questionnaire_update(questionnaire_objects):
+    """
+    Queue Questionnaires to be (re-)indexed by the worker
+    (``process_es_queue``). The data of the questionnaires is read when the
+    queue is processed.
+
+    Args:
+        ``questionnaire_objects`` (list): A list (queryset) of
+        :class:`questionnaire.models.Questionnaire` objects to be indexed.
+    """
+    for questionnaire in questionnaire_objects:
+        queue_questionnaire_action(questionnaire, IndexQueueEntry.ACTION_INDEX)
+    process_index_queue_on_commit()
+
+
+def queue_questionnaire_deletion(questionnaire_objects):
+    """
+    Queue Questionnaires to be removed from the index by the worker
+    (``process_es_queue``).
+
+    Args:
+        ``questionnaire_objects`` (list): A list (queryset) of
+        :class:`questionnaire.models.Questionnaire` objects to be
+        removed.
+    """
+    for questionnaire in questionnaire_objects:
+        queue_questionnaire_action(questionnaire, IndexQueueEntry.ACTION_DELETE)
+    process_index_queue_on_commit()
+
+
+def queue_questionnaire_action(questionnaire: Questionnaire, action: str):
+    """
+    Add or update the queue entry of a questionnaire. Repeated changes of the
+    same questionnaire are coalesced into its entry, only the last action is
+    kept.
+    """
+    alias = get_alias(ElasticsearchAlias(
+        code=questionnaire.configuration.code,
+        edition=questionnaire.configuration.edition))
+    values = {'action': action, 'alias': alias}
+    updated = IndexQueueEntry.objects.filter(
+        questionnaire_id=questionnaire.id
+    ).update(version=F('version') + 1, **values)
+    if not updated:
+        entry, created = IndexQueueEntry.objects.get_or_create(
+            questionnaire_id=questionnaire.id, defaults=values)
+        if not created:
+            # Created concurrently in the meantime.
+            IndexQueueEntry.objects.filter(id=entry.id).update(
+                version=F('version') + 1, **values)
+
+
+def process_index_queue_on_commit():
+    """
+    Without queue workers (``USE_QUEUE_WORKERS``), process the queue when the
+    current transaction is committed. The queue is processed as a whole, so
+    the callback is only registered once per transaction.
+    """
+    if settings.USE_QUEUE_WORKERS:
+        return
+    connection = transaction.get_connection()
+    if any(func is process_index_queue
+           for __, func in connection.run_on_commit):
+        return
+    transaction.on_commit(process_index_queue)
+
+
+def process_index_queue(batch_size=500, **kwargs):
+    """
+    Apply all queued changes to the index. The entries are processed in
+    batches with one bulk request each, the touched indices are refreshed
+    once at the end.
+
+    Entries which are queued again while their batch is processed are kept
+    and processed in the next batch (or run). Entries which failed are kept
+    as well and retried in the next run, until they failed
+    ``INDEX_QUEUE_MAX_ATTEMPTS`` times.
+
+    Returns:
+        ``int``. The number of processed queue entries.
+
+        ``list``. A list of errors reported by elasticsearch.
+    """
+    processed = 0
+    all_errors = []
+    refresh_aliases = set()
+    last_id = 0
+    while True:
+        entries = list(IndexQueueEntry.objects.filter(
+            id__gt=last_id).order_by('id')[:batch_size])
+        if not entries:
+            break
+        last_id = entries[-1].id
+
+        actions = get_index_queue_actions(entries)
+        _, errors = bulk(es, actions, raise_on_error=False, **kwargs)
+        # Deleting a document which is not in the index is not an error.
+        errors = [
+            error for error in errors
+            if error.get('delete', {}).get('status') != 404]
+        all_errors.extend(errors)
+
+        failed_ids = {
+            str(item.get('_id')) for error in errors
+            for item in error.values()}
+        succeeded = [
+            entry for entry in entries
+            if str(entry.questionnaire_id) not in failed_ids]
+        failed = [
+            entry for entry in entries
+            if str(entry.questionnaire_id) in failed_ids]
+        if succeeded:
+            IndexQueueEntry.objects.filter(reduce(or_, [
+                Q(id=entry.id, version=entry.version) for entry in succeeded
+            ])).delete()
+        if failed:
+            failed_query = reduce(or_, [
+                Q(id=entry.id, version=entry.version) for entry in failed])
+            IndexQueueEntry.objects.filter(
+                failed_query,
+                attempts__gte=INDEX_QUEUE_MAX_ATTEMPTS - 1
+            ).delete()
+            IndexQueueEntry.objects.filter(failed_query).update(
+                attempts=F('attempts') + 1)
+        refresh_aliases.update([action['_index'] for action in actions])
+        processed += len(entries)
+
+    if refresh_aliases:
+        es.indices.refresh(index=','.join(refresh_aliases))
+    return processed, all_errors
+
+
+def get_index_queue_actions(entries: list) -> list:
+    """
+    Return the bulk actions of queue entries. Questionnaires to be indexed
+    which do not exist anymore are skipped.
+    """
+    index_ids = [
+        entry.questionnaire_id for entry in entries
+        if entry.action == IndexQueueEntry.ACTION_INDEX]
+    questionnaires = Questionnaire.objects.filter(
+        id__in=index_ids).select_related('configuration').in_bulk()
+
+    files_data = File.get_list_image_data(questionnaires.values())
+
+    actions = []
+    for entry in entries:
+        if entry.action == IndexQueueEntry.ACTION_DELETE:
+            actions.append({
+                '_op_type': 'delete',
+                '_index': entry.alias,
+                '_type': 'questionnaire',
+                '_id': entry.questionnaire_id,
+            })
+        elif entry.questionnaire_id in questionnaires:
+            actions.append(get_questionnaire_action(
+                questionnaires[entry.questionnaire_id], files_data=files_data))
+    return actions
+
+
 def delete_all_indices(prefix=settings.ES_INDEX_PREFIX):
     """
     Delete all the indices starting with the prefix as specified in the
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from search.index import process_index_queue
+
+
+class Command(BaseCommand):
+    """
+    Apply the queued changes of questionnaires to the indexes. Run it
+    periodically (e.g. with cron) or as a long running worker with
+    ``--interval``. Only run one worker at a time.
+    """
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            dest='batch_size',
+            help='Number of queue entries per bulk request.'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            dest='interval',
+            help='Keep running and process the queue every n seconds.'
+        )
+
+    def handle(self, **options):
+        while True:
+            processed, errors = process_index_queue(
+                batch_size=options['batch_size'])
+            if processed:
+                self.stdout.write(f'Processed {processed} queue entries.')
+            for error in errors:
+                self.stderr.write(str(error))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
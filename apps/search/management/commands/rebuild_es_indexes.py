@@ -1,3 +1,6 @@
+import os
+
+from django.conf import settings
 from django.core.management import call_command
 from django.core.management.base import BaseCommand
 
@@ -8,7 +11,49 @@ class Command(BaseCommand):
     """
     Delete, recreate and fill all indexes.
     """
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=None,
+            dest='processes',
+            help='Number of processes serializing the questionnaires. '
+                 'Defaults to the number of CPUs.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=100,
+            dest='chunk_size',
+            help='Number of questionnaires per chunk.'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            default=os.path.join(
+                settings.BASE_DIR, 'es_reindex_checkpoint.json'),
+            dest='checkpoint',
+            help='File storing the progress of the run.'
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            default=False,
+            dest='resume',
+            help='Resume an interrupted run: the indexes are not deleted and '
+                 'only questionnaires after the checkpoint are indexed.'
+        )
+
     def handle(self, **options):
-        delete_all_indices()
-        call_command('create_es_indexes')
-        put_all_data()
+        if not options['resume']:
+            delete_all_indices()
+            call_command('create_es_indexes')
+            if os.path.exists(options['checkpoint']):
+                os.unlink(options['checkpoint'])
+        indexed, errors = put_all_data(
+            processes=options['processes'],
+            chunk_size=options['chunk_size'],
+            checkpoint_path=options['checkpoint'],
+        )
+        self.stdout.write(f'Indexed {indexed} questionnaires.')
+        for error in errors:
+            self.stderr.write(str(error))
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.26 on 2026-10-17 09:12
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexQueueEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('questionnaire_id', models.IntegerField(unique=True)),
+                ('alias', models.CharField(max_length=255)),
+                ('action', models.CharField(choices=[('index', 'Index'), ('delete', 'Delete')], max_length=10)),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('queued', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
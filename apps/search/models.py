@@ -0,0 +1,32 @@
+from django.db import models
+
+
+class IndexQueueEntry(models.Model):
+    """
+    A pending change of a questionnaire in the search index. There is at most
+    one entry per questionnaire: queueing it again replaces the action and
+    increases the version, so an entry is only removed by the worker if it
+    did not change while it was processed. Entries which failed are retried,
+    ``attempts`` counts the failed attempts.
+
+    The queue is processed by the management command ``process_es_queue``.
+    """
+    ACTION_INDEX = 'index'
+    ACTION_DELETE = 'delete'
+    ACTIONS = (
+        (ACTION_INDEX, 'Index'),
+        (ACTION_DELETE, 'Delete'),
+    )
+
+    questionnaire_id = models.IntegerField(unique=True)
+    alias = models.CharField(max_length=255)
+    action = models.CharField(max_length=10, choices=ACTIONS)
+    version = models.PositiveIntegerField(default=1)
+    attempts = models.PositiveIntegerField(default=0)
+    queued = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f'{self.action}: {self.questionnaire_id}'
@@ -148,7 +148,8 @@ def get_es_query(
 def advanced_search(
         filter_params: list=None, query_string: str='',
         configuration_codes: list=None, limit: int=10,
-        offset: int=0, match_all: bool=True) -> dict:
+        offset: int=0, match_all: bool=True, facets: list=None,
+        search_after: list=None) -> dict:
     """
     Kwargs:
         ``filter_params`` (list): A list of filter parameters. Each
@@ -177,14 +178,52 @@ def advanced_search(
         If not all filters must be matched, the results are ordered by relevance
         to show hits matching more filters at the top. Defaults to False.
 
+        ``facets`` (list): An optional list of facets to count the values
+        of in the same request. Each facet is a tuple of questiongroup, key
+        and filter type. The counts can be read with
+        :func:`get_facet_counts`.
+
+        ``search_after`` (list): Use cursor based pagination: Return the hits
+        following the hit with these sort values (an empty list for the
+        first page). The sort is made stable with the id of the documents
+        as tiebreaker, the ``offset`` is ignored.
+
     Returns:
         ``dict``. The search results as returned by
         ``elasticsearch.Elasticsearch.search``.
+
+    Raises:
+        ``ValueError`` if the number of ``search_after`` values does not
+        match the sort of the query.
     """
     query = get_es_query(
         filter_params=filter_params, query_string=query_string,
         match_all=match_all)
 
+    if search_after is not None:
+        query['sort'].append({'_id': 'asc'})
+        if search_after:
+            if len(search_after) != len(query['sort']):
+                raise ValueError('The cursor does not match the sort.')
+            query['search_after'] = search_after
+        offset = 0
+
+    if facets:
+        # The facets are counted independently of the query of the hits (each
+        # one without its own filter), hence the global aggregation.
+        query['aggs'] = {
+            'facets': {
+                'global': {},
+                'aggs': {
+                    f'{questiongroup}__{key}': get_facet_aggregation(
+                        questiongroup, key, filter_type,
+                        filter_params=filter_params,
+                        query_string=query_string, match_all=match_all)
+                    for questiongroup, key, filter_type in facets
+                },
+            }
+        }
+
     if configuration_codes is None:
         configuration_codes = []
 
@@ -200,16 +239,40 @@ def get_aggregated_values(
     if filter_params is None:
         filter_params = []
 
-    # Remove the filter_param with the current questiongroup and key from the
-    # list of filter_params
-    relevant_filter_params = [
+    query = get_es_query(
+        filter_params=get_facet_filter_params(
+            questiongroup, key, filter_params),
+        query_string=query_string, match_all=match_all)
+
+    query.update({
+        'aggs': {
+            'values': get_terms_aggregation(questiongroup, key, filter_type),
+        },
+        'size': 0,  # Do not include the actual hits
+    })
+
+    alias = get_alias(*ElasticsearchAlias.from_code_list(*configuration_codes))
+    es_query = es.search(index=alias, body=query)
+
+    buckets = es_query.get(
+        'aggregations', {}).get('values', {}).get('buckets', [])
+
+    return {b.get('key'): b.get('doc_count') for b in buckets}
+
+
+def get_facet_filter_params(
+        questiongroup: str, key: str, filter_params: list) -> list:
+    """
+    Remove the filter_param with the current questiongroup and key from the
+    list of filter_params
+    """
+    return [
         f for f in filter_params if
         f.questiongroup != questiongroup and f.key != key]
 
-    query = get_es_query(
-        filter_params=relevant_filter_params, query_string=query_string,
-        match_all=match_all)
 
+def get_terms_aggregation(
+        questiongroup: str, key: str, filter_type: str) -> dict:
     # For text values, use the keyword. This does not work for integer values
     # (the way boolean values are stored).
     # https://www.elastic.co/guide/en/elasticsearch/reference/current/fielddata.html
@@ -218,25 +281,49 @@ def get_aggregated_values(
     else:
         field = f'filter_data.{questiongroup}__{key}.keyword'
 
-    query.update({
+    return {
+        'terms': {
+            'field': field,
+            # Limit needs to be high enough to include all values.
+            'size': 1000,
+        }
+    }
+
+
+def get_facet_aggregation(
+        questiongroup: str, key: str, filter_type: str,
+        filter_params: list=None, query_string: str='',
+        match_all: bool=True) -> dict:
+    """
+    Return the aggregation counting the values of a facet. The documents are
+    filtered with the same query as :func:`get_aggregated_values` uses.
+    """
+    query = get_es_query(
+        filter_params=get_facet_filter_params(
+            questiongroup, key, filter_params or []),
+        query_string=query_string, match_all=match_all)
+    return {
+        'filter': query['query'],
         'aggs': {
-            'values': {
-                'terms': {
-                    'field': field,
-                    # Limit needs to be high enough to include all values.
-                    'size': 1000,
-                }
-            }
+            'values': get_terms_aggregation(questiongroup, key, filter_type),
         },
-        'size': 0,  # Do not include the actual hits
-    })
-
-    alias = get_alias(*ElasticsearchAlias.from_code_list(*configuration_codes))
-    es_query = es.search(index=alias, body=query)
+    }
 
-    buckets = es_query.get('aggregations', {}).get('values', {}).get('buckets', [])
 
-    return {b.get('key'): b.get('doc_count') for b in buckets}
+def get_facet_counts(es_results: dict) -> dict:
+    """
+    Return the counted values of the facets of a search (see
+    :func:`advanced_search`) by path of the facet (``[questiongroup]__[key]``).
+    """
+    facets = es_results.get('aggregations', {}).get('facets', {})
+    return {
+        path: {
+            b.get('key'): b.get('doc_count')
+            for b in aggregation.get('values', {}).get('buckets', [])
+        }
+        for path, aggregation in facets.items()
+        if isinstance(aggregation, dict) and 'values' in aggregation
+    }
 
 
 def get_element(questionnaire: Questionnaire) -> dict:
@@ -1,26 +1,41 @@
+import os
+import tempfile
 import uuid
 import logging
 
 import pytest
 from django.conf import settings
+from django.db import transaction
 from django.test.utils import override_settings
 from elasticsearch import RequestError
 from unittest.mock import patch, Mock
 
 from configuration.cache import get_configuration
-from configuration.configuration import QuestionnaireConfiguration
+from configuration.configuration import FilterKey, QuestionnaireConfiguration
 from qcat.tests import TestCase
 from questionnaire.models import Questionnaire
 from questionnaire.serializers import QuestionnaireSerializer
 from questionnaire.tests.test_models import get_valid_questionnaire
+from search.models import IndexQueueEntry
 from search.index import (
+    INDEX_QUEUE_MAX_ATTEMPTS,
     create_or_update_index,
     delete_all_indices,
     delete_questionnaires_from_es,
     delete_single_index,
     get_elasticsearch,
+    get_index_plan,
     get_mappings,
+    get_public_questionnaire_id_chunks,
+    get_questionnaire_actions,
+    index_plans,
+    process_index_queue,
     put_questionnaire_data,
+    queue_questionnaire_deletion,
+    queue_questionnaire_update,
+    read_reindex_checkpoint,
+    reindex_public_questionnaires,
+    write_reindex_checkpoint,
 )
 
 # Prevent logging of Elasticsearch queries
@@ -317,6 +332,9 @@ class PutQuestionnaireDataTest(TestCase):
         'sample',
     ]
 
+    def setUp(self):
+        index_plans.clear()
+
     @patch('search.index.bulk')
     @patch('search.index.es')
     @patch('search.index.get_alias')
@@ -359,6 +377,217 @@ class PutQuestionnaireDataTest(TestCase):
         self.assertEqual(errors, 'bar')
 
 
+class IndexPlanTest(TestCase):
+
+    def setUp(self):
+        index_plans.clear()
+        self.value_objects = [
+            Mock(order_value=2, keyword='value_2'),
+            Mock(order_value=1, keyword='value_1'),
+        ]
+        self.configuration = Mock(keyword='sample', edition='2015')
+        self.configuration.get_filter_keys.return_value = [
+            FilterKey(
+                path='qg_1__key_1', label='', order=0, key='key_1',
+                questiongroup='qg_1', filter_type='checkbox',
+                section_label=''),
+        ]
+        self.configuration.get_question_by_keyword.return_value = Mock(
+            value_objects=self.value_objects)
+
+    @override_settings(QUESTIONNAIRE_GLOBAL_FILTER_PATHS=[])
+    def test_plan_is_cached(self):
+        plan = get_index_plan(self.configuration)
+        self.assertIs(get_index_plan(self.configuration), plan)
+        self.assertEqual(
+            self.configuration.get_question_by_keyword.call_count, 1)
+
+    @override_settings(QUESTIONNAIRE_GLOBAL_FILTER_PATHS=[('qg_2', 'key_2')])
+    def test_filter_data(self):
+        plan = get_index_plan(self.configuration)
+        data = {
+            'qg_1': [{'key_1': ['value_1']}, {'key_1': None}],
+            'qg_2': [{'key_3': 'foo'}],
+        }
+        self.assertEqual(
+            plan.get_filter_data(data), {'qg_1__key_1': [['value_1']]})
+
+    @override_settings(QUESTIONNAIRE_GLOBAL_FILTER_PATHS=[])
+    def test_add_ordered_values(self):
+        plan = get_index_plan(self.configuration)
+        data = {'qg_1': [{'key_1': ['value_2', 'value_1']}]}
+        plan.add_ordered_values(data)
+        self.assertEqual(data['qg_1'][0]['key_1_order'], [1, 2])
+
+
+class IndexQueueTest(TestCase):
+
+    fixtures = [
+        'sample_global_key_values',
+        'sample',
+        'sample_questionnaires',
+    ]
+
+    def setUp(self):
+        self.questionnaire = Questionnaire.objects.get(pk=1)
+
+    def test_queue_coalesces_entries(self):
+        queue_questionnaire_update([self.questionnaire])
+        queue_questionnaire_deletion([self.questionnaire])
+        entry = IndexQueueEntry.objects.get()
+        self.assertEqual(entry.questionnaire_id, self.questionnaire.id)
+        self.assertEqual(entry.action, IndexQueueEntry.ACTION_DELETE)
+        self.assertEqual(entry.version, 2)
+
+    @override_settings(USE_QUEUE_WORKERS=False)
+    @patch('search.index.transaction.on_commit')
+    def test_queue_is_processed_on_commit_without_workers(
+            self, mock_on_commit):
+        queue_questionnaire_update([self.questionnaire])
+        mock_on_commit.assert_called_once_with(process_index_queue)
+
+    @override_settings(USE_QUEUE_WORKERS=False)
+    def test_queue_is_processed_once_per_transaction(self):
+        run_on_commit = transaction.get_connection().run_on_commit
+        registered = len(run_on_commit)
+        queue_questionnaire_update(Questionnaire.objects.filter(pk__in=[1, 2]))
+        queue_questionnaire_deletion([self.questionnaire])
+        self.assertEqual(len(run_on_commit), registered + 1)
+
+    @override_settings(USE_QUEUE_WORKERS=True)
+    @patch('search.index.transaction.on_commit')
+    def test_queue_is_left_to_workers(self, mock_on_commit):
+        queue_questionnaire_update([self.questionnaire])
+        mock_on_commit.assert_not_called()
+
+    @patch('search.index.es')
+    @patch('search.index.bulk')
+    def test_process_queue(self, mock_bulk, mock_es):
+        mock_bulk.return_value = 1, []
+        queue_questionnaire_update([self.questionnaire])
+        queue_questionnaire_deletion(Questionnaire.objects.filter(pk=2))
+        processed, errors = process_index_queue()
+        self.assertEqual(processed, 2)
+        self.assertEqual(errors, [])
+        actions = mock_bulk.call_args[0][1]
+        self.assertEqual(
+            [(a['_id'], a.get('_op_type')) for a in actions],
+            [(1, None), (2, 'delete')])
+        mock_es.indices.refresh.assert_called_once_with(
+            index=f'{settings.ES_INDEX_PREFIX}sample_2015')
+        self.assertFalse(IndexQueueEntry.objects.exists())
+
+    @patch('search.index.es')
+    @patch('search.index.bulk')
+    def test_process_queue_ignores_missing_documents(self, mock_bulk, mock_es):
+        mock_bulk.return_value = 0, [{'delete': {'status': 404}}]
+        queue_questionnaire_deletion([self.questionnaire])
+        processed, errors = process_index_queue()
+        self.assertEqual(errors, [])
+
+    @patch('search.index.es')
+    @patch('search.index.bulk')
+    def test_process_queue_keeps_failed_entries(self, mock_bulk, mock_es):
+        mock_bulk.return_value = 1, [
+            {'index': {'_id': '1', 'status': 400, 'error': 'foo'}}]
+        queue_questionnaire_update(Questionnaire.objects.filter(pk__in=[1, 2]))
+        processed, errors = process_index_queue()
+        self.assertEqual(len(errors), 1)
+        entry = IndexQueueEntry.objects.get()
+        self.assertEqual(entry.questionnaire_id, 1)
+        self.assertEqual(entry.attempts, 1)
+
+    @patch('search.index.es')
+    @patch('search.index.bulk')
+    def test_process_queue_drops_entries_after_max_attempts(
+            self, mock_bulk, mock_es):
+        mock_bulk.return_value = 0, [
+            {'index': {'_id': '1', 'status': 400, 'error': 'foo'}}]
+        queue_questionnaire_update([self.questionnaire])
+        IndexQueueEntry.objects.update(attempts=INDEX_QUEUE_MAX_ATTEMPTS - 1)
+        process_index_queue()
+        self.assertFalse(IndexQueueEntry.objects.exists())
+
+    @patch('search.index.es')
+    @patch('search.index.bulk')
+    def test_process_queue_keeps_requeued_entries(self, mock_bulk, mock_es):
+        def requeue(*args, **kwargs):
+            queue_questionnaire_update([self.questionnaire])
+            return 1, []
+        mock_bulk.side_effect = requeue
+        queue_questionnaire_update([self.questionnaire])
+        process_index_queue(batch_size=1)
+        self.assertEqual(IndexQueueEntry.objects.count(), 1)
+
+    @patch('search.index.es')
+    @patch('search.index.bulk')
+    def test_process_empty_queue(self, mock_bulk, mock_es):
+        self.assertEqual(process_index_queue(), (0, []))
+        mock_bulk.assert_not_called()
+        mock_es.indices.refresh.assert_not_called()
+
+
+class ReindexPublicQuestionnairesTest(TestCase):
+
+    fixtures = [
+        'sample_global_key_values',
+        'sample',
+        'sample_questionnaires',
+    ]
+
+    def test_id_chunks(self):
+        ids = list(Questionnaire.with_status.public().order_by(
+            'id').values_list('id', flat=True))
+        chunks = list(get_public_questionnaire_id_chunks(1))
+        self.assertEqual(chunks, [[i] for i in ids])
+
+    def test_id_chunks_after_id(self):
+        ids = list(Questionnaire.with_status.public().order_by(
+            'id').values_list('id', flat=True))
+        chunks = list(get_public_questionnaire_id_chunks(10, after_id=ids[0]))
+        self.assertEqual(chunks, [ids[1:]])
+
+    @patch('search.index.get_questionnaire_action')
+    def test_get_questionnaire_actions(self, mock_action):
+        ids = list(Questionnaire.with_status.public().values_list(
+            'id', flat=True))
+        actions = get_questionnaire_actions(ids)
+        self.assertEqual(len(actions), len(ids))
+
+    def test_checkpoint(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'checkpoint.json')
+            self.assertIsNone(read_reindex_checkpoint(path))
+            write_reindex_checkpoint(path, 5)
+            self.assertEqual(read_reindex_checkpoint(path), 5)
+
+    def test_checkpoint_without_path(self):
+        write_reindex_checkpoint(None, 5)
+        self.assertIsNone(read_reindex_checkpoint(None))
+
+    @patch('search.index.es')
+    @patch('search.index.connections')
+    @patch('search.index.multiprocessing.Pool')
+    @patch('search.index.get_public_questionnaire_id_chunks')
+    @patch('search.index.streaming_bulk')
+    def test_checkpoint_is_not_advanced_after_errors(
+            self, mock_bulk, mock_chunks, mock_pool, mock_connections,
+            mock_es):
+        mock_pool.return_value.__enter__.return_value.map.side_effect = \
+            lambda func, chunks: [[{'_index': 'foo'}] for __ in chunks]
+        mock_chunks.return_value = iter([[1], [2], [3]])
+        mock_bulk.side_effect = [
+            iter([(True, {})]), iter([(False, {'error': 'foo'})]),
+            iter([(True, {})])]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'checkpoint.json')
+            indexed, errors = reindex_public_questionnaires(
+                processes=1, checkpoint_path=path)
+            self.assertEqual(indexed, 2)
+            self.assertEqual(errors, [{'error': 'foo'}])
+            self.assertEqual(read_reindex_checkpoint(path), 1)
+
+
 @pytest.mark.usefixtures('es')
 class DeleteQuestionnairesFromEsTest(TestCase):
     def setUp(self):
@@ -1,7 +1,11 @@
+import collections
 from unittest.mock import patch
 
 from qcat.tests import TestCase
-from search.search import advanced_search
+from search.search import advanced_search, get_facet_counts
+
+FilterParam = collections.namedtuple(
+    'FilterParam', ['questiongroup', 'key', 'values', 'operator', 'type'])
 
 
 TEST_INDEX_PREFIX = 'qcat_test_prefix_'
@@ -47,3 +51,77 @@ class AdvancedSearchTest(TestCase):
     def test_returns_search(self, mock_es):
         ret = advanced_search(filter_params=[])
         self.assertEqual(ret, mock_es.search())
+
+    @patch('search.search.get_alias')
+    @patch('search.search.es')
+    def test_facets_exclude_own_filter(self, mock_es, mock_get_alias):
+        filter_params = [
+            FilterParam('qg_11', 'key_14', ['value_14_1'], 'eq', 'checkbox'),
+            FilterParam('qg_35', 'key_48', ['value_48_1'], 'eq', 'radio'),
+        ]
+        advanced_search(
+            filter_params=filter_params,
+            facets=[('qg_11', 'key_14', 'checkbox')])
+        body = mock_es.search.call_args[1]['body']
+        self.assertEqual(len(body['query']['bool']['must']), 2)
+        facets = body['aggs']['facets']
+        self.assertEqual(facets['global'], {})
+        facet = facets['aggs']['qg_11__key_14']
+        self.assertEqual(facet['filter'], {'bool': {'must': [
+            {'terms': {'filter_data.qg_35__key_48': ['value_48_1']}}]}})
+        self.assertEqual(
+            facet['aggs']['values']['terms']['field'],
+            'filter_data.qg_11__key_14.keyword')
+
+    @patch('search.search.es')
+    def test_search_without_facets(self, mock_es):
+        advanced_search(filter_params=[])
+        self.assertNotIn('aggs', mock_es.search.call_args[1]['body'])
+
+    @patch('search.search.get_alias')
+    @patch('search.search.es')
+    def test_search_after(self, mock_es, mock_get_alias):
+        advanced_search(
+            filter_params=[], offset=20, search_after=['CH', 1.0, '5'])
+        mock_es.search.assert_called_once_with(
+            index=mock_get_alias.return_value,
+            body={
+                'query': {'bool': {'must': []}},
+                'sort': [
+                    {'list_data.country.keyword': {'order': 'asc'}}, '_score',
+                    {'_id': 'asc'}],
+                'search_after': ['CH', 1.0, '5']},
+            size=10, from_=0)
+
+    @patch('search.search.es')
+    def test_search_after_not_matching_sort(self, mock_es):
+        with self.assertRaises(ValueError):
+            advanced_search(filter_params=[], search_after=['CH', '5'])
+        mock_es.search.assert_not_called()
+
+    @patch('search.search.es')
+    def test_search_after_first_page(self, mock_es):
+        advanced_search(filter_params=[], search_after=[])
+        body = mock_es.search.call_args[1]['body']
+        self.assertNotIn('search_after', body)
+        self.assertEqual(body['sort'][-1], {'_id': 'asc'})
+
+
+class GetFacetCountsTest(TestCase):
+
+    def test_returns_counts_by_path(self):
+        es_results = {'aggregations': {'facets': {
+            'doc_count': 5,
+            'qg_11__key_14': {
+                'doc_count': 3,
+                'values': {'buckets': [
+                    {'key': 'value_14_1', 'doc_count': 2},
+                    {'key': 'value_14_2', 'doc_count': 1},
+                ]},
+            },
+        }}}
+        self.assertEqual(get_facet_counts(es_results), {
+            'qg_11__key_14': {'value_14_1': 2, 'value_14_2': 1}})
+
+    def test_returns_empty_dict_without_aggregations(self):
+        self.assertEqual(get_facet_counts({}), {})
@@ -9,6 +9,8 @@ from search.utils import (
     get_alias,
     get_analyzer,
     check_connection,
+    decode_cursor,
+    encode_cursor,
     force_strings)
 
 
@@ -115,3 +117,20 @@ class ForceStringsTest(TestCase):
     def test_multi_level(self):
         multi_level = force_strings(self.multi_level)
         self.assertIsInstance(multi_level['a']['b']['c'], str)
+
+
+class CursorTest(TestCase):
+
+    def test_encode_decode(self):
+        sort_values = ['CH', 1.0, '5']
+        self.assertEqual(decode_cursor(encode_cursor(sort_values)), sort_values)
+
+    def test_cursor_is_url_safe(self):
+        cursor = encode_cursor(['???>>>'])
+        self.assertRegex(cursor, r'^[A-Za-z0-9_-]+$')
+
+    def test_decode_invalid_cursor(self):
+        for cursor in ['foo', encode_cursor({'foo': 'bar'}),
+                       encode_cursor(['CH', {'foo': 'bar'}])]:
+            with self.assertRaises(ValueError):
+                decode_cursor(cursor)
@@ -1,3 +1,7 @@
+import base64
+import binascii
+import json
+
 from django.conf import settings
 from elasticsearch import TransportError
 
@@ -115,6 +119,34 @@ def force_strings(serialized):
     return serialized
 
 
+def encode_cursor(sort_values: list) -> str:
+    """
+    Return an opaque cursor token for the sort values of the last hit of a
+    page. The token is passed as ``search_after`` to get the next page.
+    """
+    data = json.dumps(sort_values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> list:
+    """
+    Return the sort values of a cursor token (see :func:`encode_cursor`).
+
+    Raises:
+        ``ValueError`` if the cursor is not valid.
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        sort_values = json.loads(data.decode('utf-8'))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError(f'Invalid cursor: {cursor}')
+    if not isinstance(sort_values, list) or not all(
+            value is None or isinstance(value, (str, int, float))
+            for value in sort_values):
+        raise ValueError(f'Invalid cursor: {cursor}')
+    return sort_values
+
+
 def check_aliases(aliases):
     """
     Check if a list of strings contains only valid aliases.
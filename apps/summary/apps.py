@@ -9,6 +9,7 @@ class SummaryConfig(AppConfig):
     name = 'summary'
 
     def ready(self):
+        from . import receivers  # noqa
         self.css_file_hash = self.get_css_hash()
 
     def get_css_hash(self):
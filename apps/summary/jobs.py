@@ -0,0 +1,63 @@
+"""
+Queue of summaries to be rendered in advance. When a questionnaire is
+published, its summary is queued in all languages. The management command
+``process_summary_queue`` renders them to the cache (see
+:mod:`summary.pdf_cache`), so the first download does not have to wait for
+wkhtmltopdf.
+"""
+import logging
+
+from django.conf import settings
+
+from questionnaire.models import Questionnaire
+from .models import SummaryJob
+from .views import has_summary, render_summary
+
+logger = logging.getLogger(__name__)
+
+
+def queue_summaries(questionnaire: Questionnaire) -> int:
+    """
+    Queue the summary of a questionnaire in all languages. Nothing is queued
+    if there is no summary for the configuration of the questionnaire, or if
+    there are no queue workers (``USE_QUEUE_WORKERS``): the summary is then
+    rendered on its first download.
+
+    Returns:
+        ``int``. The number of queued jobs.
+    """
+    if not settings.USE_QUEUE_WORKERS or not has_summary(questionnaire):
+        return 0
+    for language, __ in settings.LANGUAGES:
+        SummaryJob.objects.get_or_create(
+            questionnaire_id=questionnaire.id, language=language)
+    return len(settings.LANGUAGES)
+
+
+def process_summary_queue(batch_size=20) -> tuple:
+    """
+    Render all queued summaries. Jobs are removed once they were processed,
+    also if the rendering failed (the summary is then rendered on the first
+    download).
+
+    Returns:
+        ``int``. The number of rendered summaries.
+
+        ``list``. A list of errors occurred.
+    """
+    rendered, errors = 0, []
+    last_id = 0
+    while True:
+        jobs = list(SummaryJob.objects.filter(id__gt=last_id)[:batch_size])
+        if not jobs:
+            break
+        last_id = jobs[-1].id
+        for job in jobs:
+            try:
+                if render_summary(job.questionnaire_id, job.language):
+                    rendered += 1
+            except Exception as e:
+                logger.exception(f'Cannot render summary {job}')
+                errors.append(f'{job}: {e}')
+            job.delete()
+    return rendered, errors
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from summary.pdf_cache import evict_cached_pdfs
+
+
+class Command(BaseCommand):
+    """
+    Remove rendered summaries from the cache, least recently used first, until
+    the cache is smaller than ``SUMMARY_PDF_CACHE_SIZE``. Run it periodically
+    (e.g. with cron).
+    """
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-size',
+            type=int,
+            default=None,
+            dest='max_size',
+            help='Maximum size of the cache in MB (default: '
+                 'SUMMARY_PDF_CACHE_SIZE).'
+        )
+        parser.add_argument(
+            '--max-age',
+            type=int,
+            default=None,
+            dest='max_age',
+            help='Also remove summaries not used during the last n days.'
+        )
+
+    def handle(self, **options):
+        max_size = options['max_size']
+        if max_size is None:
+            max_size = settings.SUMMARY_PDF_CACHE_SIZE
+        max_age = options['max_age']
+        removed, freed = evict_cached_pdfs(
+            max_size=max_size * 1024 * 1024,
+            max_age=max_age * 24 * 60 * 60 if max_age is not None else None)
+        self.stdout.write(
+            f'Removed {removed} summaries ({freed // (1024 * 1024)} MB).')
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from summary.jobs import process_summary_queue
+
+
+class Command(BaseCommand):
+    """
+    Render the summaries of newly published questionnaires in advance. Run it
+    periodically (e.g. with cron) or as a long running worker with
+    ``--interval``.
+    """
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=20,
+            dest='batch_size',
+            help='Number of jobs fetched at once.'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            dest='interval',
+            help='Keep running and process the queue every n seconds.'
+        )
+
+    def handle(self, **options):
+        while True:
+            rendered, errors = process_summary_queue(
+                batch_size=options['batch_size'])
+            if rendered:
+                self.stdout.write(f'Rendered {rendered} summaries.')
+            for error in errors:
+                self.stderr.write(str(error))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -1,3 +1,22 @@
 from django.db import models
 
-# Create your models here.
+
+class SummaryJob(models.Model):
+    """
+    A summary of a public questionnaire to be rendered in advance, before it
+    is downloaded for the first time. There is at most one job per
+    questionnaire and language.
+
+    The jobs are processed by the management command
+    ``process_summary_queue``.
+    """
+    questionnaire_id = models.IntegerField()
+    language = models.CharField(max_length=10)
+    queued = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['id']
+        unique_together = ('questionnaire_id', 'language')
+
+    def __str__(self):
+        return f'{self.questionnaire_id} ({self.language})'
@@ -0,0 +1,157 @@
+"""
+Disk cache of the rendered summaries (PDF) in ``SUMMARY_PDF_PATH``.
+
+Rendering a summary with wkhtmltopdf takes several seconds. The file name of
+a summary is specific enough to be used as cache key (see
+:func:`summary.views.SummaryPDFCreateView.get_filename`), so each file is
+rendered only once. A lock file per summary makes sure concurrent requests
+wait for a single render instead of rendering the same file at once.
+
+The modification time of a file is updated whenever it is read, the cache is
+therefore evicted least recently used first (see the management command
+``clean_summary_pdfs``).
+"""
+import contextlib
+import fcntl
+import glob
+import os
+import tempfile
+import time
+
+from django.conf import settings
+
+
+def read_cached_pdf(file_path: str):
+    """
+    Return the content of a cached summary (and mark it as used), or None if
+    it is not available.
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            content = f.read()
+    except OSError:
+        return None
+    if not content:
+        return None
+    with contextlib.suppress(OSError):
+        os.utime(file_path)
+    return content
+
+
+def write_cached_pdf(file_path: str, content: bytes):
+    """
+    Write a rendered summary. The file is written to a temporary file first
+    and then moved, so other processes never read a partially written file.
+    """
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(file_path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, file_path)
+    except OSError:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+
+
+@contextlib.contextmanager
+def render_lock(file_path: str, timeout=None):
+    """
+    Hold the (exclusive) render lock of a summary. If another process holds
+    the lock, wait until it is released, but at most ``timeout`` seconds
+    (default: ``SUMMARY_PDF_LOCK_TIMEOUT``). After the timeout or if the lock
+    file cannot be opened, continue without the lock: worst case, the summary
+    is rendered twice.
+    """
+    if timeout is None:
+        timeout = settings.SUMMARY_PDF_LOCK_TIMEOUT
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        lock_file = open(f'{file_path}.lock', 'a')
+    except OSError:
+        yield False
+        return
+
+    with lock_file:
+        is_locked = False
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                is_locked = True
+                break
+            except OSError:
+                if time.monotonic() >= deadline:
+                    break
+                time.sleep(0.2)
+        try:
+            yield is_locked
+        finally:
+            if is_locked:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def evict_cached_pdfs(max_size: int, max_age=None, path=None) -> tuple:
+    """
+    Remove cached summaries, least recently used first, until their total
+    size is below ``max_size``. Summaries not used during the last
+    ``max_age`` seconds are removed in any case. Lock files of removed
+    summaries are removed if they are not currently held.
+
+    Args:
+        ``max_size`` (int): The maximum size of all summaries in bytes.
+
+    Kwargs:
+        ``max_age`` (int): The maximum age (since the last use) in seconds.
+
+        ``path`` (str): The directory of the cache, defaults to
+        ``SUMMARY_PDF_PATH``.
+
+    Returns:
+        ``int``. The number of removed summaries.
+
+        ``int``. The number of freed bytes.
+    """
+    path = path or settings.SUMMARY_PDF_PATH
+    files = []
+    for file_path in glob.glob(os.path.join(path, '*.pdf')):
+        with contextlib.suppress(OSError):
+            stat = os.stat(file_path)
+            files.append((stat.st_mtime, stat.st_size, file_path))
+    files.sort()
+
+    total_size = sum(size for __, size, __ in files)
+    oldest_allowed = time.time() - max_age if max_age is not None else None
+
+    removed, freed = 0, 0
+    for mtime, size, file_path in files:
+        is_expired = oldest_allowed is not None and mtime < oldest_allowed
+        if total_size <= max_size and not is_expired:
+            continue
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(file_path)
+            removed += 1
+            freed += size
+        total_size -= size
+        remove_unused_lock(file_path)
+    return removed, freed
+
+
+def remove_unused_lock(file_path: str):
+    """
+    Remove the lock file of a summary, unless it is held by a process.
+    """
+    lock_path = f'{file_path}.lock'
+    try:
+        lock_file = open(lock_path, 'a')
+    except OSError:
+        return
+    with lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return
+        with contextlib.suppress(OSError):
+            os.unlink(lock_path)
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -0,0 +1,15 @@
+from django.dispatch import receiver
+
+from accounts.models import User
+from questionnaire.conf import settings
+from questionnaire.models import Questionnaire
+from questionnaire import signals
+
+from .jobs import queue_summaries
+
+
+@receiver(signals.change_status)
+def queue_published_summaries(
+        sender: int, questionnaire: Questionnaire, user: User, **kwargs):
+    if questionnaire.status == settings.QUESTIONNAIRE_PUBLIC:
+        queue_summaries(questionnaire)
@@ -0,0 +1,52 @@
+from unittest.mock import patch, MagicMock
+
+from django.conf import settings
+from django.test.utils import override_settings
+
+from qcat.tests import TestCase
+from summary.jobs import process_summary_queue, queue_summaries
+from summary.models import SummaryJob
+
+
+class SummaryJobTest(TestCase):
+
+    def get_questionnaire(self, code='technologies', edition='2018'):
+        return MagicMock(
+            id=1, configuration=MagicMock(code=code, edition=edition))
+
+    @override_settings(USE_QUEUE_WORKERS=True)
+    def test_queue_summaries_all_languages(self):
+        queued = queue_summaries(self.get_questionnaire())
+        self.assertEqual(queued, len(settings.LANGUAGES))
+        self.assertEqual(
+            sorted(SummaryJob.objects.values_list('language', flat=True)),
+            sorted(language for language, __ in settings.LANGUAGES))
+
+    @override_settings(USE_QUEUE_WORKERS=True)
+    def test_queue_summaries_once(self):
+        queue_summaries(self.get_questionnaire())
+        queue_summaries(self.get_questionnaire())
+        self.assertEqual(SummaryJob.objects.count(), len(settings.LANGUAGES))
+
+    @override_settings(USE_QUEUE_WORKERS=True)
+    def test_queue_summaries_without_summary(self):
+        self.assertEqual(queue_summaries(self.get_questionnaire(code='foo')), 0)
+        self.assertFalse(SummaryJob.objects.exists())
+
+    @override_settings(USE_QUEUE_WORKERS=False)
+    def test_queue_summaries_without_workers(self):
+        self.assertEqual(queue_summaries(self.get_questionnaire()), 0)
+        self.assertFalse(SummaryJob.objects.exists())
+
+    @patch('summary.jobs.render_summary')
+    def test_process_summary_queue(self, mock_render_summary):
+        SummaryJob.objects.create(questionnaire_id=1, language='en')
+        SummaryJob.objects.create(questionnaire_id=1, language='es')
+        SummaryJob.objects.create(questionnaire_id=2, language='en')
+        mock_render_summary.side_effect = [True, False, Exception('foo')]
+        rendered, errors = process_summary_queue(batch_size=2)
+        self.assertEqual(rendered, 1)
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(mock_render_summary.call_count, 3)
+        mock_render_summary.assert_any_call(1, 'es')
+        self.assertFalse(SummaryJob.objects.exists())
@@ -0,0 +1,89 @@
+import fcntl
+import os
+import tempfile
+import time
+
+from django.test import override_settings
+
+from qcat.tests import TestCase
+from summary.pdf_cache import (
+    evict_cached_pdfs,
+    read_cached_pdf,
+    render_lock,
+    write_cached_pdf,
+)
+
+
+class PDFCacheTest(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = self.tmp_dir.name
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write_pdf(self, name, size, age):
+        file_path = os.path.join(self.path, name)
+        write_cached_pdf(file_path, b'x' * size)
+        mtime = time.time() - age
+        os.utime(file_path, (mtime, mtime))
+        return file_path
+
+    def test_read_missing_returns_none(self):
+        self.assertIsNone(read_cached_pdf(os.path.join(self.path, 'foo.pdf')))
+
+    def test_write_and_read(self):
+        file_path = os.path.join(self.path, 'sub', 'foo.pdf')
+        write_cached_pdf(file_path, b'pdf')
+        self.assertEqual(read_cached_pdf(file_path), b'pdf')
+
+    def test_read_marks_as_used(self):
+        file_path = self.write_pdf('foo.pdf', 1, 3600)
+        read_cached_pdf(file_path)
+        self.assertGreater(os.stat(file_path).st_mtime, time.time() - 60)
+
+    def test_render_lock(self):
+        file_path = os.path.join(self.path, 'foo.pdf')
+        with render_lock(file_path) as is_locked:
+            self.assertTrue(is_locked)
+            with open(f'{file_path}.lock', 'a') as f:
+                with self.assertRaises(OSError):
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def test_render_lock_timeout(self):
+        file_path = os.path.join(self.path, 'foo.pdf')
+        with render_lock(file_path):
+            with render_lock(file_path, timeout=0) as is_locked:
+                self.assertFalse(is_locked)
+
+    def test_evict_least_recently_used(self):
+        old = self.write_pdf('old.pdf', 10, 300)
+        recent = self.write_pdf('recent.pdf', 10, 100)
+        new = self.write_pdf('new.pdf', 10, 0)
+        removed, freed = evict_cached_pdfs(max_size=20, path=self.path)
+        self.assertEqual((removed, freed), (1, 10))
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.exists(recent))
+        self.assertTrue(os.path.exists(new))
+
+    def test_evict_max_age(self):
+        old = self.write_pdf('old.pdf', 10, 300)
+        new = self.write_pdf('new.pdf', 10, 0)
+        removed, freed = evict_cached_pdfs(
+            max_size=100, max_age=200, path=self.path)
+        self.assertEqual(removed, 1)
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.exists(new))
+
+    def test_evict_removes_lock(self):
+        file_path = self.write_pdf('old.pdf', 10, 300)
+        with render_lock(file_path):
+            pass
+        evict_cached_pdfs(max_size=0, path=self.path)
+        self.assertFalse(os.path.exists(f'{file_path}.lock'))
+
+    def test_evict_default_path(self):
+        self.write_pdf('foo.pdf', 10, 0)
+        with override_settings(SUMMARY_PDF_PATH=self.path):
+            self.assertEqual(evict_cached_pdfs(max_size=0), (1, 10))
@@ -1,4 +1,6 @@
-from unittest.mock import sentinel, MagicMock, patch, mock_open, call
+import os
+import tempfile
+from unittest.mock import sentinel, MagicMock, patch
 
 from django.contrib.auth import get_user_model
 from django.core.urlresolvers import reverse
@@ -11,7 +13,8 @@ from model_mommy import mommy
 from wkhtmltopdf.views import PDFTemplateResponse
 
 from qcat.tests import TestCase
-from summary.views import SummaryPDFCreateView, CachedPDFTemplateResponse
+from summary.views import SummaryPDFCreateView, CachedPDFTemplateResponse, \
+    render_summary
 
 
 class QuestionnaireSummaryPDFCreateViewTest(TestCase):
@@ -119,20 +122,60 @@ class TestCachedPDFTemplateResponse(TestCase):
         self.obj.filename = 'foo'
 
     @override_settings(DEBUG=False)
-    @patch('summary.views.isfile')
-    def test_rendered_content_existing_file(self, mock_isfile):
-        mock_isfile.return_value = True
-        with patch('summary.views.open', mock_open(read_data='hit')):
-            self.assertEqual(
-                self.obj.rendered_content,
-                'hit'
-            )
-
-    @patch('summary.views.isfile')
-    @override_settings(SUMMARY_PDF_PATH='pdf_path', DEBUG=False)
-    def test_rendered_content_creates_file(self, mock_isfile):
-        mock_isfile.return_value = False
-        with patch('summary.views.open') as open_mock:
-            self.obj.rendered_content
-            path = 'pdf_path/{}'.format(self.obj.filename)
-            self.assertIn(call(path, 'wb'), open_mock._mock_mock_calls)
+    def test_rendered_content_existing_file(self):
+        with tempfile.TemporaryDirectory() as tmp_dir, override_settings(
+                SUMMARY_PDF_PATH=tmp_dir):
+            with open(os.path.join(tmp_dir, 'foo'), 'wb') as f:
+                f.write(b'hit')
+            with patch.object(
+                    CachedPDFTemplateResponse,
+                    'get_rendered_content') as mock_rendered_content:
+                self.assertEqual(self.obj.rendered_content, b'hit')
+                mock_rendered_content.assert_not_called()
+
+    @override_settings(DEBUG=False)
+    @patch.object(CachedPDFTemplateResponse, 'get_rendered_content')
+    def test_rendered_content_creates_file(self, mock_rendered_content):
+        mock_rendered_content.return_value = b'pdf'
+        with tempfile.TemporaryDirectory() as tmp_dir, override_settings(
+                SUMMARY_PDF_PATH=tmp_dir):
+            self.assertEqual(self.obj.rendered_content, b'pdf')
+            with open(os.path.join(tmp_dir, 'foo'), 'rb') as f:
+                self.assertEqual(f.read(), b'pdf')
+
+    @override_settings(DEBUG=False)
+    @patch('summary.views.render_lock')
+    @patch('summary.views.read_cached_pdf')
+    @patch.object(CachedPDFTemplateResponse, 'get_rendered_content')
+    def test_rendered_content_after_lock(
+            self, mock_rendered_content, mock_read_cached_pdf,
+            mock_render_lock):
+        # The file was rendered by another process while waiting for the lock.
+        mock_read_cached_pdf.side_effect = [None, b'rendered']
+        self.assertEqual(self.obj.rendered_content, b'rendered')
+        mock_render_lock.assert_called_once_with(self.obj.file_path)
+        mock_rendered_content.assert_not_called()
+
+
+class RenderSummaryTest(TestCase):
+
+    @patch.object(SummaryPDFCreateView, 'track_request')
+    @patch.object(SummaryPDFCreateView, 'get_object')
+    def test_not_found(self, mock_get_object, mock_track_request):
+        mock_get_object.side_effect = Http404
+        self.assertFalse(render_summary(1, 'en'))
+        mock_track_request.assert_not_called()
+
+    @patch.object(SummaryPDFCreateView, 'track_request')
+    @patch.object(SummaryPDFCreateView, 'get')
+    def test_render_anonymous(self, mock_get, mock_track_request):
+        self.assertTrue(render_summary(1, 'es'))
+        request = mock_get.call_args[0][0]
+        self.assertFalse(request.user.is_authenticated())
+        self.assertEqual(request.LANGUAGE_CODE, 'es')
+        mock_get.return_value.render.assert_called_once_with()
+        mock_track_request.assert_not_called()
+
+    def test_base_url(self):
+        view = SummaryPDFCreateView(base_url='http://bar/')
+        self.assertEqual(view.get_base_url(), 'http://bar/')
@@ -2,13 +2,15 @@ import contextlib
 import logging
 
 import requests
-from os.path import join, isfile
+from os.path import join
 
 from django.apps import apps
 from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
 from django.db.models import Q
-from django.http import Http404
+from django.http import Http404, HttpRequest
 from django.template.response import TemplateResponse
+from django.utils import translation
 from django.utils.translation import get_language
 import bs4
 from summary.renderers.approaches_2015 import Approaches2015FullSummaryRenderer
@@ -22,6 +24,7 @@ from wkhtmltopdf.views import PDFTemplateView, PDFTemplateResponse
 from questionnaire.models import Questionnaire
 from questionnaire.utils import get_query_status_filter, \
     get_questionnaire_data_in_single_language
+from .pdf_cache import read_cached_pdf, render_lock, write_cached_pdf
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +38,9 @@ class CachedPDFTemplateResponse(PDFTemplateResponse):
     Therefore, the content is created only once per filename (which should
     distinguish between new questionnaire edits). This only works with
     reasonably precise file names!
+
+    Concurrent requests of the same file wait for a single render (see
+    :func:`summary.pdf_cache.render_lock`).
     """
     @property
     def file_path(self):
@@ -44,15 +50,20 @@ class CachedPDFTemplateResponse(PDFTemplateResponse):
         return super().rendered_content
 
     def content_with_file_cache(self):
-        if isfile(self.file_path):
-            # Catch any exception, worst case is that the pdf is created from
-            # scratch again
-            with contextlib.suppress(Exception) as e:
-                return open(self.file_path, 'rb').read()
-
-        content = self.get_rendered_content()
-        with contextlib.suppress(Exception) as e:
-            open(self.file_path, 'wb').write(content)
+        content = read_cached_pdf(self.file_path)
+        if content is not None:
+            return content
+
+        with render_lock(self.file_path):
+            # The file may have been created by another process while waiting
+            # for the lock.
+            content = read_cached_pdf(self.file_path)
+            if content is None:
+                content = self.get_rendered_content()
+                # Catch any exception, worst case is that the pdf is created
+                # from scratch again
+                with contextlib.suppress(Exception):
+                    write_cached_pdf(self.file_path, content)
         return content
 
     @property
@@ -222,6 +233,10 @@ class SummaryPDFCreateView(PDFTemplateView):
         'approaches_2015': {'full': Approaches2015FullSummaryRenderer}
     }
     footer_template = '{}layout/footer.html'.format(base_template_path)
+    # Set to False for summaries rendered in advance (not downloaded).
+    track_downloads = True
+    # The URL used for links and assets, defaults to the URL of the request.
+    base_url = None
     # see: http://wkhtmltopdf.org/usage/wkhtmltopdf.txt
     cmd_options = {
         'dpi': '96',
@@ -246,7 +261,8 @@ class SummaryPDFCreateView(PDFTemplateView):
         self.filename = self.get_filename()
         if self.is_doc_file:
             self.response_class = self.doc_response_class
-        self.track_request()
+        if self.track_downloads:
+            self.track_request()
         return super().get(request, *args, **kwargs)
 
     def get_template_names(self):
@@ -295,9 +311,12 @@ class SummaryPDFCreateView(PDFTemplateView):
             config=self.questionnaire.configuration_object,
             questionnaire=self.questionnaire,
             quality=self.quality,
-            base_url=self.request.build_absolute_uri('/'), **data
+            base_url=self.get_base_url(), **data
         ).render()
 
+    def get_base_url(self) -> str:
+        return self.base_url or self.request.build_absolute_uri('/')
+
     def get_prepared_data(self, questionnaire: Questionnaire) -> dict:
         """
         Load the prepared JSON for given object in the current language.
@@ -366,3 +385,37 @@ class SummaryPDFCreateView(PDFTemplateView):
                     f'Cannot track summary download for url %s (%s)',
                     f'{settings.PIWIK_URL}matomo.php', payload
                 )
+
+
+def has_summary(questionnaire: Questionnaire) -> bool:
+    """
+    Return True if a summary is available for the configuration of the
+    questionnaire.
+    """
+    identifier = f'{questionnaire.configuration.code}_' \
+                 f'{questionnaire.configuration.edition}'
+    return identifier in SummaryPDFCreateView.render_classes
+
+
+def render_summary(questionnaire_id: int, language: str) -> bool:
+    """
+    Render the (default) summary of a public questionnaire to the cache,
+    outside of a request. The summary is rendered as an anonymous user would
+    request it.
+
+    Returns:
+        ``bool``. False if the questionnaire is not public or has no summary.
+    """
+    request = HttpRequest()
+    request.method = 'GET'
+    request.user = AnonymousUser()
+    request.LANGUAGE_CODE = language
+    view = SummaryPDFCreateView.as_view(
+        track_downloads=False, base_url=f'{settings.BASE_URL.rstrip("/")}/')
+    with translation.override(language):
+        try:
+            response = view(request, id=questionnaire_id)
+        except Http404:
+            return False
+        response.render()
+    return True
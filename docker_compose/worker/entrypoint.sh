@@ -0,0 +1,10 @@
+#!/bin/bash
+
+# Wait for all services. The env-files are set by the entrypoint.sh script of
+# the web container (sharing the same volume), so they are not touched here.
+waitfor postgres:5432 -- true
+waitfor redis:6379 -- true
+waitfor elasticsearch:9200 -- true
+waitfor web:8000 -- python manage.py check
+
+exec "$@"
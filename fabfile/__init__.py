@@ -133,6 +133,7 @@ def deploy_host(environment):
         _reload_uwsgi()
         _rebuild_elasticsearch_indexes()
         _purge_summary_pdfs()
+        _update_exports()
     _set_maintenance_mode(False)
 
     _access_project()
@@ -199,6 +200,10 @@ def _rebuild_elasticsearch_indexes():
     _manage_py('rebuild_es_indexes')
 
 
+def _update_exports():
+    _manage_py('export_questionnaires')
+
+
 def _purge_summary_pdfs():
     with cd(env.site_folder):
         # -f suppresses error when folder is empty